@@ -1,5 +1,6 @@
 import asyncio
 import os
+import uuid
 import traceback
 import json
 from typing import List, Optional, Dict, Any
@@ -8,7 +9,7 @@ from datetime import datetime, timedelta
 from langchain_google_genai import ChatGoogleGenerativeAI
 from graphs.fundamental import FundamentalGraph
 from graphs.technical import TechnicalAnalysisGraph
-from graphs.portfolio import PortfolioGraph
+from graphs.portfolio import PortfolioGraph, economic_window
 from graphs.swing import SwingTradeGraph
 from providers.yfinance import YFinanceProvider
 from providers.alphavantage import AlphaVantageProvider
@@ -18,6 +19,14 @@ from utils.logging import setup_logger
 from utils.email import send_via_gmail
 from models.models import ApiRequestUsage, StockSplit
 from services.database import DatabaseManager
+from services.async_database import AsyncDatabaseManager
+from services.telemetry import UsageBuffer
+from services.batch_analysis import BatchAnalysisEngine, BatchResult
+from services.quota import DatabaseQuotaLedger
+from services.llm_cache import LLMResponseCache
+from services.checkpoints import create_checkpointer
+from utils.concurrency import LLMConcurrencyLimiter, LoopSemaphore, provider_limit
+from utils.rate_limiter import rate_limit_stats
 
 class StockAnalysisApp:
     _instance = None
@@ -35,16 +44,24 @@ class StockAnalysisApp:
             return
 
         self.db_manager = DatabaseManager()  # Create a new instance
+        # Async facade: runs peewee work on a bounded thread pool so queries never block the event loop
+        self.db = AsyncDatabaseManager(self.db_manager)
+        # Token and API usage rows are buffered and written in batches
+        self.usage_buffer = UsageBuffer(scope_factory=self.db_manager.connection_scope)
         # self.stock_advisor = StockAdvisor(db_manager=self.db_manager)
         self.logger = setup_logger("stock_app")
         # Initialize all graphs
         self.llm = self.setup_llm()
         self.yfinance_provider = YFinanceProvider()
         self.alphavantage_provider = AlphaVantageProvider() 
-        self.fundamental_graph = FundamentalGraph(llm=self.llm, yfinance_provider=self.yfinance_provider, alphavantage_provider=self.alphavantage_provider)
+        self.llm_cache = LLMResponseCache()
+        self.checkpointer = create_checkpointer(runner=self.db.run)
+        self.fundamental_graph = FundamentalGraph(llm=self.llm, yfinance_provider=self.yfinance_provider, alphavantage_provider=self.alphavantage_provider, llm_cache=self.llm_cache, checkpointer=self.checkpointer)
         self.technical_graph = TechnicalAnalysisGraph(llm=self.llm, yfinance_provider=self.yfinance_provider, alphavantage_provider=self.alphavantage_provider)
         self.swing_graph = SwingTradeGraph(llm=self.llm, yfinance_provider=self.yfinance_provider, alphavantage_provider=self.alphavantage_provider)
         self.portfolio_graph = PortfolioGraph(llm=self.llm)
+        # Only one coroutine computes a missing economic analysis; the rest wait and reuse it
+        self._economic_lock = LoopSemaphore(1)
 
         # Initialize and start the scheduler
         self.scheduler = Scheduler(app=self)
@@ -59,17 +76,17 @@ class StockAnalysisApp:
             temperature=0, # Set temperature to 0 for reasoning tasks, higher (0.7-1.0) for creative tasks
             max_retries=2,
             api_key=os.getenv("GEMINI_API_KEY"),
+            callbacks=[LLMConcurrencyLimiter()],  # Bound concurrent LLM calls across all graphs
         )
 
-    def add_stock(self, symbol: str) -> Dict[str, Any]:
+    async def add_stock(self, symbol: str) -> Dict[str, Any]:
         """Add a new stock to the database"""
         try:
-            with self.db_manager.get_connection():
-                stock, created = self.db_manager.get_or_create_stock(symbol)
+            stock, created = await self.db.get_or_create_stock(symbol)
             if created:
-                # Fetch splits and update if new stock (DB access inside update_stock_splits is protected)
-                splits, _ = self.alphavantage_provider.get_splits(symbol)
-                self.update_stock_splits(symbol, splits)
+                # Fetch splits before going back to the DB executor so a slow lookup never holds a pooled connection
+                splits, _ = await self.alphavantage_provider.get_splits_async(symbol)
+                await self.db.run(self.update_stock_splits, symbol, splits)
             return {
                 "message": f"Stock {symbol} added successfully",
                 "data": {"symbol": stock.symbol, "id": stock.id}
@@ -98,6 +115,7 @@ class StockAnalysisApp:
         with self.db_manager.get_connection():
             stock_obj = dbm.get_stock_by_symbol(symbol)
         if stock_obj:
+            created = 0
             for split in splits:
                 try:
                     effective_date = split.get("effective_date")
@@ -118,27 +136,69 @@ class StockAnalysisApp:
                                 effective_date=effective_date,
                                 split_factor=split_factor
                             )
+                            created += 1
                 except Exception as e:
                     self.logger.error(f"Error saving split for {symbol} on {effective_date}: {e}")
+            if created:
+                # New splits change the split-adjusted shares of every portfolio holding this stock
+                with self.db_manager.get_connection():
+                    dbm.refresh_holdings_for_stock(stock_obj.id)
 
-    def get_research(self, symbol: str) -> Dict[str, Any]:
-        """Get all research for a stock"""
+    def get_research(self, symbol: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get a page of research listings for a stock (newest first); report bodies come from get_research_report"""
         try:
             with self.db_manager.get_connection():
-                research_entries = self.db_manager.get_research_by_symbol(symbol)
-            data = [{
-                "id": entry.id,
-                "symbol": entry.stock.symbol,
-                "created_at": entry.created_at
-            } for entry in research_entries]
+                data, next_cursor = self.db_manager.list_research(symbol, limit=limit, cursor=cursor)
             return {
                 "message": f"Research for {symbol} retrieved successfully",
-                "data": data
+                "data": data,
+                "next_cursor": next_cursor
             }
         except Exception as e:
             self.logger.error(f"Error getting research for {symbol}: {str(e)}{traceback.format_exc()}")
             raise e
 
+    def screen_stocks(
+        self,
+        recommendation: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        min_price_target_percent: Optional[float] = None,
+        order_by: str = "price_target_percent",
+        descending: bool = True,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """Screen the latest research of every stock by recommendation, confidence and price target"""
+        try:
+            with self.db_manager.get_connection():
+                data = self.db_manager.screen_research(
+                    recommendation=recommendation,
+                    min_confidence=min_confidence,
+                    min_price_target_percent=min_price_target_percent,
+                    order_by=order_by,
+                    descending=descending,
+                    limit=limit
+                )
+            return {
+                "message": f"{len(data)} stocks matched",
+                "data": data
+            }
+        except Exception as e:
+            self.logger.error(f"Error screening stocks: {str(e)}\n{traceback.format_exc()}")
+            raise e
+
+    def get_dashboard_snapshots(self, symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Latest historical and technical values for every stock, fetched in one query"""
+        try:
+            with self.db_manager.get_connection():
+                data = self.db_manager.get_latest_snapshots(symbols)
+            return {
+                "message": f"Snapshots for {len(data)} stocks retrieved successfully",
+                "data": data
+            }
+        except Exception as e:
+            self.logger.error(f"Error getting dashboard snapshots: {str(e)}\n{traceback.format_exc()}")
+            raise e
+
     def get_research_report(self, research_id: int) -> Dict[str, Any]:
         """Get a research report by its ID"""
         try:
@@ -167,32 +227,39 @@ class StockAnalysisApp:
             raise e
 
     def save_usage_metadata(self, source: str, usage: dict):
-        """Save token usage and API usage for each graph node using the database."""
+        """Queue token usage and API usage for each graph node for a batched write."""
         if not usage:
             self.logger.info(f"No usage metadata to save for {source}.")
             return
+        api_calls = {}
         for node, node_usage in usage.items():
             token_usage = node_usage.get("token_usage")
             if token_usage:
                 input_tokens = token_usage.get("input_tokens", 0)
                 output_tokens = token_usage.get("output_tokens", 0)
                 total_tokens = token_usage.get("total_tokens", 0)
-                self.db_manager.save_token_usage(
+                self.usage_buffer.add_token_usage(
                     step=f"{source}:{node}",
                     input_tokens=input_tokens,
                     output_tokens=output_tokens,
-                    total_tokens=total_tokens
+                    total_tokens=total_tokens,
+                    cache_hit=node_usage.get("cache_hit", False)
                 )
             api_usage = node_usage.get("api_usage")
             if api_usage is not None:
                 for provider, count in api_usage.items():
                     if count is not None:
-                        ApiRequestUsage.create(
+                        self.usage_buffer.add_api_usage(
                             step=f"{source}:{node}",
                             provider=provider,
                             count=count
                         )
+                        calls, requests = api_calls.get(provider, (0, 0))
+                        api_calls[provider] = (calls + count, requests + 1)
             self.logger.info(f"Usage for {source} - {node}: {json.dumps(node_usage, default=str)}")
+        # Daily quota counters are updated right away (one upsert per provider) so quota checks stay exact
+        for provider, (calls, requests) in api_calls.items():
+            self.db_manager.record_api_calls(provider, calls, requests=requests)
 
     async def compare_stocks(self, symbols: List[str]) -> Dict[str, Any]:
         """Compare multiple stocks and store results"""
@@ -200,7 +267,7 @@ class StockAnalysisApp:
             if len(symbols) < 2:
                 raise ValueError("At least two symbols are required for comparison")
 
-            stocks = [self.db_manager.get_stock_by_symbol(symbol) for symbol in symbols]
+            stocks = await asyncio.gather(*(self.db.get_stock_by_symbol(symbol) for symbol in symbols))
 
 
             # Get comparison from FundamentalGraph (async)
@@ -323,7 +390,7 @@ class StockAnalysisApp:
     async def analyze_technical(self, symbol: str) -> Dict[str, Any]:
         """Analyze technicals for a stock and store results in database"""
         try:
-            stock = self.db_manager.get_stock_by_symbol(symbol)
+            stock = await self.db.get_stock_by_symbol(symbol)
 
             # Get analysis from TechnicalAnalysisGraph (async)
             graph_result = await self.technical_graph.analyze_technical(symbol, self.llm)
@@ -331,7 +398,7 @@ class StockAnalysisApp:
             usage = graph_result.get("usage", {})
 
             # Save to database (store structured_output as dict, not JSON string)
-            technical = self.db_manager.create_technical(
+            technical = await self.db.create_technical(
                 stock=stock,
                 technical=results.get("analysis", "N/A"),
                 structured_output=results.get("structured_data", results)
@@ -340,10 +407,10 @@ class StockAnalysisApp:
             # Save technical historical values if available (follow research pattern)
             structured_data = results.get("structured_data", {})
             if structured_data:
-                self._save_technical_values(stock, structured_data)
+                await self.db.run(self._save_technical_values, stock, structured_data)
 
             # Save usage metadata
-            self.save_usage_metadata(symbol, usage)
+            await self.db.run(self.save_usage_metadata, symbol, usage)
 
             return {
                 "message": "Technical analysis completed successfully",
@@ -372,22 +439,14 @@ class StockAnalysisApp:
         except Exception as e:
             self.logger.error(f"Error saving technical values: {str(e)}\n{traceback.format_exc()}")
 
-    def get_technical_analyses(self, symbol: str) -> Dict[str, Any]:
-        """Get all technical analyses for a stock"""
+    def get_technical_analyses(self, symbol: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get a page of technical analysis listings for a stock (newest first); the text comes from get_technical_report"""
         try:
-            stock = self.db_manager.get_stock_by_symbol(symbol)
-            technical_entries = self.db_manager.get_technical_by_symbol(symbol)
-            data = [
-                {
-                    "id": entry.id,
-                    "symbol": stock.symbol,
-                    "created_at": entry.created_at
-                }
-                for entry in technical_entries
-            ]
+            data, next_cursor = self.db_manager.list_technical(symbol, limit=limit, cursor=cursor)
             return {
                 "message": f"Technical analyses for {symbol} retrieved successfully",
-                "data": data
+                "data": data,
+                "next_cursor": next_cursor
             }
         except Exception as e:
             self.logger.error(f"Error getting technical analyses for {symbol}: {str(e)}\n{traceback.format_exc()}")
@@ -418,15 +477,16 @@ class StockAnalysisApp:
     #
     # Portfolio
     #
-    def add_transaction(self, txn_req, portfolio_id: int):
-        stock, created = self.db_manager.get_or_create_stock(symbol=txn_req.symbol)
+    async def add_transaction(self, txn_req, portfolio_id: int):
+        stock, created = await self.db.get_or_create_stock(symbol=txn_req.symbol)
         if not stock or not getattr(stock, 'symbol', None):
             self.logger.error(f"Failed to create or retrieve stock for symbol: {getattr(txn_req, 'symbol', None)}. Stock object: {stock}")
             raise ValueError(f"Could not create or retrieve stock for symbol: {getattr(txn_req, 'symbol', None)}")
         if created:
-            splits, _ = self.alphavantage_provider.get_splits(txn_req.symbol)
-            self.update_stock_splits(txn_req.symbol, splits)
-        txn = self.db_manager.create_transaction(
+            # As in add_stock, only the DB writes go through the executor
+            splits, _ = await self.alphavantage_provider.get_splits_async(txn_req.symbol)
+            await self.db.run(self.update_stock_splits, txn_req.symbol, splits)
+        txn = await self.db.create_transaction(
             stock=stock,
             portfolio_id=portfolio_id,
             action=txn_req.action,
@@ -477,73 +537,45 @@ class StockAnalysisApp:
         return self.db_manager.delete_transaction(transaction_id=transaction_id, portfolio_id=portfolio_id)
 
     def get_portfolio_holdings(self, portfolio_id: int):
-        """Summarize all transactions into a comprehensive portfolio table, adjusting for stock splits."""
-        txns = self.get_transactions(portfolio_id=portfolio_id)
-        # Summarize by symbol
-        portfolio = {}
-
-        for t in txns:
-            sym = t['symbol']
-            if sym not in portfolio:
-                portfolio[sym] = {
-                    'symbol': sym,
-                    'shares': 0.0,
-                    'avg_cost': 0.0,
-                    'total_cost': 0.0,
-                    'buys': 0.0,
-                    'sells': 0.0,
-                    'dividends': 0.0
-                }
-            # Adjust shares and price for splits
-            stock = self.db_manager.get_stock_by_symbol(sym)
-            splits = []
-            if stock:
-                splits = list(StockSplit.select().where(
-                    (StockSplit.stock == stock) &
-                    (StockSplit.effective_date > t['purchase_date'])
-                ).order_by(StockSplit.effective_date))
-            split_factor = 1.0
-            for split in splits:
-                try:
-                    split_factor *= float(split.split_factor)
-                except Exception:
-                    continue
-            adj_shares = t['shares'] * split_factor
-            adj_price = t['price'] / split_factor if split_factor != 0 else t['price']
-            if t['action'] == 'BUY':
-                portfolio[sym]['shares'] += adj_shares
-                portfolio[sym]['total_cost'] += adj_shares * adj_price
-                portfolio[sym]['buys'] += adj_shares
-            elif t['action'] == 'SELL':
-                portfolio[sym]['shares'] -= adj_shares
-                portfolio[sym]['sells'] += adj_shares
-            elif t['action'] == 'DIVIDEND_REINVESTMENT':
-                portfolio[sym]['shares'] += adj_shares
-                portfolio[sym]['dividends'] += adj_shares * adj_price
-        # Calculate average cost and round total_cost for each symbol
-        for sym, row in portfolio.items():
-            # Round total_cost and shares to 2 decimal places
-            row['total_cost'] = round(row['total_cost'], 2)
-            row['shares'] = round(row['shares'], 2)
-            if row['shares'] > 0:
-                row['avg_cost'] = round(row['total_cost'] / (row['buys'] + row['dividends']/row['avg_cost'] if row['avg_cost'] else row['buys']), 2) if (row['buys'] + row['dividends']) else 0.0
-            else:
-                row['avg_cost'] = 0.0
+        """Return the split-adjusted holdings of a portfolio from the materialized holdings table."""
         # Return as a list of dicts for table rendering
-        return list(portfolio.values())
+        return [self._holding_to_dict(h) for h in self.db_manager.get_portfolio_holding_rows(portfolio_id)]
+
+    @staticmethod
+    def _holding_to_dict(holding) -> Dict[str, Any]:
+        return {
+            'symbol': holding.stock.symbol,
+            'shares': holding.shares,
+            'avg_cost': holding.avg_cost,
+            'total_cost': holding.total_cost,
+            'buys': holding.buys,
+            'sells': holding.sells,
+            'dividends': holding.dividends
+        }
+
+    def rebuild_portfolio_holdings(self, portfolio_id: int = None) -> int:
+        """Rebuild the materialized holdings from the full transaction log."""
+        return self.db_manager.rebuild_portfolio_holdings(portfolio_id=portfolio_id)
+
+    def check_portfolio_holdings(self, portfolio_id: int = None) -> list:
+        """Return materialized holdings that disagree with the transaction log."""
+        mismatches = self.db_manager.check_portfolio_holdings(portfolio_id=portfolio_id)
+        if mismatches:
+            self.logger.warning(f"{len(mismatches)} portfolio holdings differ from the transaction log")
+        return mismatches
 
     def get_portfolio_holdings_combined(self, portfolio_id: int):
         """Return portfolio holdings with latest historical values for each symbol."""
-        holdings = self.get_portfolio_holdings(portfolio_id=portfolio_id)
+        rows = self.db_manager.get_portfolio_holding_rows(portfolio_id)
+        latest = self.db_manager.get_latest_historical_values_by_stock([row.stock_id for row in rows])
         combined = []
-        for h in holdings:
-            symbol = h["symbol"]
-            stock = self.db_manager.get_stock_by_symbol(symbol)
+        for row in rows:
+            h = self._holding_to_dict(row)
+            stock = row.stock
             # Add latest close, volume, and data_updated_at from Stock table
-            if stock:
-                h['close'] = stock.close
-                h['volume'] = stock.volume
-                h['data_updated_at'] = stock.data_updated_at
+            h['close'] = stock.close
+            h['volume'] = stock.volume
+            h['data_updated_at'] = stock.data_updated_at
             # Calculate gain_loss if close and avg_cost are available
             gain_loss = None
             try:
@@ -554,7 +586,7 @@ class StockAnalysisApp:
                     gain_loss = round((close - avg_cost) * shares, 2)
             except Exception:
                 gain_loss = None
-            hist = self.db_manager.get_latest_historical_values(stock)
+            hist = latest.get(row.stock_id)
             hist_data = None
             if hist:
                 hist_data = {
@@ -575,6 +607,7 @@ class StockAnalysisApp:
     def get_provider_usage(self, provider: str = None, start_date: str = None, end_date: str = None) -> list:
         """List API usage records for a provider and date range."""
         from datetime import datetime, time
+        self.usage_buffer.flush()
         query = ApiRequestUsage.select()
         if provider:
             query = query.where(ApiRequestUsage.provider == provider)
@@ -599,27 +632,45 @@ class StockAnalysisApp:
     def get_token_usage(self, start_date: str = None, end_date: str = None) -> list:
         """List token usage records for LLM calls in a date range."""
         dbm = self.db_manager
+        self.usage_buffer.flush()
         return dbm.get_token_usage(start_date=start_date, end_date=end_date)
     
+    def get_token_usage_summary(self, group_by: str = "day", start_date: str = None, end_date: str = None, limit: int = None) -> dict:
+        """Token totals per day, step or source, read from the daily rollups."""
+        self.usage_buffer.flush()
+        return self.db_manager.get_token_usage_summary(group_by=group_by, start_date=start_date, end_date=end_date, limit=limit)
+
+    def get_api_usage_summary(self, group_by: str = "day", provider: str = None, start_date: str = None, end_date: str = None, limit: int = None) -> dict:
+        """API call totals per day, step, source or provider, read from the daily rollups."""
+        self.usage_buffer.flush()
+        return self.db_manager.get_api_usage_summary(group_by=group_by, provider=provider, start_date=start_date, end_date=end_date, limit=limit)
+
     def get_provider_usage_summary(self, provider: str) -> dict:
         """Return a dict with total and average API calls for a provider from midnight to now."""
-        now = datetime.now()
-        midnight = datetime.combine(now.date(), time.min)
-        self.logger.info(f"Getting API usage for {provider} from {midnight} to {now}")
-        query = (ApiRequestUsage
-                 .select()
-                 .where(
-                     (ApiRequestUsage.provider == provider) &
-                     (ApiRequestUsage.created_at >= midnight) &
-                     (ApiRequestUsage.created_at <= now)
-                 ))
-        records = list(query)
-        total = sum([r.count for r in records])
-        avg = total / len(records) if records else 0
+        quota = self.db_manager.get_api_quota(provider)
+        total = quota["used"]
+        avg = total / quota["requests"] if quota["requests"] else 0
         usage = {"total": total, "average": avg}
         self.logger.info(f"API usage for {provider}: {usage}")
         return usage
 
+    def shutdown(self) -> None:
+        """Flush buffered usage rows and stop the database worker threads."""
+        self.usage_buffer.close()
+        self.db.shutdown()
+
+    def get_cache_stats(self) -> dict:
+        """Return hit/miss statistics for the provider response caches and the Stock identity map."""
+        return {
+            "alphavantage": self.alphavantage_provider.cache.stats(),
+            "llm": self.llm_cache.cache.stats(),
+            "stock": self.db_manager.stock_cache.stats()
+        }
+
+    def get_rate_limit_stats(self) -> dict:
+        """Return limits, queue length and wait-time histograms of the provider rate limiters."""
+        return rate_limit_stats()
+
     #
     # Scheduler
     #
@@ -652,24 +703,12 @@ class StockAnalysisApp:
         Respects API usage limits and saves usage metadata.
         """
         self.logger.info("Starting sync for stock splits...")
-        dbm = self.db_manager
         provider = "alphavantage"
-        with self.db_manager.get_connection():
-            portfolios = dbm.get_portfolios()
-        symbols_set = set()
-        for portfolio in portfolios:
-            holdings = self.get_portfolio_holdings(portfolio_id=portfolio.id)
-            for holding in holdings:
-                symbol = holding.get('symbol')
-                if symbol:
-                    symbols_set.add(symbol)
-        symbols = list(symbols_set)
-        with self.db_manager.get_connection():
-            total_calls = self.get_provider_usage_summary(provider)["total"]
-        usage = {}
+        symbols = await self.db.run(self.get_portfolio_symbols)
+        quota = self.create_quota_ledger(provider, max_api_calls)
+        stocks = await self.db.get_stocks_by_symbols(symbols)
         for symbol in symbols:
-            with self.db_manager.get_connection():
-                stock_obj = self.db_manager.get_stock_by_symbol(symbol)
+            stock_obj = stocks.get(symbol.upper())
             # Skip if splits_updated_at greater than 30 days
             if stock_obj and stock_obj.splits_updated_at:
                 try:
@@ -679,23 +718,42 @@ class StockAnalysisApp:
                         continue
                 except Exception as e:
                     self.logger.warning(f"Error checking splits_updated_at for {symbol}: {e}")
-            if total_calls + 1 > max_api_calls:
+            if not await self.db.run(quota.reserve, 1):
                 self.logger.warning(f"API limit reached for {provider}. Stopping sync for stock splits.")
                 break
-            splits, request_count = self.alphavantage_provider.get_splits(symbol)
-            self.update_stock_splits(symbol, splits)
+            try:
+                splits, request_count = await self.alphavantage_provider.get_splits_async(symbol)
+                # Record the call before releasing the reservation so the counter never under-reports
+                await self.db.run(self.save_usage_metadata, "sync_stock_splits", {symbol: {"api_usage": {provider: request_count}}})
+            finally:
+                await self.db.run(quota.refund, 1)
+            await self.db.run(self.update_stock_splits, symbol, splits)
             # Update splits_updated_at in Stock table
             if stock_obj:
                 try:
-                    with self.db_manager.get_connection():
-                        stock_obj.splits_updated_at = datetime.now()
-                        stock_obj.save()
+                    await self.db.mark_splits_updated(symbol)
                 except Exception:
                     # If saving the timestamp fails, continue; split data is already stored
                     self.logger.warning(f"Failed to update splits_updated_at for {symbol}")
-            usage[symbol] = {"api_usage": {provider: request_count}}
-            total_calls += request_count
-        self.save_usage_metadata("sync_stock_splits", usage)
+
+    async def maintain_history_tables(self) -> Dict[str, int]:
+        """Create upcoming monthly partitions, purge old token usage and compact old snapshots."""
+        return await self.db.run_retention()
+
+    def get_portfolio_symbols(self) -> List[str]:
+        """Return the unique symbols held across all portfolios."""
+        symbols_set = set()
+        for portfolio in self.db_manager.get_portfolios():
+            for holding in self.get_portfolio_holdings(portfolio_id=portfolio.id):
+                symbol = holding.get('symbol')
+                if symbol:
+                    symbols_set.add(symbol)
+        return list(symbols_set)
+
+    def _save_latest_price(self, symbol: str, ohlcv: Dict[str, Any], last_idx) -> None:
+        """Update Stock table with close, volume, and data_updated_at"""
+        data_updated_at = datetime.fromisoformat(str(last_idx)) if hasattr(datetime, 'fromisoformat') else str(last_idx)
+        self.db_manager.update_stock_price(symbol, ohlcv["close"], ohlcv["volume"], data_updated_at)
 
     async def get_latest_prices(self) -> Dict[str, dict]:
         """
@@ -704,16 +762,7 @@ class StockAnalysisApp:
         """
         self.logger.info("Fetching latest OHLCV data for all symbols...")
         # Gather all unique symbols from all portfolios
-        with self.db_manager.get_connection():
-            portfolios = self.db_manager.get_portfolios()
-        symbols_set = set()
-        for portfolio in portfolios:
-            holdings = self.get_portfolio_holdings(portfolio_id=portfolio.id)
-            for holding in holdings:
-                symbol = holding.get('symbol')
-                if symbol:
-                    symbols_set.add(symbol)
-        symbols = list(symbols_set)
+        symbols = await self.db.run(self.get_portfolio_symbols)
         hist = await self.yfinance_provider.get_stock_history_by_symbols_async(symbols, period='1d', interval='1d')
         latest_prices = {}
         for symbol in symbols:
@@ -729,146 +778,225 @@ class StockAnalysisApp:
                     "datetime": str(last_idx)
                 }
                 latest_prices[symbol] = ohlcv
-                # Update Stock table with close, volume, and data_updated_at
-                with self.db_manager.get_connection():
-                    stock_obj = self.db_manager.get_stock_by_symbol(symbol)
-                    if stock_obj:
-                        stock_obj.close = ohlcv["close"]
-                        stock_obj.volume = ohlcv["volume"]
-                        stock_obj.data_updated_at = datetime.fromisoformat(str(last_idx)) if hasattr(datetime, 'fromisoformat') else str(last_idx)
-                        stock_obj.save()
+                await self.db.run(self._save_latest_price, symbol, ohlcv, last_idx)
             except Exception as e:
                 self.logger.warning(f"Could not fetch latest OHLCV for {symbol}: {e}")
                 latest_prices[symbol] = None
         return latest_prices
     
+    def create_quota_ledger(self, provider: str, max_api_calls: int) -> DatabaseQuotaLedger:
+        """Create a quota ledger for today's calls to the provider, shared with other jobs through the database."""
+        return DatabaseQuotaLedger(self.db_manager, provider=provider, limit=max_api_calls)
+
+    async def analyze_stocks_batch(self, symbols: List[str], max_api_calls: Optional[int] = None, max_concurrency: Optional[int] = None):
+        """Analyze many stocks concurrently, yielding a BatchResult per symbol as each finishes."""
+        quota = self.create_quota_ledger("alphavantage", max_api_calls) if max_api_calls is not None else None
+        engine = BatchAnalysisEngine(self.analyze_stock, max_concurrency=max_concurrency, quota=quota, runner=self.db.run)
+        async for result in engine.run(symbols):
+            if result.status == "ok":
+                self.logger.info(f"Batch analysis of {result.symbol} finished in {result.seconds:.1f}s ({result.api_calls} API calls)")
+            else:
+                self.logger.warning(f"Batch analysis of {result.symbol} {result.status}: {result.error}")
+            yield result
+        if quota is not None:
+            self.logger.info(f"Batch analysis quota: {await self.db.run(quota.summary)}")
+
     async def daily_stock_report(self, max_api_calls=25):
+        symbols = await self.db.run(self._stale_holding_symbols)
+        if not symbols:
+            self.logger.info("No stale holdings to analyze.")
+            return []
+        results = []
+        async for result in self.analyze_stocks_batch(symbols, max_api_calls=max_api_calls):
+            results.append(result)
+        return results
+
+    def _stale_holding_symbols(self) -> List[str]:
+        """Holdings whose latest research is missing or older than 7 days."""
         dbm = self.db_manager
-        provider = "alphavantage"  # Change if using a different provider
-        with self.db_manager.get_connection():
-            portfolios = dbm.get_portfolios()
+        portfolios = dbm.get_portfolios()
+        # Collect stale holdings across all portfolios; a symbol held in several portfolios is analyzed once
+        symbols = []
         for portfolio in portfolios:
             self.logger.info(f"Starting daily stock report for portfolio: {portfolio.name} (id={portfolio.id})")
             holdings = self.get_portfolio_holdings(portfolio_id=portfolio.id)
             if not holdings or len(holdings) == 0:
                 self.logger.info(f"No holdings found for portfolio: {portfolio.name} (id={portfolio.id}), skipping.")
                 continue
-            with self.db_manager.get_connection():
-                usage = self.get_provider_usage_summary(provider)
-            total_calls = usage["total"]
-            avg_calls = usage["average"]
-            self.logger.info(f"API usage for {provider}: total={total_calls}, average={avg_calls}")
+            stocks = dbm.get_stocks_by_symbols([holding["symbol"] for holding in holdings])
             for holding in holdings:
                 symbol = holding["symbol"]
-                stock = dbm.get_stock_by_symbol(symbol)
+                stock = stocks.get(symbol.upper())
                 latest_research = dbm.get_latest_research(stock)
                 last_date = latest_research.created_at if latest_research else None
                 # Only analyze if not updated in last 7 days or no reports exist
                 if not last_date or (datetime.now() - last_date).days > 7:
                     self.logger.info(f"Checking {symbol}: last report date = {last_date}")
-                    # Use average calls per record as estimate for this symbol
-                    if total_calls + 4 <= max_api_calls:
-                        self.logger.info(f"Analyzing {symbol}. Current API usage: total={total_calls}, average={avg_calls}")
-                        await self.analyze_stock(symbol)
-                        usage = self.get_provider_usage_summary(provider)
-                        total_calls = usage["total"]
-                        avg_calls = usage["average"]
-                        self.logger.info(f"Post-analysis API usage for {provider}: total={total_calls}, average={avg_calls}")
-                    else:
-                        self.logger.warning(f"API limit reached for {provider}. Stopping daily stock report for this portfolio.")
-                        break
+                    symbols.append(symbol)
+        return symbols
 
     async def portfolio_analysis_all(self):
-        """Run portfolio_analysis for each portfolio in the database."""
-        dbm = self.db_manager
-        with self.db_manager.get_connection():
-            portfolios = dbm.get_portfolios()
+        """Run portfolio_analysis for each portfolio in the database.
+
+        The economic analysis is computed (or loaded) once and shared; portfolios then run
+        concurrently, at most PORTFOLIO_MAX_CONCURRENCY at a time.
+        """
+        portfolios = await self.db.get_portfolios()
+        if not portfolios:
+            return []
+        economic = await self.get_economic_analysis()
+
+        async def run(portfolio_id: int):
+            async with provider_limit("portfolio"):
+                self.logger.info(f"Running portfolio_analysis for portfolio_id={portfolio_id}")
+                return await self.portfolio_analysis(portfolio_id=portfolio_id, economic_analysis=economic.analysis)
+
+        outcomes = await asyncio.gather(*(run(p.id) for p in portfolios), return_exceptions=True)
         results = []
-        for p in portfolios:
-            portfolio_id = p.id
-            self.logger.info(f"Running portfolio_analysis for portfolio_id={portfolio_id}")
-            result = await self.portfolio_analysis(portfolio_id=portfolio_id)
-            results.append({"portfolio_id": portfolio_id, "result": result})
-            # Sleep to prevent rate limit
-            await asyncio.sleep(60)
+        for p, outcome in zip(portfolios, outcomes):
+            if isinstance(outcome, Exception):
+                results.append({"portfolio_id": p.id, "error": str(outcome)})
+            else:
+                results.append({"portfolio_id": p.id, "result": outcome})
         return results
+
+    async def get_economic_analysis(self, force: bool = False):
+        """Return the stored economic analysis for today's FRED window, computing and storing it if none is valid."""
+        window_start, window_end = economic_window()
+        if not force:
+            cached = await self.db.get_economic_analysis(window_start, window_end)
+            if cached:
+                return cached
+        async with self._economic_lock:
+            # Another caller may have stored it while this one waited
+            cached = None if force else await self.db.get_economic_analysis(window_start, window_end)
+            if cached:
+                return cached
+            result = await self.portfolio_graph.analyze_economy(window_start, window_end)
+            economic = await self.db.create_economic_analysis(window_start, window_end, analysis=result["analysis"], trends=result["trends"])
+            await self.db.run(self.save_usage_metadata, source="economic", usage=result["usage"])
+            self.logger.info(f"Stored economic analysis for {window_start} to {window_end}, valid until {economic.expires_at}")
+            return economic
     
     #                    
     #  Analysis
     #
-    async def analyze_stock(self, symbol: str) -> Dict[str, Any]:
-        """Analyze a stock and store results in database"""
+    async def analyze_stock(self, symbol: str, bypass_cache: bool = False, run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Analyze a stock and store results in database.
+
+        Each run is checkpointed under `run_id`; passing the id of a failed run resumes it
+        from its last completed node instead of re-running every provider and LLM call.
+        """
+        run_id = run_id or str(uuid.uuid4())
         try:
-            stock = self.db_manager.get_stock_by_symbol(symbol)
+            stock = await self.db.get_stock_by_symbol(symbol)
+            await self.db.start_graph_run(run_id, graph="fundamental", symbol=symbol)
 
             # Get analysis from FundamentalGraph (async) with error handling
             try:
-                graph_result = await self.fundamental_graph.analyze_stock(symbol=symbol)
+                graph_result = await self.fundamental_graph.analyze_stock(symbol=symbol, bypass_cache=bypass_cache, run_id=run_id)
             except Exception as e:
-                self.logger.error(f"Exception during graph execution for {symbol}: {str(e)}\n{traceback.format_exc()}")
+                self.logger.error(f"Exception during graph execution for {symbol} (resumable as run {run_id}): {str(e)}\n{traceback.format_exc()}")
                 raise
             results = graph_result["results"]
             usage = graph_result.get("usage", {})
-            results_str = self.fundamental_graph.get_report_str(symbol, results)
-            results_structured_output = json.dumps(results.get("structured_data", {}), indent=2, default=str)
-            # Combine all validate_ node results into a single string
-            validate_sections = []
-            for section in ["technical", "market", "dividend", "news"]:
-                val = results.get(f"validate_{section}")
-                if val:
-                    validate_sections.append(f"[{section.upper()} VALIDATION]\n{val}")
-            validate_combined = "\n\n".join(validate_sections) if validate_sections else None
-
-            # Save to database
-            research = self.db_manager.create_research(
-                stock=stock,
-                market=results.get("revised_market", {}).get("analysis", "N/A"),
-                dividend=results.get("revised_dividend", {}).get("analysis", "N/A"),
-                news=results.get("revised_news", {}).get("analysis", "N/A"),
-                technical=results.get("revised_technical", {}).get("analysis", "N/A"),
-                recommendation=results.get("recommendation"),
-                structured_output=results_structured_output,
-                validation=validate_combined
-            )
-
-            # Save historical values if available
-            structured_data = results.get("structured_data", {})
-            if structured_data:
-                self._save_historical_values(stock, structured_data)
-                compare = self._compare_historical_values(stock)
-                if compare:
-                    self.logger.info(f"Significant change detected for {symbol}, sending email alert.")
-                    # Send email alert
-                    subject = f"StockAdvisor Alert: {symbol} Recommendation Change"
-                    body = f"The recommendation for {symbol} has changed.\n\n{compare}"
-                    send_via_gmail(subject, body)
-
-            # Save usage metadata
-            source = f"stock:{symbol}"
-            self.save_usage_metadata(source, usage)
-
-            # Save reports
-            # TODO: Add a setting to export reports. Create an /output container directory
-            #self.stock_advisor.save_report(symbol, results_str)
-            #self.stock_advisor.save_report(symbol, results.get("structured_data", {}), report_type='json')
+            await self.db.run(self._save_analysis, symbol, stock, results, usage, run_id)
 
             return {
                 "message": "Analysis completed successfully",
                 "data": results.get("structured_data", {}),
-                "usage": usage
+                "usage": usage,
+                "run_id": run_id
             }
         except Exception as e:
+            await self.db.finish_graph_run(run_id, error=str(e))
             self.logger.error(f"Error analyzing stock: {str(e)}\n{traceback.format_exc()}")
             raise e
 
-    async def portfolio_analysis(self, portfolio_id: int):
+    def _save_analysis(self, symbol: str, stock, results: Dict[str, Any], usage: Dict[str, Any], run_id: str) -> None:
+        """Persist a finished fundamental analysis and close its graph run."""
+        results_str = self.fundamental_graph.get_report_str(symbol, results)
+        # Stored as a JSON document (not a JSON-encoded string) so it can be queried in SQL
+        results_structured_output = json.loads(json.dumps(results.get("structured_data", {}), default=str))
+        # Combine all validate_ node results into a single string
+        validate_sections = []
+        for section in ["technical", "market", "dividend", "news"]:
+            val = results.get(f"validate_{section}")
+            if val:
+                validate_sections.append(f"[{section.upper()} VALIDATION]\n{val}")
+        validate_combined = "\n\n".join(validate_sections) if validate_sections else None
+
+        # Save to database
+        research = self.db_manager.create_research(
+            stock=stock,
+            market=results.get("revised_market", {}).get("analysis", "N/A"),
+            dividend=results.get("revised_dividend", {}).get("analysis", "N/A"),
+            news=results.get("revised_news", {}).get("analysis", "N/A"),
+            technical=results.get("revised_technical", {}).get("analysis", "N/A"),
+            recommendation=results.get("recommendation"),
+            structured_output=results_structured_output,
+            validation=validate_combined
+        )
+
+        # Save historical values if available
+        structured_data = results.get("structured_data", {})
+        if structured_data:
+            self._save_historical_values(stock, structured_data)
+            compare = self._compare_historical_values(stock)
+            if compare:
+                self.logger.info(f"Significant change detected for {symbol}, sending email alert.")
+                # Send email alert
+                subject = f"StockAdvisor Alert: {symbol} Recommendation Change"
+                body = f"The recommendation for {symbol} has changed.\n\n{compare}"
+                send_via_gmail(subject, body)
+
+        # Save usage metadata
+        source = f"stock:{symbol}"
+        self.save_usage_metadata(source, usage)
+
+        # Save reports
+        # TODO: Add a setting to export reports. Create an /output container directory
+        #self.stock_advisor.save_report(symbol, results_str)
+        #self.stock_advisor.save_report(symbol, results.get("structured_data", {}), report_type='json')
+
+        # Results are persisted, the checkpoints are no longer needed
+        self.db_manager.finish_graph_run(run_id)
+        self.checkpointer.delete_thread(run_id)
+
+    def get_incomplete_runs(self) -> List[Dict[str, Any]]:
+        """List graph runs that failed or did not finish and can be resumed."""
+        return [
+            {
+                "run_id": run.run_id,
+                "graph": run.graph,
+                "symbol": run.symbol,
+                "status": run.status,
+                "error": run.error,
+                "attempts": run.attempts,
+                "updated_at": run.updated_at.isoformat()
+            }
+            for run in self.db_manager.get_incomplete_graph_runs()
+        ]
+
+    async def resume_analysis(self, run_id: str) -> Dict[str, Any]:
+        """Resume a failed or interrupted analyze_stock run from its last checkpoint."""
+        run = await self.db.get_graph_run(run_id)
+        if run is None:
+            raise ValueError(f"Graph run {run_id} not found")
+        if run.status == "completed":
+            raise ValueError(f"Graph run {run_id} already completed")
+        return await self.analyze_stock(run.symbol, run_id=run_id)
+
+    def _portfolio_analysis_inputs(self, portfolio_id: int):
+        """Load the portfolio, its holdings, their latest recommendations and the cash balance."""
         portfolio = self.db_manager.get_portfolio_by_id(portfolio_id=portfolio_id)
         holdings = self.get_portfolio_holdings(portfolio_id=portfolio_id)
         dbm = self.db_manager
         self.logger.info(f"Starting monthly portfolio analysis for portfolio {portfolio.name}.")
         summaries = []
+        stocks = dbm.get_stocks_by_symbols([holding["symbol"] for holding in holdings])
         for holding in holdings:
-            stock = dbm.get_stock_by_symbol(holding["symbol"])
+            stock = stocks.get(holding["symbol"].upper())
             latest_research = dbm.get_latest_research(stock)
             if latest_research and latest_research.recommendation:
                 self.logger.info(f"{holding['symbol']}: recommendation found.")
@@ -878,19 +1006,25 @@ class StockAnalysisApp:
                 summaries.append(f"No recommendation for {holding['symbol']}")
         cash_balance = dbm.get_current_cash_balance(portfolio_id=portfolio_id)
         self.logger.info(f"Portfolio cash balance: ${cash_balance}")
+        return portfolio, holdings, summaries, cash_balance
+
+    async def portfolio_analysis(self, portfolio_id: int, economic_analysis: Optional[str] = None):
+        portfolio, holdings, summaries, cash_balance = await self.db.run(self._portfolio_analysis_inputs, portfolio_id)
         try:
-            analysis = await self.portfolio_graph.analyze_portfolio(summaries=summaries, holdings=holdings, portfolio=portfolio, cash_balance=cash_balance)
+            if economic_analysis is None:
+                economic_analysis = (await self.get_economic_analysis()).analysis
+            analysis = await self.portfolio_graph.analyze_portfolio(summaries=summaries, holdings=holdings, portfolio=portfolio, cash_balance=cash_balance, economic_analysis=economic_analysis)
             results = analysis.get("results", {})
             usage = analysis.get("usage", {})
             # Save to PortfolioResearch table using the singleton db_manager
-            self.db_manager.create_portfolio_research(
+            await self.db.create_portfolio_research(
                 portfolio_id=portfolio_id,
                 dca_analysis=results.get("dca_analysis"),
                 economic_analysis=results.get("economic_analysis"),
                 portfolio_analysis=results.get("portfolio_analysis")
             )
             source = f"portfolio:{portfolio.name}"
-            self.save_usage_metadata(source=source, usage=usage)
+            await self.db.run(self.save_usage_metadata, source=source, usage=usage)
 
             self.logger.info(f"Monthly portfolio analysis complete.")
             return {
@@ -905,7 +1039,7 @@ class StockAnalysisApp:
         self.logger.info(f"Starting swing trade analysis for {symbol}.")
         try:
             # Perform swing trade analysis
-            latest_research = self.db_manager.get_latest_research_by_symbol(symbol)
+            latest_research = await self.db.get_latest_research_by_symbol(symbol)
             analysis = await self.swing_graph.analyze_swing_trade(symbol=symbol, research=latest_research)
             results = analysis.get("results", {})
             usage = analysis.get("usage", {})
@@ -913,9 +1047,9 @@ class StockAnalysisApp:
             pattern_analysis = results.get("pattern_analysis", {}).get("analysis", "N/A")
             trade_recommendation = results.get("trade_recommendation", {}).get("analysis", "N/A")
             swing_trade_plan = results.get("swing_trade_plan")
-            stock = self.db_manager.get_stock_by_symbol(symbol)
+            stock = await self.db.get_stock_by_symbol(symbol)
 
-            self.db_manager.create_swing_trade_research(    
+            await self.db.create_swing_trade_research(
                 stock=stock,
                 pattern_analysis=pattern_analysis,
                 trade_recommendation=trade_recommendation,
@@ -923,7 +1057,7 @@ class StockAnalysisApp:
             if swing_trade_plan:
                 # Look up the Stock object by ticker (symbol)
                 # Explicitly map fields to avoid passing extra keys
-                self.db_manager.create_swing_trade_plan_history(
+                await self.db.create_swing_trade_plan_history(
                     stock=stock,
                     direction=swing_trade_plan.get('direction'),
                     entry_price=swing_trade_plan.get('entry_price'),
@@ -936,7 +1070,7 @@ class StockAnalysisApp:
                     exit_reason=swing_trade_plan.get('exit_reason')
                 )
             source = f"swing:{symbol}"
-            self.save_usage_metadata(source=source, usage=usage)
+            await self.db.run(self.save_usage_metadata, source=source, usage=usage)
 
             self.logger.info(f"Swing trade analysis complete.")
             return {
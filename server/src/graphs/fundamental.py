@@ -1,4 +1,7 @@
 import json
+import time
+import uuid
+import asyncio
 from typing import Dict, List
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Annotated
@@ -7,6 +10,8 @@ import operator
 from langchain_core.prompts import PromptTemplate
 from langgraph.graph import StateGraph, START, END
 from langchain_core.runnables import Runnable
+from langchain_core.caches import BaseCache
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph.message import add_messages
 from langchain_google_genai import ChatGoogleGenerativeAI
 
@@ -17,7 +22,9 @@ from providers.yfinance import YFinanceProvider
 from providers.alphavantage import AlphaVantageProvider
 from models.marketdata import HistoricalTrackedValues
 from utils.prompts import system_message
-from utils.common import merge_dict_results, take_latest_value
+from utils.concurrency import provider_limit
+from services.llm_cache import is_cache_hit
+from utils.common import merge_dict_results, take_latest_value, timed_node, timing_report
 from graphs.technical import TechnicalAnalysisGraph
 
 class State(TypedDict):
@@ -31,15 +38,23 @@ class State(TypedDict):
     # Also use our custom merge function for usage dict
     usage: Annotated[Dict[str, dict], merge_dict_results]  # For per-node usage and API tracking
     period: Annotated[str, take_latest_value]  # For technical analysis - will use latest value
+    timings: Annotated[Dict[str, dict], merge_dict_results]  # Per-node start time and duration
+    bypass_cache: Annotated[bool, take_latest_value]  # Skip the LLM response cache for this run
+
+DATA_NODES = ["technical", "market", "dividend", "news"]
 
 class FundamentalGraph:
-    def __init__(self, llm: ChatGoogleGenerativeAI, yfinance_provider: YFinanceProvider, alphavantage_provider: AlphaVantageProvider):
+    def __init__(self, llm: ChatGoogleGenerativeAI, yfinance_provider: YFinanceProvider, alphavantage_provider: AlphaVantageProvider, llm_cache: Optional[BaseCache] = None, checkpointer: Optional[BaseCheckpointSaver] = None):
         # Use module-level logger
         self.llm = llm
+        # Copy of the LLM that reads/writes the prompt cache, used by the nodes whose inputs are pure LLM output
+        self.cached_llm = llm.model_copy(update={"cache": llm_cache}) if llm_cache is not None else llm
         self.handler = VerboseFileCallbackHandler(graph_name=self.__class__.__name__)
         self.technical_graph = TechnicalAnalysisGraph(llm=llm, yfinance_provider=yfinance_provider, alphavantage_provider=alphavantage_provider)
         self.yfinance_provider = yfinance_provider
         self.alphavantage_provider = alphavantage_provider
+        # Persists state after every step so a failed run can resume from its last completed node
+        self.checkpointer = checkpointer
         self.graph = self.create_analysis_graph()
 
     # Market Analysis Node (without dividend analysis)
@@ -51,8 +66,10 @@ class FundamentalGraph:
         llm = self.llm
         alphavantage_provider = self.alphavantage_provider
 
-        data, market_request_count = alphavantage_provider.get_market_data(symbol)
-        earnings_history, earnings_request_count = alphavantage_provider.get_earnings_history(symbol)
+        (data, market_request_count), (earnings_history, earnings_request_count) = await asyncio.gather(
+            alphavantage_provider.get_market_data_async(symbol),
+            alphavantage_provider.get_earnings_history_async(symbol),
+        )
 
         if data is None:
             logger.error(f"No market data available for {symbol}. Stopping graph execution.")
@@ -100,20 +117,20 @@ class FundamentalGraph:
             "data": json.dumps(data.model_dump(), indent=2), 
             "earnings": json.dumps(earnings_history.model_dump(), indent=2)})
 
-        state["results"]["market"] = {
-            "data": {
-                "market": data.model_dump(),
-                "earnings": earnings_history.model_dump(),
-            },
-            "analysis": analysis.content
-        }
-        # Store usage metadata and api usage in state["usage"]
         total_request_count = market_request_count + earnings_request_count
-        state["usage"]["market_analysis"] = {
-            "token_usage": getattr(analysis, "usage_metadata", None),
-            "api_usage": {"alphavantage": total_request_count}
+        return {
+            "results": {"market": {
+                "data": {
+                    "market": data.model_dump(),
+                    "earnings": earnings_history.model_dump(),
+                },
+                "analysis": analysis.content
+            }},
+            "usage": {"market_analysis": {
+                "token_usage": getattr(analysis, "usage_metadata", None),
+                "api_usage": {"alphavantage": total_request_count}
+            }}
         }
-        return state
 
     # Dividend Analysis Node
 
@@ -124,7 +141,8 @@ class FundamentalGraph:
         llm = self.llm
         yfinance_provider = self.yfinance_provider
 
-        dividend_history = yfinance_provider.get_dividend_history(symbol)
+        async with provider_limit("yfinance"):
+            dividend_history = await asyncio.to_thread(yfinance_provider.get_dividend_history, symbol)
 
         prompt = PromptTemplate.from_template(
             """Analyze the dividend history for {symbol}:
@@ -146,15 +164,16 @@ class FundamentalGraph:
             "dividends": json.dumps(dividend_history.model_dump(), indent=2)
         })
 
-        state["results"]["dividend"] = {
-            "data": dividend_history.model_dump(),
-            "analysis": analysis.content
-        }
-        state["usage"]["dividend_analysis"] = {
-            "token_usage": getattr(analysis, "usage_metadata", None),
-            "api_usage": None
+        return {
+            "results": {"dividend": {
+                "data": dividend_history.model_dump(),
+                "analysis": analysis.content
+            }},
+            "usage": {"dividend_analysis": {
+                "token_usage": getattr(analysis, "usage_metadata", None),
+                "api_usage": None
+            }}
         }
-        return state
 
     # News Analysis Node
 
@@ -165,7 +184,8 @@ class FundamentalGraph:
         llm = self.llm
         provider = self.yfinance_provider
 
-        news_data = provider.get_news(symbol)
+        async with provider_limit("yfinance"):
+            news_data = await asyncio.to_thread(provider.get_news, symbol)
 
         prompt = PromptTemplate.from_template(
             """Analyze these recent news items for {symbol}:
@@ -186,22 +206,27 @@ class FundamentalGraph:
         chain = prompt | llm
         analysis = await chain.ainvoke({"symbol": symbol, "news": json.dumps(news_data.model_dump(), indent=2)})
 
-        state["results"]["news"] = {
-            "data": news_data.model_dump(),
-            "analysis": analysis.content
-        }
-        state["usage"]["news_analysis"] = {
-            "token_usage": getattr(analysis, "usage_metadata", None),
-            "api_usage": None
+        return {
+            "results": {"news": {
+                "data": news_data.model_dump(),
+                "analysis": analysis.content
+            }},
+            "usage": {"news_analysis": {
+                "token_usage": getattr(analysis, "usage_metadata", None),
+                "api_usage": None
+            }}
         }
-        return state
+
+    def _node_llm(self, state: State):
+        """LLM for the validate/revise/recommendation/export nodes: cached unless the run bypasses the cache."""
+        return self.llm if state.get("bypass_cache") else self.cached_llm
 
     # Validate Section Node
     async def validate_section(self, state: State, section: str) -> State:
         """Reusable node to validate a specific section against its raw data."""
         symbol = state["symbol"]
         logger.info(f"Validating {section} section for {symbol}...")
-        llm = self.llm
+        llm = self._node_llm(state)
         results = state["results"]
 
         prompt = PromptTemplate.from_template(
@@ -233,18 +258,20 @@ class FundamentalGraph:
         })
 
         # Store the validation result under a section-specific key
-        state["results"][f"validate_{section}"] = validation.content
-        state["usage"][f"validate_{section}"] = {
-            "token_usage": getattr(validation, "usage_metadata", None),
-            "api_usage": None
+        return {
+            "results": {f"validate_{section}": validation.content},
+            "usage": {f"validate_{section}": {
+                "token_usage": getattr(validation, "usage_metadata", None),
+                "api_usage": None,
+                "cache_hit": is_cache_hit(validation)
+            }}
         }
-        return state
 
     async def revise_section(self, state: State, section: str) -> State:
         """Reusable node to revise a specific section based on fact-checker corrections."""
         symbol = state["symbol"]
         logger.info(f"Revising {section} section for {symbol} based on fact-checker corrections...")
-        llm = self.llm
+        llm = self._node_llm(state)
         results = state["results"]
 
         prompt = PromptTemplate.from_template(
@@ -273,14 +300,16 @@ class FundamentalGraph:
             "validation_notes": validation_notes
         })
 
-        state["results"][f"revised_{section}"] = {
-            "analysis": revised_section.content,
-        }
-        state["usage"][f"revised_{section}"] = {
-            "token_usage": getattr(revised_section, "usage_metadata", None),
-            "api_usage": None
+        return {
+            "results": {f"revised_{section}": {
+                "analysis": revised_section.content,
+            }},
+            "usage": {f"revised_{section}": {
+                "token_usage": getattr(revised_section, "usage_metadata", None),
+                "api_usage": None,
+                "cache_hit": is_cache_hit(revised_section)
+            }}
         }
-        return state
 
     # Final Recommendation Node
 
@@ -288,7 +317,7 @@ class FundamentalGraph:
         """Node for final recommendation"""
         symbol = state["symbol"]
         logger.info(f"Generating final recommendation for {symbol}...")
-        llm = self.llm
+        llm = self._node_llm(state)
         results = state["results"]
 
         prompt = PromptTemplate.from_template(
@@ -339,19 +368,21 @@ class FundamentalGraph:
             "news": get_section("news", "")
         })
 
-        state["results"]["recommendation"] = final_recommendation.content
-        state["usage"]["generate_recommendation"] = {
-            "token_usage": getattr(final_recommendation, "usage_metadata", None),
-            "api_usage": None
+        return {
+            "results": {"recommendation": final_recommendation.content},
+            "usage": {"generate_recommendation": {
+                "token_usage": getattr(final_recommendation, "usage_metadata", None),
+                "api_usage": None,
+                "cache_hit": is_cache_hit(final_recommendation)
+            }}
         }
-        return state
 
 
     async def export_analysis(self, state: dict) -> dict:
         """Node for exporting the analysis to a structured format. Accepts output_type as a parameter."""
         symbol = state["symbol"]
         logger.info(f"Exporting analysis for {symbol}...")
-        llm = self.llm
+        llm = self._node_llm(state)
         results = state["results"]
 
 
@@ -381,30 +412,40 @@ class FundamentalGraph:
                 return revised
             return results.get(section_name, {}).get("analysis", default)
 
-        chain = prompt | llm.with_structured_output(HistoricalTrackedValues)
+        # include_raw keeps the underlying AIMessage so token usage and cache hits can be recorded
+        chain = prompt | llm.with_structured_output(HistoricalTrackedValues, include_raw=True)
 
-        structured_data = await chain.ainvoke({
+        output = await chain.ainvoke({
             "symbol": symbol,
             "technical": get_section("technical", ""),
             "market": get_section("market", ""),
             "news": get_section("news", ""),
             "recommendation": results.get("recommendation", "")
         })
+        if output["parsed"] is None:
+            raise output["parsing_error"] or ValueError(f"Structured output for {symbol} could not be parsed")
+        raw = output["raw"]
 
-        state["results"]["structured_data"] = structured_data.model_dump()
-        state["usage"]["export_analysis"] = {
-            "token_usage": None, # usage_metadata is not available when using llm.with_structured_output
-            "api_usage": None
+        return {
+            "results": {"structured_data": output["parsed"].model_dump()},
+            "usage": {"export_analysis": {
+                "token_usage": getattr(raw, "usage_metadata", None),
+                "api_usage": None,
+                "cache_hit": is_cache_hit(raw)
+            }}
         }
-        return state
 
     def create_analysis_graph(self) -> Runnable:
         """Create the analysis workflow graph with technical analysis node included."""
         graph = StateGraph(State)
-        graph.add_node("technical", self.technical_graph.technical_analysis)
-        graph.add_node("market", self.market_analysis)
-        graph.add_node("dividend", self.dividend_analysis)
-        graph.add_node("news", self.news_analysis)
+
+        def add_node(name, node):
+            graph.add_node(name, timed_node(name, node))
+
+        add_node("technical", self.technical_graph.technical_analysis)
+        add_node("market", self.market_analysis)
+        add_node("dividend", self.dividend_analysis)
+        add_node("news", self.news_analysis)
         # Add per-section validation nodes using async functions
         async def validate_technical(state):
             return await self.validate_section(state, "technical")
@@ -415,10 +456,10 @@ class FundamentalGraph:
         async def validate_news(state):
             return await self.validate_section(state, "news")
 
-        graph.add_node("validate_technical", validate_technical)
-        graph.add_node("validate_market", validate_market)
-        graph.add_node("validate_dividend", validate_dividend)
-        graph.add_node("validate_news", validate_news)
+        add_node("validate_technical", validate_technical)
+        add_node("validate_market", validate_market)
+        add_node("validate_dividend", validate_dividend)
+        add_node("validate_news", validate_news)
 
         # Add per-section revise nodes using async functions
         async def revise_technical(state):
@@ -430,57 +471,55 @@ class FundamentalGraph:
         async def revise_news(state):
             return await self.revise_section(state, "news")
 
-        graph.add_node("revise_technical", revise_technical)
-        graph.add_node("revise_market", revise_market)
-        graph.add_node("revise_dividend", revise_dividend)
-        graph.add_node("revise_news", revise_news)
-        graph.add_node("recommendation", self.generate_recommendation)
-        graph.add_node("export_analysis", self.export_analysis)
-
-        # Define edges for the sequential first part of the analysis
-        graph.add_edge(START, "technical")
-        graph.add_edge("technical", "market")
-        graph.add_edge("market", "dividend")
-        graph.add_edge("dividend", "news")
-
-        # Fan out from news to validation nodes (parallelization)
-        graph.add_edge("news", "validate_technical")
-        graph.add_edge("news", "validate_market")
-        graph.add_edge("news", "validate_dividend")
-        graph.add_edge("news", "validate_news")
-        
+        add_node("revise_technical", revise_technical)
+        add_node("revise_market", revise_market)
+        add_node("revise_dividend", revise_dividend)
+        add_node("revise_news", revise_news)
+        add_node("recommendation", self.generate_recommendation)
+        add_node("export_analysis", self.export_analysis)
+
+        # The data/analysis nodes are independent: fan out from START so they run concurrently
+        for node in DATA_NODES:
+            graph.add_edge(START, node)
+
+        # Join node: a multi-source edge waits for every data node before validation starts
+        async def join_data(state):
+            logger.info(f"All {len(DATA_NODES)} data sections complete for {state['symbol']}. Proceeding to validation.")
+            return {}
+
+        graph.add_node("join_data", join_data)
+        graph.add_edge(DATA_NODES, "join_data")
+
+        # Fan out from the join to validation nodes (parallelization)
+        for section in DATA_NODES:
+            graph.add_edge("join_data", f"validate_{section}")
+
         # Connect each validation node to its corresponding revision node
-        graph.add_edge("validate_technical", "revise_technical")
-        graph.add_edge("validate_market", "revise_market")
-        graph.add_edge("validate_dividend", "revise_dividend")
-        graph.add_edge("validate_news", "revise_news")
-        
+        for section in DATA_NODES:
+            graph.add_edge(f"validate_{section}", f"revise_{section}")
+
         # Add a join node to wait for all revisions before proceeding
         async def join_revisions(state):
-            # Only proceed if all revised sections are present
-            required = ["technical", "market", "dividend", "news"]
-            if all(f"revised_{section}" in state["results"] for section in required):
-                logger.info(f"All {len(required)} sections validated and revised. Proceeding to recommendation.")
-                return state
-            # Count how many are done
-            completed = sum(1 for section in required if f"revised_{section}" in state["results"])
-            logger.info(f"Waiting for all sections to be revised. Progress: {completed}/{len(required)}")
-            # Otherwise, do nothing (graph will wait)
-            return None
+            logger.info(f"All {len(DATA_NODES)} sections validated and revised. Proceeding to recommendation.")
+            return {}
 
         graph.add_node("join_revisions", join_revisions)
-        graph.add_edge("revise_technical", "join_revisions")
-        graph.add_edge("revise_market", "join_revisions")
-        graph.add_edge("revise_dividend", "join_revisions")
-        graph.add_edge("revise_news", "join_revisions")
+        graph.add_edge([f"revise_{section}" for section in DATA_NODES], "join_revisions")
         graph.add_edge("join_revisions", "recommendation")
         graph.add_edge("recommendation", "export_analysis")
         graph.add_edge("export_analysis", END)
-        return graph.compile()
+        return graph.compile(checkpointer=self.checkpointer)
+
+    async def analyze_stock(self, symbol: str, bypass_cache: bool = False, run_id: Optional[str] = None) -> Dict:
+        """Run complete stock analysis.
 
-    async def analyze_stock(self, symbol: str) -> Dict:
-        """Run complete stock analysis"""
+        With a checkpointer and a `run_id`, a run that already has checkpoints is resumed from
+        its last completed step instead of starting over.
+        """
         logger.info(f"Analyzing {symbol}...")
+        config = {"callbacks": [self.handler]}
+        if self.checkpointer is not None:
+            config["configurable"] = {"thread_id": run_id or str(uuid.uuid4())}
 
         # Initialize state
         init_state: State = {
@@ -490,14 +529,26 @@ class FundamentalGraph:
             "symbol": symbol,
             "results": {},
             "usage": {},  # Explicitly initialize usage dict
-            "period": "1y"  # Set period to 1y for technical analysis
+            "period": "1y",  # Set period to 1y for technical analysis
+            "timings": {},
+            "bypass_cache": bypass_cache
         }
 
-        # Run analysis
-        final_state = await self.graph.ainvoke(init_state, config={"callbacks": [self.handler]})
+        # Run analysis; None input continues a checkpointed run instead of starting a new one
+        graph_input = init_state
+        if run_id and self.checkpointer is not None:
+            snapshot = await self.graph.aget_state(config)
+            if snapshot.values:
+                logger.info(f"Resuming analysis of {symbol} (run {run_id}) before {list(snapshot.next) or 'end'}")
+                graph_input = None
+        start = time.perf_counter()
+        final_state = await self.graph.ainvoke(graph_input, config=config)
+        timings = timing_report(final_state.get("timings", {}), time.perf_counter() - start)
+        logger.info(f"Analysis timings for {symbol}: {json.dumps(timings)}")
         return {
             "results": final_state["results"],
-            "usage": final_state.get("usage", {})
+            "usage": final_state.get("usage", {}),
+            "timings": timings
         }
 
     def get_report_str(self, symbol: str, results: Dict) -> str:
@@ -533,8 +584,9 @@ class FundamentalGraph:
         """Compare multiple stocks and recommend the best one"""
         logger.info(f"Comparing {', '.join(symbols)}...")
         analyses = {}
-        for symbol in symbols:
-            results = await self.analyze_stock(symbol)
+        # Analyze all symbols concurrently; LLM concurrency is bounded by the model's callbacks
+        all_results = await asyncio.gather(*(self.analyze_stock(symbol) for symbol in symbols))
+        for symbol, results in zip(symbols, all_results):
             analyses[symbol] = results
             results_str = self.get_report_str(symbol, results)
             print(results_str)
@@ -2,8 +2,9 @@
 
 
 import json
-from typing import Dict, List, Annotated
-from datetime import datetime, timedelta
+import asyncio
+from typing import Dict, List, Optional, Tuple, Annotated
+from datetime import date, timedelta
 from typing_extensions import TypedDict
 from langchain_core.prompts import PromptTemplate
 from langgraph.graph import StateGraph, START, END
@@ -16,6 +17,14 @@ logger = setup_logger(__name__)
 from providers.fred import FredProvider
 from models.models import Portfolio
 
+# Days of FRED data the economic analysis looks back over
+ECONOMIC_WINDOW_DAYS = 180
+
+def economic_window(today: Optional[date] = None) -> Tuple[date, date]:
+    """The (start, end) dates of the FRED window analyzed on `today`."""
+    end = today or date.today()
+    return end - timedelta(days=ECONOMIC_WINDOW_DAYS), end
+
 # State object for PortfolioGraph
 class State(TypedDict):
     messages: Annotated[list, add_messages]
@@ -24,7 +33,6 @@ class State(TypedDict):
     holdings: List[dict]
     cash_balance: float
     llm: any
-    fred_provider: FredProvider
     results: Dict
     usage: Dict[str, dict]
 
@@ -69,16 +77,19 @@ class PortfolioGraph:
         }
         return state
     
-    # Economic Analysis Node (Portfolio-level, macroeconomic context)
-    async def economic_analysis(self, state: State) -> State:
-        """Node for macroeconomic/economic analysis using FRED data"""
-        logger.info("Running economic (macro) analysis using FRED data...")
-        llm = state["llm"]
-        # Use last 180 days for FRED data
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        start_date = (datetime.now() - timedelta(days=180)).strftime("%Y-%m-%d")
-        fred_provider = state.get("fred_provider")
-        fred_trends, request_count = fred_provider.get_series_trend(start_date=start_date, end_date=end_date) if fred_provider else {}
+    # Economic Analysis (macroeconomic context shared by every portfolio)
+    async def analyze_economy(self, window_start: date, window_end: date, fred_provider: Optional[FredProvider] = None) -> Dict:
+        """Macroeconomic analysis of FRED data over the window. Runs outside the per-portfolio graph so it can be shared."""
+        logger.info(f"Running economic (macro) analysis using FRED data from {window_start} to {window_end}...")
+        llm = self.llm
+        owns_provider = fred_provider is None
+        fred_provider = fred_provider or FredProvider()
+        try:
+            fred_trends, request_count = await fred_provider.get_series_trend_async(start_date=window_start.isoformat(), end_date=window_end.isoformat())
+        finally:
+            if owns_provider:
+                # close() joins the client's loop thread, which must not block this loop
+                await asyncio.to_thread(fred_provider.close)
 
         prompt = PromptTemplate.from_template(
             """
@@ -119,13 +130,17 @@ class PortfolioGraph:
             "yield_curve": json.dumps(fred_trends.get("yield_curve", {})),
             "housing_starts": json.dumps(fred_trends.get("housing_starts", {})),
             "ppi": json.dumps(fred_trends.get("ppi", {}))
-        })
-        state["results"]["economic_analysis"] = analysis.content
-        state["usage"]["economic_analysis"] = {
-            "token_usage": getattr(analysis, "usage_metadata", None),
-            "api_usage": {"fred": request_count}
+        }, config={"callbacks": [self.handler]})
+        return {
+            "analysis": analysis.content,
+            "trends": fred_trends,
+            "usage": {
+                "economic_analysis": {
+                    "token_usage": getattr(analysis, "usage_metadata", None),
+                    "api_usage": {"fred": request_count}
+                }
+            }
         }
-        return state
 
     async def portfolio_analysis(self, state: State) -> State:
         """Node for portfolio-level analysis"""
@@ -174,20 +189,17 @@ class PortfolioGraph:
     # Portfolio Graph
     def create_portfolio_graph(self) -> Runnable:
         workflow = StateGraph(State)
-        workflow.add_node("economic_analysis", self.economic_analysis)
         workflow.add_node("dca_analysis", self.dca_analysis)
         workflow.add_node("portfolio_analysis", self.portfolio_analysis)
-        workflow.add_edge(START, "economic_analysis")
-        workflow.add_edge("economic_analysis", "dca_analysis")
+        workflow.add_edge(START, "dca_analysis")
         workflow.add_edge("dca_analysis", "portfolio_analysis")
         workflow.add_edge("portfolio_analysis", END)
         return workflow.compile()
 
-    async def analyze_portfolio(self, summaries: List[str], holdings: List[dict], portfolio: Portfolio, cash_balance: float = 0) -> Dict:
-        """Run portfolio analysis on a list of stock summaries and holdings, including cash balance"""
+    async def analyze_portfolio(self, summaries: List[str], holdings: List[dict], portfolio: Portfolio, cash_balance: float = 0, economic_analysis: str = "") -> Dict:
+        """Run portfolio analysis on a list of stock summaries and holdings, including cash balance and a precomputed economic analysis"""
         logger.info(f"Analyzing portfolio with {len(summaries)} summaries, {len(holdings)} holdings, and cash balance ${cash_balance}...")
         portfolio_graph = self.create_portfolio_graph()
-        fred_provider = FredProvider()  # Initialize FRED provider
         init_state: State = {
             "messages": [],
             "summaries": summaries,
@@ -195,8 +207,7 @@ class PortfolioGraph:
             "holdings": holdings,
             "cash_balance": cash_balance,
             "llm": self.llm,
-            "fred_provider": fred_provider,
-            "results": {},
+            "results": {"economic_analysis": economic_analysis},
             "usage": {}
         }
         final_state = await portfolio_graph.ainvoke(init_state, config={"callbacks": [self.handler]})
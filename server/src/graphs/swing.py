@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Dict, Annotated
 from typing_extensions import TypedDict
@@ -36,7 +37,7 @@ class SwingTradeGraph:
         provider = self.yfinance_provider
         llm = self.llm
         logger.info(f"Running pattern_analysis node for {symbol} (fetching 1d technical indicators)")
-        data_1d = provider.get_technical_indicators(symbol, period="5d")
+        data_1d = await asyncio.to_thread(provider.get_technical_indicators, symbol, period="5d")
         if data_1d is None:
             logger.error(f"No technical indicator data available for {symbol} with period '1d'. Stopping pattern analysis.")
             state["results"]["pattern_analysis"] = {
@@ -1,5 +1,6 @@
 
 import json
+import asyncio
 from typing import Dict, Annotated
 from typing_extensions import TypedDict
 from langchain_core.prompts import PromptTemplate
@@ -10,6 +11,7 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 
 from utils.langchain_handler import VerboseFileCallbackHandler
 from utils.logging import setup_logger
+from utils.concurrency import provider_limit
 logger = setup_logger(__name__)
 from providers.yfinance import YFinanceProvider
 from providers.alphavantage import AlphaVantageProvider
@@ -39,20 +41,25 @@ class TechnicalAnalysisGraph:
         provider = self.yfinance_provider
         period = state.get("period", "1d")
 
-        data = provider.get_technical_indicators(symbol, period=period)
+        async with provider_limit("yfinance"):
+            data = await asyncio.to_thread(provider.get_technical_indicators, symbol, period=period)
         if data is None:
             logger.error(f"No technical indicator data available for {symbol} with period '{period}'. Stopping graph execution.")
-            state["results"]["technical"] = {
-                "data": None,
-                "analysis": "No technical indicator data available. Analysis aborted."
-            }
-            state["usage"] = {
-                "technical_analysis": {
-                    "token_usage": None,
-                    "api_usage": None
+            # Return only the keys this node owns so it can run in parallel with other nodes
+            return {
+                "results": {
+                    "technical": {
+                        "data": None,
+                        "analysis": "No technical indicator data available. Analysis aborted."
+                    }
+                },
+                "usage": {
+                    "technical_analysis": {
+                        "token_usage": None,
+                        "api_usage": None
+                    }
                 }
             }
-            return state
 
         prompt = PromptTemplate.from_template(
             """Analyze these technical indicators for {symbol} over the last {period}:
@@ -83,17 +90,20 @@ class TechnicalAnalysisGraph:
             "period": period
         })
 
-        state["results"]["technical"] = {
-            "data": data.model_dump(),
-            "analysis": analysis.content
-        }
-        state["usage"] = {
-            "technical_analysis": {
-                "token_usage": getattr(analysis, "usage_metadata", None),
-                "api_usage": None
+        return {
+            "results": {
+                "technical": {
+                    "data": data.model_dump(),
+                    "analysis": analysis.content
+                }
+            },
+            "usage": {
+                "technical_analysis": {
+                    "token_usage": getattr(analysis, "usage_metadata", None),
+                    "api_usage": None
+                }
             }
         }
-        return state
     
     def create_graph(self):
         """Create the technical analysis graph (no export_analysis node)."""
@@ -2,12 +2,15 @@
 from typing import List, Optional, Union
 import os
 import logging
+import json
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from models.models import StockSplit
 
 from utils.logging import setup_logger
 from app import StockAnalysisApp
+from services.db_pool import DatabaseConnectionMiddleware
 from models.models import Stock
 from datetime import date, datetime
 
@@ -21,15 +24,28 @@ logger = setup_logger("api")
 
 # Initialize the app
 stock_app = StockAnalysisApp()
+# Each request checks out its own pooled connection and returns it when the response is done
+app.add_middleware(DatabaseConnectionMiddleware, scope_factory=stock_app.db_manager.connection_scope)
+
+@app.on_event("shutdown")
+def shutdown():
+    stock_app.shutdown()
 
 # Models
 class StockRequest(BaseModel):
     symbol: str
 
+class BatchAnalysisRequest(BaseModel):
+    symbols: List[str] = Field(..., description="Stock symbols to analyze")
+    max_api_calls: Optional[int] = Field(None, description="Daily Alpha Vantage call budget (optional)")
+    max_concurrency: Optional[int] = Field(None, description="Number of symbols analyzed at once (optional)")
+
 class StockResponse(BaseModel):
     message: str
     data: Union[str, dict, list]
     token_usage: Optional[dict] = None
+    run_id: Optional[str] = None
+    next_cursor: Optional[str] = None
 
 class TransactionRequest(BaseModel):
     symbol: str = Field(..., description="Stock symbol")
@@ -76,7 +92,12 @@ async def root():
         "message": "Stock Analysis API is running",
         "endpoints": {
             "/analyze/{symbol}": "Get full analysis for a single stock",
+            "/analyze/batch": "Analyze multiple stocks concurrently (streams NDJSON)",
+            "/analyze/runs": "List failed or interrupted analysis runs",
+            "/analyze/runs/{run_id}/resume": "Resume an analysis run from its last checkpoint",
             "/compare": "Compare multiple stocks",
+            "/screener": "Filter and sort stocks on their latest research",
+            "/dashboard/snapshots": "Latest historical and technical values for every stock",
             "/dividends/{symbol}": "Get dividend history for a stock",
             "/news/{symbol}": "Get news for a stock",
             "/market/{symbol}": "Get market data for a stock",
@@ -91,7 +112,7 @@ async def root():
 async def add_stock(stock: StockRequest) -> StockResponse:
     """Add a new stock to the database"""
     try:
-        result = stock_app.add_stock(stock.symbol)
+        result = await stock_app.add_stock(stock.symbol)
         return StockResponse(**result)
     except Exception as e:
         handle_api_exception(e, "Error adding stock")
@@ -100,30 +121,19 @@ async def add_stock(stock: StockRequest) -> StockResponse:
 async def get_stocks() -> StockResponse:
     """Get all stocks from the database"""
     try:
-        result = stock_app.get_all_stocks()
+        result = await stock_app.db.run(stock_app.get_all_stocks)
         return StockResponse(**result)
     except Exception as e:
         handle_api_exception(e, "Error getting all stocks")
 
 @app.get("/stocks/research")
-async def get_stocks_research_history(limit: int = 20):
+async def get_stocks_research_history(limit: int = 20, cursor: Optional[str] = Query(None, description="next_cursor of the previous page")):
     """Get research history for all stocks (latest first)"""
     try:
-        dbm = stock_app.db_manager
-        entries = dbm.get_all_research_history_list(limit)
-        data = [
-            {
-                "id": entry["id"] if isinstance(entry, dict) else entry.id,
-                "symbol": entry["symbol"] if isinstance(entry, dict) else entry.stock.symbol,
-                "created_at": entry["created_at"] if isinstance(entry, dict) else str(entry.created_at),
-                "final_recommendation": entry.get("final_recommendation") if isinstance(entry, dict) else None,
-                "final_confidence_score": entry.get("final_confidence_score") if isinstance(entry, dict) else None,
-                "high_price_target": entry.get("high_price_target") if isinstance(entry, dict) else None,
-                "price_target_percent": entry.get("price_target_percent") if isinstance(entry, dict) else None
-            }
-            for entry in entries
-        ]
-        return StockResponse(message="Research history fetched", data=data)
+        data, next_cursor = await stock_app.db.get_all_research_history_list(limit, cursor=cursor)
+        return StockResponse(message="Research history fetched", data=data, next_cursor=next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         handle_api_exception(e, "Error getting stocks research history")
 
@@ -131,15 +141,17 @@ async def get_stocks_research_history(limit: int = 20):
 async def get_stock_splits():
     """Get all stock splits in the database"""
     try:
-        splits = StockSplit.select().join(Stock).order_by(Stock.symbol, StockSplit.effective_date.desc())
-        data = [
-            {
-                "symbol": split.stock.symbol,
-                "effective_date": str(split.effective_date),
-                "split_factor": split.split_factor
-            }
-            for split in splits
-        ]
+        def load_splits():
+            splits = StockSplit.select().join(Stock).order_by(Stock.symbol, StockSplit.effective_date.desc())
+            return [
+                {
+                    "symbol": split.stock.symbol,
+                    "effective_date": str(split.effective_date),
+                    "split_factor": split.split_factor
+                }
+                for split in splits
+            ]
+        data = await stock_app.db.run(load_splits)
         return StockResponse(message="Stock splits fetched", data=data)
     except Exception as e:
         handle_api_exception(e, "Error getting stock splits")
@@ -153,24 +165,74 @@ async def sync_stock_splits_endpoint():
     except Exception as e:
         handle_api_exception(e, "Error syncing stock splits")
 
+@app.get("/screener")
+async def screener(
+    recommendation: Optional[str] = Query(None, description="Final recommendation, e.g. BUY (case-insensitive)"),
+    min_confidence: Optional[float] = Query(None, description="Minimum final confidence score (0-10)"),
+    min_price_target_percent: Optional[float] = Query(None, description="Minimum percent to the high price target"),
+    order_by: str = Query("price_target_percent", description="price_target_percent, final_confidence_score, high_price_target or created_at"),
+    descending: bool = Query(True, description="Sort descending"),
+    limit: int = Query(50, description="Maximum rows (max 200)")
+) -> StockResponse:
+    """Screen stocks on their latest research"""
+    try:
+        result = await stock_app.db.run(
+            stock_app.screen_stocks,
+            recommendation=recommendation,
+            min_confidence=min_confidence,
+            min_price_target_percent=min_price_target_percent,
+            order_by=order_by,
+            descending=descending,
+            limit=limit
+        )
+        return StockResponse(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        handle_api_exception(e, "Error screening stocks")
+
+@app.get("/dashboard/snapshots")
+async def dashboard_snapshots(
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols (all stocks if omitted)")
+) -> StockResponse:
+    """Get the latest historical and technical values of every stock"""
+    try:
+        symbol_list = [s.strip() for s in symbols.split(",") if s.strip()] if symbols else None
+        result = await stock_app.db.run(stock_app.get_dashboard_snapshots, symbol_list)
+        return StockResponse(**result)
+    except Exception as e:
+        handle_api_exception(e, "Error getting dashboard snapshots")
+
 #
 # Stock Endpoints
 #
 @app.get("/stock/{symbol}/research")
-async def get_research(symbol: str) -> StockResponse:
-    """Get all research for a stock"""
+async def get_research(
+    symbol: str,
+    limit: int = Query(50, description="Page size (max 200)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+) -> StockResponse:
+    """Get a page of research listings for a stock (latest first)"""
     try:
-        result = stock_app.get_research(symbol)
+        result = await stock_app.db.run(stock_app.get_research, symbol, limit=limit, cursor=cursor)
         return StockResponse(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         handle_api_exception(e, "Error getting research")
 
 @app.get("/stock/{symbol}/technical")
-async def get_technical_analyses(symbol: str) -> StockResponse:
-    """Get all technical analyses for a stock"""
+async def get_technical_analyses(
+    symbol: str,
+    limit: int = Query(50, description="Page size (max 200)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+) -> StockResponse:
+    """Get a page of technical analysis listings for a stock (latest first)"""
     try:
-        result = stock_app.get_technical_analyses(symbol)
+        result = await stock_app.db.run(stock_app.get_technical_analyses, symbol, limit=limit, cursor=cursor)
         return StockResponse(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         handle_api_exception(e, "Error getting technical analyses")
 
@@ -187,20 +249,21 @@ async def generate_technical_analysis(symbol: str) -> StockResponse:
 async def get_swing_analyses(symbol: str) -> StockResponse:
     """Get all swing trade analyses for a stock"""
     try:
-        dbm = stock_app.db_manager
-        stock = dbm.get_stock_by_symbol(symbol)
-        if not stock:
-            raise HTTPException(status_code=404, detail=f"Stock symbol {symbol} not found")
-        # Get all swing research entries for this stock
-        entries = list(stock.swingresearch.order_by(-stock.swingresearch.model.created_at))
-        data = [
-            {
-                "id": entry.id,
-                "symbol": entry.stock.symbol if entry.stock else None,
-                "created_at": str(entry.created_at),
-            }
-            for entry in entries
-        ]
+        def load_swing_analyses():
+            stock = stock_app.db_manager.get_stock_by_symbol(symbol)
+            if not stock:
+                raise HTTPException(status_code=404, detail=f"Stock symbol {symbol} not found")
+            # Get all swing research entries for this stock
+            entries = list(stock.swingresearch.order_by(-stock.swingresearch.model.created_at))
+            return [
+                {
+                    "id": entry.id,
+                    "symbol": entry.stock.symbol if entry.stock else None,
+                    "created_at": str(entry.created_at),
+                }
+                for entry in entries
+            ]
+        data = await stock_app.db.run(load_swing_analyses)
         return StockResponse(message=f"Swing trade analyses for {symbol} fetched", data=data)
     except Exception as e:
         handle_api_exception(e, "Error getting swing trade analyses")
@@ -218,18 +281,17 @@ async def generate_swing_analysis(symbol: str) -> StockResponse:
 async def save_swing_for_portfolio(symbol: str, portfolio_id: int) -> StockResponse:
     """Generate a swing trade analysis for a stock and save it to a portfolio (create a SwingStock entry)"""
     try:
-        dbm = stock_app.db_manager
-        portfolio = dbm.get_portfolio_by_id(portfolio_id)
+        portfolio = await stock_app.db.get_portfolio_by_id(portfolio_id)
         if not portfolio:
             raise HTTPException(status_code=404, detail=f"Portfolio id {portfolio_id} not found")
         # Ensure the stock exists (create if necessary)
-        stock, created = dbm.get_or_create_stock(symbol)
+        stock, created = await stock_app.db.get_or_create_stock(symbol)
         if not stock:
             raise HTTPException(status_code=500, detail=f"Unable to create or find stock {symbol}")
         # Generate swing analysis and store SwingResearch / plan history
         await stock_app.swing_trade_analysis(symbol)
         # Link this stock into the portfolio's swing list
-        swing = dbm.create_swing_stock(stock=stock, portfolio=portfolio)
+        swing = await stock_app.db.create_swing_stock(stock=stock, portfolio=portfolio)
         return StockResponse(message=f"Swing trade analysis for {symbol} generated and saved to portfolio {portfolio.name}", data={"symbol": symbol, "portfolio_id": portfolio.id, "swing_id": swing.id})
     except HTTPException:
         raise
@@ -240,8 +302,7 @@ async def save_swing_for_portfolio(symbol: str, portfolio_id: int) -> StockRespo
 async def delete_stock(stock_id: int) -> StockResponse:
     """Delete a stock from the database by id"""
     try:
-        dbm = stock_app.db_manager
-        deleted = dbm.delete_stock_by_id(stock_id)
+        deleted = await stock_app.db.delete_stock_by_id(stock_id)
         if deleted:
             return StockResponse(message=f"Stock deleted", data={"id": stock_id})
         else:
@@ -255,7 +316,7 @@ async def delete_stock(stock_id: int) -> StockResponse:
 async def get_research_report(research_id: int) -> StockResponse:
     """Get a research report by its ID"""
     try:
-        result = stock_app.get_research_report(research_id)
+        result = await stock_app.db.run(stock_app.get_research_report, research_id)
         return StockResponse(**result)
     except Exception as e:
         handle_api_exception(e, "Error getting research report")
@@ -264,7 +325,7 @@ async def get_research_report(research_id: int) -> StockResponse:
 async def get_technical_report_by_id(technical_id: int) -> StockResponse:
     """Get a technical analysis report by its ID"""
     try:
-        result = stock_app.get_technical_report(technical_id)
+        result = await stock_app.db.run(stock_app.get_technical_report, technical_id)
         return StockResponse(**result)
     except Exception as e:
         handle_api_exception(e, "Error getting technical report")
@@ -273,32 +334,69 @@ async def get_technical_report_by_id(technical_id: int) -> StockResponse:
 async def get_swing_analysis_by_id(swing_id: int) -> StockResponse:
     """Get a swing trade analysis by its ID"""
     try:
-        dbm = stock_app.db_manager
         from models.models import SwingResearch
-        entry = SwingResearch.get_or_none(SwingResearch.id == swing_id)
-        if not entry:
-            raise HTTPException(status_code=404, detail=f"Swing trade analysis id {swing_id} not found")
-        data = {
-            "id": entry.id,
-            "type": "swing",
-            "stock": entry.stock.symbol if entry.stock else None,
-            "created_at": str(entry.created_at),
-            "pattern_analysis": entry.pattern_analysis,
-            "trade_recommendation": entry.trade_recommendation
-        }
+        def load_swing():
+            entry = SwingResearch.get_or_none(SwingResearch.id == swing_id)
+            if not entry:
+                raise HTTPException(status_code=404, detail=f"Swing trade analysis id {swing_id} not found")
+            return {
+                "id": entry.id,
+                "type": "swing",
+                "stock": entry.stock.symbol if entry.stock else None,
+                "created_at": str(entry.created_at),
+                "pattern_analysis": entry.pattern_analysis,
+                "trade_recommendation": entry.trade_recommendation
+            }
+        data = await stock_app.db.run(load_swing)
         return StockResponse(message="Swing trade analysis fetched", data=data)
     except Exception as e:
         handle_api_exception(e, "Error getting swing trade analysis by id")
 
+# Registered before /analyze/{symbol} so "runs" is not taken as a symbol
+@app.get("/analyze/runs")
+async def list_incomplete_runs():
+    """List analysis runs that failed or did not finish and can be resumed"""
+    try:
+        return await stock_app.db.run(stock_app.get_incomplete_runs)
+    except Exception as e:
+        handle_api_exception(e, "Error listing analysis runs")
+
+@app.post("/analyze/runs/{run_id}/resume")
+async def resume_analysis(run_id: str) -> StockResponse:
+    """Resume a failed analysis run from its last completed node"""
+    try:
+        result = await stock_app.resume_analysis(run_id)
+        return StockResponse(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        handle_api_exception(e, "Error resuming analysis")
+
 @app.get("/analyze/{symbol}")
-async def analyze_stock(symbol: str) -> StockResponse:
+async def analyze_stock(symbol: str, bypass_cache: bool = Query(False, description="Skip the LLM response cache and re-run every prompt")) -> StockResponse:
     """Get a full analysis for a single stock"""
     try:
-        result = await stock_app.analyze_stock(symbol)
+        result = await stock_app.analyze_stock(symbol, bypass_cache=bypass_cache)
         return StockResponse(**result)
     except Exception as e:
         handle_api_exception(e, "Error analyzing stock")
 
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """Analyze many stocks concurrently, streaming one NDJSON line per symbol as each finishes"""
+    if not request.symbols:
+        raise HTTPException(status_code=400, detail="At least one symbol is required")
+
+    async def stream():
+        async for result in stock_app.analyze_stocks_batch(
+            request.symbols,
+            max_api_calls=request.max_api_calls,
+            max_concurrency=request.max_concurrency,
+        ):
+            yield json.dumps(result.to_dict(), default=str) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.post("/compare")
 async def compare_stocks(symbols: List[str]) -> StockResponse:
     """Compare multiple stocks"""
@@ -354,8 +452,7 @@ async def get_technical_data(symbol: str) -> StockResponse:
 async def get_portfolios() -> PortfolioResponse:
     """Get all portfolios"""
     try:
-        dbm = stock_app.db_manager
-        portfolios = dbm.get_portfolios() 
+        portfolios = await stock_app.db.get_portfolios()
         data = [
             {
                 "id": p.id,
@@ -372,8 +469,7 @@ async def get_portfolios() -> PortfolioResponse:
 async def get_portfolio(portfolio_id: int) -> PortfolioResponse:
     """Get a single portfolio by id"""
     try:
-        dbm = stock_app.db_manager
-        portfolio = dbm.get_portfolio_by_id(portfolio_id)
+        portfolio = await stock_app.db.get_portfolio_by_id(portfolio_id)
         if not portfolio:
             raise HTTPException(status_code=404, detail="Portfolio not found")
         data = {
@@ -394,7 +490,7 @@ async def get_portfolio(portfolio_id: int) -> PortfolioResponse:
 async def get_portfolio_holdings(portfolio_id: int) -> TransactionResponse:
     """Get a comprehensive portfolio summary for a specific portfolio"""
     try:
-        result = stock_app.get_portfolio_holdings_combined(portfolio_id)
+        result = await stock_app.db.run(stock_app.get_portfolio_holdings_combined, portfolio_id)
         return TransactionResponse(message="Portfolio summary fetched", data=result)
     except Exception as e:
         handle_api_exception(e, "Error getting portfolio")
@@ -403,8 +499,7 @@ async def get_portfolio_holdings(portfolio_id: int) -> TransactionResponse:
 async def save_portfolio(request: PortfolioRequest) -> PortfolioResponse:
     """Create or update a portfolio"""
     try:
-        dbm = stock_app.db_manager
-        portfolio = dbm.save_portfolio(
+        portfolio = await stock_app.db.save_portfolio(
             portfolio_id=request.id,
             name=request.name,
             rules=request.rules,
@@ -426,8 +521,7 @@ async def save_portfolio(request: PortfolioRequest) -> PortfolioResponse:
 async def delete_portfolio(portfolio_id: int) -> PortfolioResponse:
     """Delete a portfolio by id"""
     try:
-        dbm = stock_app.db_manager
-        deleted = dbm.delete_portfolio(portfolio_id)
+        deleted = await stock_app.db.delete_portfolio(portfolio_id)
         if deleted:
             return PortfolioResponse(message="Portfolio deleted", data={"id": portfolio_id})
         else:
@@ -439,8 +533,7 @@ async def delete_portfolio(portfolio_id: int) -> PortfolioResponse:
 async def get_portfolio_research_history(portfolio_id: int, limit: int = 10) -> StockResponse:
     """Get portfolio research history (latest first)"""
     try:
-        dbm = stock_app.db_manager
-        entries = dbm.get_portfolio_research_history(limit, portfolio_id=portfolio_id)
+        entries = await stock_app.db.get_portfolio_research_history(limit, portfolio_id=portfolio_id)
         data = [
             {
                 "id": entry.id,
@@ -457,9 +550,8 @@ async def get_portfolio_research_history(portfolio_id: int, limit: int = 10) ->
 async def get_portfolio_research(research_id: int, portfolio_id: int) -> StockResponse:
     """Get a single portfolio research entry by ID"""
     try:
-        dbm = stock_app.db_manager
         if research_id == 0:
-            entry = dbm.get_latest_portfolio_research(portfolio_id=portfolio_id)
+            entry = await stock_app.db.get_latest_portfolio_research(portfolio_id=portfolio_id)
             if entry:
                 data = {
                     "id": entry.id,
@@ -474,7 +566,7 @@ async def get_portfolio_research(research_id: int, portfolio_id: int) -> StockRe
             else:
                 raise HTTPException(status_code=404, detail="No portfolio research entries found")
         else:
-            entry = dbm.get_portfolio_research_history_by_id(research_id, portfolio_id=portfolio_id)
+            entry = await stock_app.db.get_portfolio_research_history_by_id(research_id, portfolio_id=portfolio_id)
             if entry:
                 data = {
                     "id": entry.id,
@@ -507,8 +599,7 @@ async def analyze_portfolio(portfolio_id: int) -> StockResponse:
 async def get_cash_balance(portfolio_id: int) -> CashTransactionResponse:
     """Get the current cash balance"""
     try:
-        dbm = stock_app.db_manager
-        balance = dbm.get_current_cash_balance(portfolio_id=portfolio_id)
+        balance = await stock_app.db.get_current_cash_balance(portfolio_id=portfolio_id)
         return CashTransactionResponse(message="Current cash balance fetched", data={"balance": round(balance, 2)})
     except Exception as e:
         handle_api_exception(e, "Error getting cash balance")
@@ -517,8 +608,7 @@ async def get_cash_balance(portfolio_id: int) -> CashTransactionResponse:
 async def get_cash_transactions(portfolio_id: int, limit: int = 100) -> CashTransactionResponse:
     """Get cash transaction history (most recent first)"""
     try:
-        dbm = stock_app.db_manager
-        txns = dbm.get_cash_transactions(limit=limit, portfolio_id=portfolio_id)
+        txns = await stock_app.db.get_cash_transactions(limit=limit, portfolio_id=portfolio_id)
         data = [
             {
                 "id": txn.id,
@@ -537,8 +627,7 @@ async def get_cash_transactions(portfolio_id: int, limit: int = 100) -> CashTran
 async def add_cash_transaction(portfolio_id: int, txn: CashTransactionRequest) -> CashTransactionResponse:
     """Add a new cash transaction (deposit or withdrawal)"""
     try:
-        dbm = stock_app.db_manager
-        new_txn = dbm.create_cash_transaction(
+        new_txn = await stock_app.db.create_cash_transaction(
             portfolio_id=portfolio_id,
             action=txn.action,
             amount=txn.amount,
@@ -560,8 +649,7 @@ async def add_cash_transaction(portfolio_id: int, txn: CashTransactionRequest) -
 async def delete_portfolio_research(portfolio_id: int, research_id: int) -> StockResponse:
     """Delete a portfolio research entry by ID"""
     try:
-        dbm = stock_app.db_manager
-        deleted = dbm.delete_portfolio_research(research_id, portfolio_id=portfolio_id)
+        deleted = await stock_app.db.delete_portfolio_research(research_id, portfolio_id=portfolio_id)
         if deleted:
             return StockResponse(message="Portfolio research entry deleted", data={"id": research_id})
         else:
@@ -576,7 +664,7 @@ async def delete_portfolio_research(portfolio_id: int, research_id: int) -> Stoc
 async def get_all_transactions(portfolio_id: int) -> TransactionResponse:
     """Get all transactions in the database for a portfolio"""
     try:
-        result = stock_app.get_transactions(portfolio_id=portfolio_id)
+        result = await stock_app.db.run(stock_app.get_transactions, portfolio_id=portfolio_id)
         return TransactionResponse(message="All transactions fetched", data=result)
     except Exception as e:
         handle_api_exception(e, "Error getting all transactions")
@@ -585,7 +673,7 @@ async def get_all_transactions(portfolio_id: int) -> TransactionResponse:
 async def add_transaction(portfolio_id: int, txn: TransactionRequest) -> TransactionResponse:
     """Add a new stock transaction log entry for a portfolio"""
     try:
-        result = stock_app.add_transaction(txn, portfolio_id=portfolio_id)
+        result = await stock_app.add_transaction(txn, portfolio_id=portfolio_id)
         return TransactionResponse(message="Transaction added", data=result)
     except Exception as e:
         handle_api_exception(e, "Error adding transaction")
@@ -594,7 +682,7 @@ async def add_transaction(portfolio_id: int, txn: TransactionRequest) -> Transac
 async def get_transactions(portfolio_id: int, symbol: str) -> TransactionResponse:
     """Get all transactions for a stock symbol in a portfolio"""
     try:
-        result = stock_app.get_transactions(symbol, portfolio_id=portfolio_id)
+        result = await stock_app.db.run(stock_app.get_transactions, symbol, portfolio_id=portfolio_id)
         return TransactionResponse(message="Transactions fetched", data=result)
     except Exception as e:
         handle_api_exception(e, "Error getting transactions")
@@ -603,7 +691,7 @@ async def get_transactions(portfolio_id: int, symbol: str) -> TransactionRespons
 async def get_transaction(portfolio_id: int, transaction_id: int) -> TransactionResponse:
     """Get a transaction by its ID in a portfolio"""
     try:
-        result = stock_app.get_transaction(transaction_id, portfolio_id=portfolio_id)
+        result = await stock_app.db.run(stock_app.get_transaction, transaction_id, portfolio_id=portfolio_id)
         if result:
             return TransactionResponse(message="Transaction fetched", data=result)
         else:
@@ -615,7 +703,7 @@ async def get_transaction(portfolio_id: int, transaction_id: int) -> Transaction
 async def delete_transaction(portfolio_id: int, transaction_id: int) -> TransactionResponse:
     """Delete a transaction by its ID in a portfolio"""
     try:
-        deleted = stock_app.delete_transaction(transaction_id, portfolio_id=portfolio_id)
+        deleted = await stock_app.db.run(stock_app.delete_transaction, transaction_id, portfolio_id=portfolio_id)
         if deleted:
             return TransactionResponse(message="Transaction deleted", data=None)
         else:
@@ -632,7 +720,7 @@ async def usage_provider(
 ) -> StockResponse:
     """List API usage records for a provider and date range"""
     try:
-        data = stock_app.get_provider_usage(provider=provider, start_date=start_date, end_date=end_date)
+        data = await stock_app.db.run(stock_app.get_provider_usage, provider=provider, start_date=start_date, end_date=end_date)
         return StockResponse(message="API usage records fetched", data=data)
     except Exception as e:
         handle_api_exception(e, "Error getting usage provider")
@@ -644,11 +732,44 @@ async def usage_token(
 ) -> StockResponse:
     """List token usage records for LLM calls in a date range"""
     try:
-        data = stock_app.get_token_usage(start_date=start_date, end_date=end_date)
+        data = await stock_app.db.run(stock_app.get_token_usage, start_date=start_date, end_date=end_date)
         return StockResponse(message="Token usage records fetched", data=data)
     except Exception as e:
         handle_api_exception(e, "Error getting usage token")
 
+@app.get("/usage/provider/summary")
+async def usage_provider_summary(
+    group_by: str = Query("day", description="day, step, source (e.g. stock:AAPL) or provider"),
+    provider: str = Query(None, description="API provider name (optional)"),
+    start_date: str = Query(None, description="Start date (YYYY-MM-DD, optional)"),
+    end_date: str = Query(None, description="End date (YYYY-MM-DD, optional)"),
+    limit: int = Query(50, description="Maximum rows (max 200)")
+) -> StockResponse:
+    """Aggregate API calls per day, step, source or provider"""
+    try:
+        data = await stock_app.db.run(stock_app.get_api_usage_summary, group_by=group_by, provider=provider, start_date=start_date, end_date=end_date, limit=limit)
+        return StockResponse(message="API usage summary fetched", data=data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        handle_api_exception(e, "Error getting usage provider summary")
+
+@app.get("/usage/token/summary")
+async def usage_token_summary(
+    group_by: str = Query("day", description="day, step or source (e.g. stock:AAPL)"),
+    start_date: str = Query(None, description="Start date (YYYY-MM-DD, optional)"),
+    end_date: str = Query(None, description="End date (YYYY-MM-DD, optional)"),
+    limit: int = Query(50, description="Maximum rows (max 200)")
+) -> StockResponse:
+    """Aggregate token usage per day, step or source"""
+    try:
+        data = await stock_app.db.run(stock_app.get_token_usage_summary, group_by=group_by, start_date=start_date, end_date=end_date, limit=limit)
+        return StockResponse(message="Token usage summary fetched", data=data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        handle_api_exception(e, "Error getting usage token summary")
+
 #
 # Scheduler
 #
@@ -680,13 +801,55 @@ async def trigger_job(job_id: str):
 async def system_backup():
     """Trigger a database backup and return the backup file path."""
     try:
-        dbm = stock_app.db_manager
-        backup_path = dbm.backup_database()
+        backup_path = await stock_app.db.backup_database()
         return {"message": "Database backup successful", "backup_path": backup_path}
     except Exception as e:
         logger.error(f"Backup failed: {e}")
         raise HTTPException(status_code=500, detail=f"Backup failed: {e}")
 
+@app.post("/system/holdings/rebuild")
+async def rebuild_holdings(portfolio_id: Optional[int] = Query(None, description="Portfolio ID (optional, all portfolios if omitted)")):
+    """Rebuild the materialized portfolio holdings from the transaction log."""
+    try:
+        count = await stock_app.db.run(stock_app.rebuild_portfolio_holdings, portfolio_id=portfolio_id)
+        return {"message": "Portfolio holdings rebuilt", "data": {"holdings": count}}
+    except Exception as e:
+        handle_api_exception(e, "Error rebuilding portfolio holdings")
+
+@app.get("/system/holdings/check")
+async def check_holdings(portfolio_id: Optional[int] = Query(None, description="Portfolio ID (optional, all portfolios if omitted)")):
+    """List materialized portfolio holdings that differ from the transaction log."""
+    try:
+        mismatches = await stock_app.db.run(stock_app.check_portfolio_holdings, portfolio_id=portfolio_id)
+        return {"message": "Portfolio holdings are consistent" if not mismatches else "Portfolio holdings differ from the transaction log", "data": mismatches}
+    except Exception as e:
+        handle_api_exception(e, "Error checking portfolio holdings")
+
+@app.get("/system/database")
+async def system_database_stats():
+    """Get connection pool utilization and wait-time metrics."""
+    try:
+        return {"message": "Database pool statistics fetched", "data": stock_app.db_manager.get_pool_stats()}
+    except Exception as e:
+        handle_api_exception(e, "Error getting database pool statistics")
+
+@app.get("/system/rate-limits")
+async def system_rate_limit_stats():
+    """Get per-provider rate limits and wait-time histograms."""
+    try:
+        return {"message": "Rate limiter statistics fetched", "data": stock_app.get_rate_limit_stats()}
+    except Exception as e:
+        handle_api_exception(e, "Error getting rate limiter statistics")
+
+@app.get("/system/cache")
+async def system_cache_stats():
+    """Get hit/miss statistics for the provider response caches and the Stock identity map."""
+    try:
+        stats = stock_app.get_cache_stats()
+        return {"message": "Cache statistics fetched", "data": stats}
+    except Exception as e:
+        handle_api_exception(e, "Error getting cache statistics")
+
 # 
 # Main
 #
@@ -2,7 +2,7 @@ import os
 from datetime import datetime, date
 from importlib import util
 from peewee import *
-from playhouse.postgres_ext import JSONField
+from playhouse.postgres_ext import JSONField, BinaryJSONField
 from playhouse.migrate import PostgresqlMigrator
 from typing import Optional
 from pathlib import Path
@@ -46,7 +46,7 @@ class Research(BaseModel):
     technical = TextField(null=True)  # Technical analysis
     dividend = TextField(null=True)   # Dividend analysis
     recommendation = TextField(null=True)  # Overall recommendation
-    structured_output = JSONField(null=True)  # Structured data in JSON format
+    structured_output = BinaryJSONField(null=True, index=False)  # Structured data as JSONB; GIN/expression indexes are created by migration 006
     validation = TextField(null=True)  # Validation summary
 
     class Meta:
@@ -94,6 +94,22 @@ class PortfolioResearch(BaseModel):
             (('created_at',), False),
         )
 
+class EconomicAnalysis(BaseModel):
+    """Memoized macroeconomic analysis of a FRED date window, shared by every portfolio until it expires"""
+    window_start = DateField()
+    window_end = DateField()
+    analysis = TextField()
+    trends = TextField(null=True)  # JSON of the FRED trend statistics the analysis was based on
+    expires_at = DateTimeField()
+
+    class Meta:
+        indexes = (
+            (('window_start', 'window_end', 'expires_at'), False),
+        )
+
+    def __str__(self):
+        return f"Economic analysis {self.window_start} to {self.window_end} (expires {self.expires_at})"
+
 class StockTransactionLog(BaseModel):
     """Table to log stock transactions (buy, sell, dividend reinvestment)"""
     ACTION_CHOICES = (
@@ -117,6 +133,26 @@ class StockTransactionLog(BaseModel):
     def __str__(self):
         return f"{self.purchase_date} {self.action} {self.shares} shares of {self.stock.symbol} @ {self.price}"
 
+class PortfolioHolding(BaseModel):
+    """Materialized split-adjusted holdings per portfolio and stock, kept in sync with StockTransactionLog"""
+    portfolio = ForeignKeyField(Portfolio, backref="holdings", on_delete='CASCADE')
+    stock = ForeignKeyField(Stock, backref="holdings", on_delete='CASCADE')
+    shares = FloatField(default=0.0)
+    avg_cost = FloatField(default=0.0)
+    total_cost = FloatField(default=0.0)
+    buys = FloatField(default=0.0)
+    sells = FloatField(default=0.0)
+    dividends = FloatField(default=0.0)
+    last_purchase_date = DateField(null=True)  # Holdings are listed most recently traded first
+
+    class Meta:
+        indexes = (
+            (('portfolio', 'stock'), True),
+        )
+
+    def __str__(self):
+        return f"{self.portfolio.name}: {self.shares} shares of {self.stock.symbol}"
+
 class CashBalance(BaseModel):
     """Table to log cash transactions and track cash balance"""
     ACTION_CHOICES = (
@@ -248,6 +284,7 @@ class TokenUsage(BaseModel):
     input_tokens = IntegerField(default=0)
     output_tokens = IntegerField(default=0)
     total_tokens = IntegerField(default=0)
+    cache_hit = BooleanField(default=False)  # Response served from the LLM cache (no tokens billed)
     created_at = DateTimeField(default=datetime.now)
 
     class Meta:
@@ -259,6 +296,29 @@ class TokenUsage(BaseModel):
     def __str__(self):
         return f"{self.created_at} {self.step}: in={self.input_tokens}, out={self.output_tokens}, total={self.total_tokens}"
 
+class TokenUsageDaily(BaseModel):
+    """Daily per-step token totals, kept up to date as TokenUsage rows are written and after they are purged"""
+    day = DateField()
+    step = CharField()
+    source = CharField(default='')  # Step without its node, e.g. stock:AAPL
+    calls = IntegerField(default=0)  # TokenUsage rows rolled into this day
+    input_tokens = BigIntegerField(default=0)
+    output_tokens = BigIntegerField(default=0)
+    total_tokens = BigIntegerField(default=0)
+    cache_hits = IntegerField(default=0)
+    # Token counts of responses replayed from the LLM cache; not billed, so kept out of the totals above
+    cached_input_tokens = BigIntegerField(default=0)
+    cached_output_tokens = BigIntegerField(default=0)
+    cached_total_tokens = BigIntegerField(default=0)
+
+    class Meta:
+        indexes = (
+            (('day', 'step'), True),
+        )
+
+    def __str__(self):
+        return f"{self.day} {self.step}: {self.calls} calls, total={self.total_tokens}"
+
 class ApiRequestUsage(BaseModel):
     """Table to track API request counts per provider"""
     step = CharField()
@@ -272,3 +332,100 @@ class ApiRequestUsage(BaseModel):
 
     def __str__(self):
         return f"{self.provider}: {self.count} requests"
+
+class ApiUsageDaily(BaseModel):
+    """Daily per-step, per-provider API call totals, kept up to date as ApiRequestUsage rows are written"""
+    day = DateField()
+    step = CharField()
+    source = CharField(default='')  # Step without its node, e.g. stock:AAPL
+    provider = CharField()
+    calls = IntegerField(default=0)  # Sum of ApiRequestUsage.count
+    requests = IntegerField(default=0)  # ApiRequestUsage rows
+
+    class Meta:
+        indexes = (
+            (('day', 'step', 'provider'), True),
+        )
+
+    def __str__(self):
+        return f"{self.day} {self.step} {self.provider}: {self.calls} calls"
+
+class ApiQuota(BaseModel):
+    """Per-provider, per-day API call counter with in-flight reservations for quota checks"""
+    provider = CharField()
+    day = DateField()
+    used = IntegerField(default=0)  # Calls made (sum of ApiRequestUsage.count for the day)
+    requests = IntegerField(default=0)  # ApiRequestUsage rows recorded for the day
+    reserved = IntegerField(default=0)  # Calls reserved by work that is still running
+
+    class Meta:
+        indexes = (
+            (('provider', 'day'), True),
+        )
+
+    def __str__(self):
+        return f"{self.provider} {self.day}: {self.used} used, {self.reserved} reserved"
+
+class GraphRun(BaseModel):
+    """Table to track LangGraph runs so failed runs can be resumed from their last checkpoint"""
+    run_id = CharField(unique=True)
+    graph = CharField()
+    symbol = CharField(null=True)
+    status = CharField(default="running")  # running, failed, completed
+    error = TextField(null=True)
+    attempts = IntegerField(default=1)
+
+    class Meta:
+        indexes = (
+            (('status',), False),
+        )
+
+    def __str__(self):
+        return f"{self.graph} {self.run_id} ({self.symbol}): {self.status}"
+
+class GraphCheckpoint(BaseModel):
+    """LangGraph checkpoint for a run (thread); channel values are stored in GraphCheckpointBlob"""
+    thread_id = CharField()
+    checkpoint_ns = CharField(default="")
+    checkpoint_id = CharField()
+    parent_checkpoint_id = CharField(null=True)
+    checkpoint_type = CharField()
+    checkpoint = BlobField()
+    metadata_type = CharField()
+    metadata = BlobField()
+
+    class Meta:
+        indexes = (
+            (('thread_id', 'checkpoint_ns', 'checkpoint_id'), True),
+        )
+
+class GraphCheckpointBlob(BaseModel):
+    """Serialized value of one state channel at one version"""
+    thread_id = CharField()
+    checkpoint_ns = CharField(default="")
+    channel = CharField()
+    version = CharField()
+    value_type = CharField()
+    value = BlobField(null=True)
+
+    class Meta:
+        indexes = (
+            (('thread_id', 'checkpoint_ns', 'channel', 'version'), True),
+        )
+
+class GraphCheckpointWrite(BaseModel):
+    """Pending write of a node that finished within a step whose checkpoint has not been saved yet"""
+    thread_id = CharField()
+    checkpoint_ns = CharField(default="")
+    checkpoint_id = CharField()
+    task_id = CharField()
+    task_path = CharField(default="")
+    idx = IntegerField()
+    channel = CharField()
+    value_type = CharField()
+    value = BlobField(null=True)
+
+    class Meta:
+        indexes = (
+            (('thread_id', 'checkpoint_ns', 'checkpoint_id', 'task_id', 'idx'), True),
+        )
@@ -1,6 +1,7 @@
 import os
-import requests
-from typing import Dict, List, Optional, Tuple
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 import json
 from utils.logging import setup_logger
 from utils.financial import safe_float, calculate_yoy_growth, find_by_date
@@ -16,25 +17,111 @@ from models.marketdata import (
 )
 import pandas as pd
 from utils.financial import calculate_rsi, safe_float
+from services.cache import ResponseCache
+from utils.http import AsyncHttpClient
+from utils.rate_limiter import get_rate_limiter
+from utils.concurrency import provider_limit
 
 logger = setup_logger(__name__)
 
+DAY = 24 * 60 * 60
+
 class AlphaVantageProvider(MarketDataProvider):
-    def __init__(self):
+    # Requests per minute allowed by the Alpha Vantage plan (free tier is 5/min)
+    RATE_LIMIT = int(os.environ.get("ALPHA_VANTAGE_RATE_LIMIT", 5))
+    # Cache TTL (seconds) per Alpha Vantage function
+    CACHE_TTLS = {
+        "OVERVIEW": 1 * DAY,
+        "SPLITS": 30 * DAY,
+        "TIME_SERIES_DAILY": DAY / 2,
+        "NEWS_SENTIMENT": 60 * 60,
+    }
+    # Statement functions are cached until the next expected earnings report
+    STATEMENT_FUNCTIONS = ("EARNINGS", "INCOME_STATEMENT", "BALANCE_SHEET", "CASH_FLOW")
+    QUARTER_DAYS = 91
+    REPORTING_LAG_DAYS = 30  # Typical delay between fiscal quarter end and the earnings report
+    DEFAULT_TTL = 1 * DAY
+
+    def __init__(self, cache: Optional[ResponseCache] = None, http: Optional[AsyncHttpClient] = None):
         self.api_key = os.environ.get("ALPHA_VANTAGE_API_KEY")
         if not self.api_key:
             raise ValueError("Alpha Vantage API key not found in environment variables.")
         self.base_url = "https://www.alphavantage.co/query"
+        self.cache = cache or ResponseCache("alphavantage")
+        self.http = http or AsyncHttpClient(
+            "alphavantage",
+            rate_limiter=get_rate_limiter("alphavantage", per_minute=self.RATE_LIMIT),
+        )
 
-    def get_technical_indicators(self, symbol: str) -> TechnicalIndicators:
-        # Fetch daily prices
-        params = {
-            "function": "TIME_SERIES_DAILY",
-            "symbol": symbol,
+    async def close(self):
+        """Close the pooled HTTP session."""
+        self.http.close()
+
+    async def _query_async(self, function: str, symbol: str, symbol_param: str = "symbol", **params) -> Tuple[Dict[str, Any], int]:
+        """
+        Call an Alpha Vantage function through the response cache.
+
+        Returns a tuple of (response json, request_count). Cache hits return a request_count of 0
+        so they are not recorded against ApiRequestUsage.
+        """
+        key = ResponseCache.make_key(function, symbol.upper(), **params)
+        cached = self.cache.get(key, tag=function)
+        if cached is not None:
+            logger.debug(f"Alpha Vantage cache hit for {function} {symbol}")
+            return cached, 0
+
+        request_params = {
+            "function": function,
+            symbol_param: symbol,
             "apikey": self.api_key,
+            **params,
         }
-        response = requests.get(self.base_url, params=params)
-        daily_data = response.json()
+        async with provider_limit("alphavantage"):
+            data = await self.http.get_json(self.base_url, params=request_params)
+        if self._is_error_response(data):
+            logger.warning(f"Alpha Vantage {function} returned no data for {symbol}, not caching: {data}")
+        else:
+            self.cache.set(key, data, ttl=self._cache_ttl(function, data), tag=function)
+        return data, 1
+
+    @staticmethod
+    def _is_error_response(data: Any) -> bool:
+        """Rate limit notes, error messages and empty payloads must never be cached."""
+        if not isinstance(data, dict) or not data:
+            return True
+        return any(k in data for k in ("Information", "Note", "Error Message"))
+
+    def _cache_ttl(self, function: str, data: Dict[str, Any]) -> float:
+        """Return the cache TTL in seconds for a function response."""
+        if function in self.STATEMENT_FUNCTIONS:
+            next_report = self._next_earnings_date(data)
+            if next_report is not None:
+                ttl = (next_report - datetime.now()).total_seconds()
+                # A late filer may be past its estimated date; keep checking daily until it reports
+                return max(ttl, self.DEFAULT_TTL)
+        return self.CACHE_TTLS.get(function, self.DEFAULT_TTL)
+
+    def _next_earnings_date(self, data: Dict[str, Any]) -> Optional[datetime]:
+        """Estimate the next earnings report from the most recent quarter in a statement payload."""
+        quarters = data.get("quarterlyEarnings") or data.get("quarterlyReports") or []
+        if not quarters:
+            return None
+        latest = quarters[0]
+        try:
+            if latest.get("reportedDate"):
+                # EARNINGS carries the actual report date: the next one is a quarter later
+                return datetime.strptime(latest["reportedDate"], "%Y-%m-%d") + timedelta(days=self.QUARTER_DAYS)
+            fiscal_end = datetime.strptime(latest.get("fiscalDateEnding", ""), "%Y-%m-%d")
+        except ValueError:
+            return None
+        return fiscal_end + timedelta(days=self.QUARTER_DAYS + self.REPORTING_LAG_DAYS)
+
+    def get_technical_indicators(self, symbol: str) -> TechnicalIndicators:
+        return self.http.run_sync(self.get_technical_indicators_async(symbol))
+
+    async def get_technical_indicators_async(self, symbol: str) -> TechnicalIndicators:
+        # Fetch daily prices
+        daily_data, _ = await self._query_async("TIME_SERIES_DAILY", symbol)
         ohlcv = daily_data.get("Time Series (Daily)", {})
         logger.debug(f"Alpha Vantage TIME_SERIES_DAILY: {json.dumps(daily_data, indent=2)}")
 
@@ -78,13 +165,10 @@ class AlphaVantageProvider(MarketDataProvider):
         )
 
     def get_dividend_history(self, symbol: str) -> DividendHistory:
-        params = {
-            "function": "CASH_FLOW",
-            "symbol": symbol,
-            "apikey": self.api_key,
-        }
-        response = requests.get(self.base_url, params=params)
-        data = response.json()
+        return self.http.run_sync(self.get_dividend_history_async(symbol))
+
+    async def get_dividend_history_async(self, symbol: str) -> DividendHistory:
+        data, _ = await self._query_async("CASH_FLOW", symbol)
         logger.debug(f"Alpha Vantage CASH_FLOW: {data}")
 
         dividends = {}
@@ -158,7 +242,6 @@ class AlphaVantageProvider(MarketDataProvider):
         current_ratio = None
         quick_ratio = None
         debt_to_equity = None
-        revenue_growth = None
         gross_profit_margin = None
         operating_cash_flow = None
         free_cash_flow = None
@@ -227,7 +310,6 @@ class AlphaVantageProvider(MarketDataProvider):
         base_earning["current_ratio"] = current_ratio
         base_earning["quick_ratio"] = quick_ratio
         base_earning["debt_to_equity"] = debt_to_equity
-        base_earning["revenue_growth"] = revenue_growth
         base_earning["gross_profit_margin"] = gross_profit_margin
         base_earning["operating_cash_flow"] = operating_cash_flow
         base_earning["free_cash_flow"] = free_cash_flow
@@ -235,38 +317,18 @@ class AlphaVantageProvider(MarketDataProvider):
         return Earning(**base_earning)
     
     def get_earnings_history(self, symbol: str) -> EarningsHistory:
-        request_count = 0
-        # Fetch earnings per share
-        params = {
-            "function": "EARNINGS",
-            "symbol": symbol,
-            "apikey": self.api_key,
-        }
-        response = requests.get(self.base_url, params=params)
-        earnings_data = response.json()
-        request_count += 1
+        return self.http.run_sync(self.get_earnings_history_async(symbol))
+
+    async def get_earnings_history_async(self, symbol: str) -> EarningsHistory:
+        # Fetch earnings per share, income statement and balance sheet concurrently
+        (earnings_data, earnings_count), (income_statement_data, income_count), (balance_sheet_data, balance_count) = await asyncio.gather(
+            self._query_async("EARNINGS", symbol),
+            self._query_async("INCOME_STATEMENT", symbol),
+            self._query_async("BALANCE_SHEET", symbol),
+        )
+        request_count = earnings_count + income_count + balance_count
         logger.debug(f"Alpha Vantage EARNINGS: {earnings_data}")
-
-        # Fetch income statement
-        params = {
-            "function": "INCOME_STATEMENT",
-            "symbol": symbol,
-            "apikey": self.api_key,
-        }
-        response = requests.get(self.base_url, params=params)
-        income_statement_data = response.json()
-        request_count += 1
         logger.debug(f"Alpha Vantage INCOME_STATEMENT: {income_statement_data}")
-
-        # Fetch balance sheet
-        params = {
-            "function": "BALANCE_SHEET",
-            "symbol": symbol,
-            "apikey": self.api_key,
-        }
-        response = requests.get(self.base_url, params=params)
-        balance_sheet_data = response.json()
-        request_count += 1
         logger.debug(f"Alpha Vantage BALANCE_SHEET: {balance_sheet_data}")
 
         # Process quarterly earnings
@@ -337,16 +399,13 @@ class AlphaVantageProvider(MarketDataProvider):
         return earnings_history, request_count
 
     def get_market_data(self, symbol: str) -> MarketData:
+        return self.http.run_sync(self.get_market_data_async(symbol))
+
+    async def get_market_data_async(self, symbol: str) -> MarketData:
         request_count = 0
         # Fetch overview data
-        params = {
-            "function": "OVERVIEW",
-            "symbol": symbol,
-            "apikey": self.api_key,
-        }
-        response = requests.get(self.base_url, params=params)
-        overview_data = response.json()
-        request_count += 1
+        overview_data, count = await self._query_async("OVERVIEW", symbol)
+        request_count += count
         logger.debug(f"Alpha Vantage OVERVIEW: {overview_data}")
 
         # Return None if rate limit is hit
@@ -373,13 +432,10 @@ class AlphaVantageProvider(MarketDataProvider):
         ), request_count
 
     def get_news(self, symbol: str) -> News:
-        params = {
-            "function": "NEWS_SENTIMENT",
-            "tickers": symbol,
-            "apikey": self.api_key,
-        }
-        response = requests.get(self.base_url, params=params)
-        data = response.json()
+        return self.http.run_sync(self.get_news_async(symbol))
+
+    async def get_news_async(self, symbol: str) -> News:
+        data, _ = await self._query_async("NEWS_SENTIMENT", symbol, symbol_param="tickers")
         logger.debug(f"Alpha Vantage NEWS_SENTIMENT: {data}")
 
         news_items = []
@@ -400,15 +456,12 @@ class AlphaVantageProvider(MarketDataProvider):
         Fetches stock split history using the Alpha Vantage SPLITS function.
         Returns a list of dicts with effective_date and split_factor.
         """
+        return self.http.run_sync(self.get_splits_async(symbol))
+
+    async def get_splits_async(self, symbol: str):
         request_count = 0
-        params = {
-            "function": "SPLITS",
-            "symbol": symbol,
-            "apikey": self.api_key,
-        }
-        response = requests.get(self.base_url, params=params)
-        data = response.json()
-        request_count += 1
+        data, count = await self._query_async("SPLITS", symbol)
+        request_count += count
         logger.debug(f"Alpha Vantage SPLITS: {data}")
 
         splits = []
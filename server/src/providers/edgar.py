@@ -1,18 +1,58 @@
 import os
+import json
+import multiprocessing
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from edgar import set_identity, Company
 from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from services.cache import ResponseCache
 from utils.logging import setup_logger
 
 logger = setup_logger(__name__)
 
+# Filed Form 4/5 documents never change, so parsed transactions are kept for a long time
+DEFAULT_FILING_CACHE_TTL = 365 * 24 * 60 * 60
+# Below this many uncached filings, parsing in-process beats starting the pool
+MIN_POOL_BATCH = 2
+
+def parse_insider_filing(filing) -> Tuple[str, Optional[List[dict]]]:
+	"""
+	Parses one Form 4/5 filing into transaction records. Runs in a worker process.
+	Returns (accession number, records), with None records if the filing could not be parsed.
+	"""
+	try:
+		df = filing.obj().to_dataframe()
+		# Round-trip through JSON so the records only hold plain, cacheable types
+		return filing.accession_no, json.loads(df.to_json(orient="records", date_format="iso"))
+	except Exception as e:
+		logger.error(f"Could not parse Form 4/5 filing for {getattr(filing, 'accession_no', 'unknown')}: {e}")
+		return getattr(filing, "accession_no", None), None
+
 class EdgarProvider:
-	def __init__(self):
+	def __init__(self, cache: Optional[ResponseCache] = None, max_workers: Optional[int] = None):
 		self.identity = os.environ.get("EDGAR_IDENTITY")
 		if not self.identity:
 			raise ValueError("EDGAR identity not found in environment variables.")
 		logger.info(f"Using EDGAR identity: {self.identity}")
 		#set_identity(self.identity)
+		self.cache = cache or ResponseCache("edgar")
+		self.filing_ttl = float(os.getenv("EDGAR_FILING_CACHE_TTL", DEFAULT_FILING_CACHE_TTL))
+		self.max_workers = max_workers or int(os.getenv("EDGAR_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+		self._pool = None
+
+	@property
+	def pool(self) -> ProcessPoolExecutor:
+		"""Lazily start the parsing process pool (spawned, since the app process runs threads)."""
+		if self._pool is None:
+			self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+		return self._pool
+
+	def close(self):
+		"""Shut down the parsing process pool."""
+		if self._pool is not None:
+			self._pool.shutdown()
+			self._pool = None
 
 	def _get_filings(self, symbol: str, forms: list, days: int = 90) -> list:
 		"""
@@ -34,25 +74,61 @@ class EdgarProvider:
 			logger.error(f"An error occurred while fetching filings {forms} for {symbol}: {e}")
 			return []
 
-	def get_insider_trading_data(self, symbol: str, days: int) -> pd.DataFrame:
+	@staticmethod
+	def _filing_key(accession_no: str) -> str:
+		return ResponseCache.make_key("insider_filing", accession_no)
+
+	def _parse_insider_filings(self, filings: list) -> Dict[str, List[dict]]:
 		"""
-		Pulls insider trading data (Form 4 and 5) for a given stock symbol using edgar library.
-		Returns a pandas DataFrame of transactions.
+		Returns transaction records by accession number for the given Form 4/5 filings.
+		Filings parsed before are read from the cache; the rest are parsed in the process pool and cached.
 		"""
-		filings = self._get_filings(symbol, ["4", "5"], days)
-		all_transactions = []
+		records = {}
+		uncached = {}
 		for filing in filings:
-			try:
-				transaction_data = filing.obj().to_dataframe()
-				all_transactions.append(transaction_data)
-			except Exception as e:
-				logger.error(f"Could not parse Form 4/5 filing for {getattr(filing, 'accession_number', 'unknown')}: {e}")
+			accession_no = filing.accession_no
+			if accession_no in records or accession_no in uncached:
+				continue
+			cached = self.cache.get(self._filing_key(accession_no), tag="insider_filing")
+			if cached is not None:
+				records[accession_no] = cached
+			else:
+				uncached[accession_no] = filing
+		if not uncached:
+			return records
 
-		if all_transactions:
-			full_df = pd.concat(all_transactions, ignore_index=True)
-			return full_df
+		logger.info(f"Parsing {len(uncached)} new Form 4/5 filings ({len(records)} cached)")
+		if len(uncached) < MIN_POOL_BATCH:
+			parsed = [parse_insider_filing(filing) for filing in uncached.values()]
 		else:
-			return pd.DataFrame()
+			parsed = list(self.pool.map(parse_insider_filing, uncached.values()))
+		for accession_no, filing_records in parsed:
+			if filing_records is None:
+				continue
+			self.cache.set(self._filing_key(accession_no), filing_records, ttl=self.filing_ttl, tag="insider_filing")
+			records[accession_no] = filing_records
+		return records
+
+	def get_insider_trading_data_many(self, symbols: List[str], days: int) -> Dict[str, pd.DataFrame]:
+		"""
+		Pulls insider trading data (Form 4 and 5) for several symbols in one pass.
+		Only filings not parsed before are downloaded and parsed, all in one process pool batch.
+		Returns a pandas DataFrame of transactions per symbol.
+		"""
+		filings = {symbol: list(self._get_filings(symbol, ["4", "5"], days)) for symbol in symbols}
+		parsed = self._parse_insider_filings([filing for symbol_filings in filings.values() for filing in symbol_filings])
+		frames = {}
+		for symbol, symbol_filings in filings.items():
+			rows = [row for filing in symbol_filings for row in parsed.get(filing.accession_no, [])]
+			frames[symbol] = pd.DataFrame.from_records(rows) if rows else pd.DataFrame()
+		return frames
+
+	def get_insider_trading_data(self, symbol: str, days: int) -> pd.DataFrame:
+		"""
+		Pulls insider trading data (Form 4 and 5) for a given stock symbol using edgar library.
+		Returns a pandas DataFrame of transactions.
+		"""
+		return self.get_insider_trading_data_many([symbol], days)[symbol]
 		
 	def get_etf_holdings(self, symbol: str):
 		"""
@@ -96,7 +172,21 @@ class EdgarProvider:
 		- top_sellers: list of dicts with insider, position, and total value
 		- top_buyers: list of dicts with insider, position, and total value
 		"""
-		df = self.get_insider_trading_data(symbol, days)
+		return self.get_insider_trading_summaries([symbol], days, top_n)[symbol]
+
+	def get_insider_trading_summaries(self, symbols: List[str], days: int, top_n: int = 5) -> Dict[str, dict]:
+		"""
+		Insider trading summaries for several symbols (e.g. a portfolio's holdings) in one pass.
+		Returns a dict of symbol -> summary in the format of get_insider_trading_summary.
+		"""
+		frames = self.get_insider_trading_data_many(symbols, days)
+		return {symbol: self.summarize_insider_trading(frames[symbol], top_n) for symbol in symbols}
+
+	@staticmethod
+	def summarize_insider_trading(df: pd.DataFrame, top_n: int = 5) -> dict:
+		"""
+		Summarizes a DataFrame of Form 4/5 transactions (see get_insider_trading_summary).
+		"""
 		if df.empty:
 			return {
 				"sale_total": 0.0,
@@ -1,8 +1,10 @@
 import os
-import requests
-import math
-from utils.financial import safe_float
+from typing import Dict, List, Optional
+from services.series_store import SeriesStore
+from utils.financial import series_trend
+from utils.http import AsyncHttpClient
 from utils.logging import setup_logger
+from utils.rate_limiter import get_rate_limiter
 
 logger = setup_logger(__name__)
 
@@ -24,13 +26,35 @@ class FredProvider:
         "ppi": "PPIACO", # Producer Price Index by Commodity: All Commodities
     }
 
-    def __init__(self, api_key: str = None):
+    # Indicators bundled for economic analysis, keyed as the analysis prompt refers to them
+    BULK_SERIES = {
+        "gdp": SERIES["gdp"],
+        "cpi": SERIES["cpi"],
+        "unemployment": SERIES["unemployment"],
+        "interest_rate": SERIES["interest_rate"],
+        "consumer_confidence": SERIES["consumer_confidence"],
+        "retail_sales": SERIES["retail_sales"],
+        "industrial_production": SERIES["industrial_production"],
+        "vix": SERIES["vix"],
+        "yield_curve": SERIES["yield_curve_10y_2y"],
+        "housing_starts": SERIES["housing_starts"],
+        "ppi": SERIES["ppi"],
+    }
+
+    def __init__(self, api_key: str = None, store: Optional[SeriesStore] = None, http: Optional[AsyncHttpClient] = None):
         self.api_key = api_key or os.getenv("FRED_API_KEY")
         if not self.api_key:
             raise ValueError("FRED API key must be provided via argument or FRED_API_KEY env var.")
         self.request_count = 0
+        self.rate_limiter = get_rate_limiter("fred")
+        self.http = http or AsyncHttpClient("fred", rate_limiter=self.rate_limiter)
+        self.store = store or SeriesStore(fetch=self._fetch_observations)
 
-    def get_series(self, series_id: str, start_date: str = None, end_date: str = None):
+    def close(self):
+        """Close the pooled HTTP client."""
+        self.http.close()
+
+    def _params(self, series_id: str, start_date: str = None, end_date: str = None) -> Dict[str, str]:
         params = {
             "series_id": series_id,
             "api_key": self.api_key,
@@ -40,10 +64,21 @@ class FredProvider:
             params["observation_start"] = start_date
         if end_date:
             params["observation_end"] = end_date
-        resp = requests.get(self.BASE_URL, params=params)
+        return params
+
+    async def _fetch_observations(self, series_id: str, start_date: Optional[str] = None) -> Optional[List[dict]]:
+        """Fetch observations of a series from `start_date` on; None if the request failed."""
+        data = await self.http.get_json(self.BASE_URL, params=self._params(series_id, start_date))
+        self.request_count += 1
+        if not data or "observations" not in data:
+            return None
+        return data["observations"]
+
+    def get_series(self, series_id: str, start_date: str = None, end_date: str = None):
+        """Raw observations response for one series, straight from the API."""
+        data = self.http.run_sync(self.http.get_json(self.BASE_URL, params=self._params(series_id, start_date, end_date)))
         self.request_count += 1
-        resp.raise_for_status()
-        return resp.json()
+        return data
 
     def get_gdp(self, **kwargs):
         return self.get_series(self.SERIES["gdp"], **kwargs)
@@ -78,89 +113,31 @@ class FredProvider:
     def get_ppi(self, **kwargs):
         return self.get_series(self.SERIES["ppi"], **kwargs)
 
-    def get_bulk_economic_data(self, start_date: str = None, end_date: str = None):
-        """Fetch a bundle of key indicators for economic analysis."""
-        return {
-            "gdp": self.get_gdp(start_date=start_date, end_date=end_date),
-            "cpi": self.get_cpi(start_date=start_date, end_date=end_date),
-            "unemployment": self.get_unemployment(start_date=start_date, end_date=end_date),
-            "interest_rate": self.get_interest_rate(start_date=start_date, end_date=end_date),
-            "consumer_confidence": self.get_consumer_confidence(start_date=start_date, end_date=end_date),
-            "retail_sales": self.get_retail_sales(start_date=start_date, end_date=end_date),
-            "industrial_production": self.get_industrial_production(start_date=start_date, end_date=end_date),
-            "vix": self.get_vix(start_date=start_date, end_date=end_date),
-            "yield_curve": self.get_yield_curve(start_date=start_date, end_date=end_date),
-            "housing_starts": self.get_housing_starts(start_date=start_date, end_date=end_date),
-            "ppi": self.get_ppi(start_date=start_date, end_date=end_date),
-        }
+    async def refresh_series_async(self, start_date: str = None) -> None:
+        """Bring every bundled series in the local store up to date, fetching them concurrently."""
+        # Runs on the caller's loop; only the requests themselves go through the pooled client loop
+        await self.store.refresh(list(self.BULK_SERIES.values()), start=start_date)
 
-    def get_series_trend(self, start_date: str = None, end_date: str = None):
-        """Fetch bulk economic data and calculate summary stats for each series."""
+    def get_bulk_economic_data(self, start_date: str = None, end_date: str = None):
+        """Fetch a bundle of key indicators for economic analysis, served from the local series store."""
+        self.http.run_sync(self.refresh_series_async(start_date))
+        bulk = {}
+        for key, series_id in self.BULK_SERIES.items():
+            dates, values = self.store.window(series_id, start_date, end_date)
+            bulk[key] = {"observations": [{"date": str(d), "value": str(v)} for d, v in zip(dates, values)]}
+        return bulk
+
+    async def get_series_trend_async(self, start_date: str = None, end_date: str = None):
+        """Summary stats for each bundled series over the window, computed from the local series store."""
         logger.info(f"Fetching economic data from FRED for period {start_date} to {end_date}...")
-        bulk_data = self.get_bulk_economic_data(start_date=start_date, end_date=end_date)
+        requests_before = self.request_count
+        await self.refresh_series_async(start_date)
         trends = {}
-        for key, series_data in bulk_data.items():
-            # FRED API returns a dict with 'observations' key
-            observations = series_data.get('observations', [])
-            # Filter out missing values
-            valid_obs = [obs for obs in observations if obs.get('value') not in (None, '.', '')]
-            values = []
-            dates = []
-            for obs in valid_obs:
-                v = safe_float(obs['value'])
-                if v is not None:
-                    values.append(v)
-                    dates.append(obs['date'])
-            if not values:
-                trends[key] = {
-                    'series_start_value': None,
-                    'series_start_date': None,
-                    'series_end_value': None,
-                    'series_end_date': None,
-                    'trend': None,
-                    'rate_of_change': None,
-                    'absolute_change': None,
-                    'min_value': None,
-                    'min_date': None,
-                    'max_value': None,
-                    'max_date': None,
-                    'mean_value': None,
-                    'std_dev': None
-                }
-                continue
-            start_value = values[0]
-            start_date = dates[0]
-            end_value = values[-1]
-            end_date = dates[-1]
-            trend = end_value / start_value if start_value != 0 else None
-            rate_of_change = (end_value - start_value) / start_value if start_value != 0 else None
-            absolute_change = end_value - start_value
-            min_value = min(values)
-            max_value = max(values)
-            min_index = values.index(min_value)
-            max_index = values.index(max_value)
-            min_date = dates[min_index]
-            max_date = dates[max_index]
-            mean_value = sum(values) / len(values) if values else None
-            if len(values) > 1:
-                mean = mean_value
-                std_dev = math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
-            else:
-                std_dev = 0.0
-            trends[key] = {
-                'series_start_value': start_value,
-                'series_start_date': start_date,
-                'series_end_value': end_value,
-                'series_end_date': end_date,
-                'trend': trend,
-                'rate_of_change': rate_of_change,
-                'absolute_change': absolute_change,
-                'min_value': min_value,
-                'min_date': min_date,
-                'max_value': max_value,
-                'max_date': max_date,
-                'mean_value': mean_value,
-                'std_dev': std_dev
-            }
+        for key, series_id in self.BULK_SERIES.items():
+            trends[key] = series_trend(*self.store.window(series_id, start_date, end_date))
             logger.debug(f"Processed {key} trend: {trends[key]}")
-        return trends, self.request_count
\ No newline at end of file
+        return trends, self.request_count - requests_before
+
+    def get_series_trend(self, start_date: str = None, end_date: str = None):
+        """Sync wrapper for get_series_trend_async."""
+        return self.http.run_sync(self.get_series_trend_async(start_date, end_date))
@@ -1,11 +1,11 @@
 import os
 import datetime
-from typing import Dict, List, Optional, Tuple, Any
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Any
 import json
-import time
 import aiohttp
 import asyncio
 from utils.logging import setup_logger
+from utils.rate_limiter import get_rate_limiter
 from utils.financial import safe_float, calculate_yoy_growth, find_by_date
 from base.market_data_provider import MarketDataProvider
 from models.marketdata import (
@@ -30,7 +30,7 @@ class PolygonProvider():
         self.api_key = os.environ.get("POLYGON_API_KEY")
         if not self.api_key:
             raise ValueError("Polygon API key not found in environment variables.")
-        self.last_request_time = 0
+        self.rate_limiter = get_rate_limiter("polygon", per_minute=self.RATE_LIMIT)
         self._session = None  # Will be initialized lazily when needed
         
     @property
@@ -57,25 +57,18 @@ class PolygonProvider():
         Returns:
             Tuple of (response data, request count)
         """
-        # Rate limiting using asyncio.sleep instead of time.sleep
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        if time_since_last_request < (60 / self.RATE_LIMIT):
-            sleep_time = (60 / self.RATE_LIMIT) - time_since_last_request
-            logger.debug(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-            await asyncio.sleep(sleep_time)
-            
-        # Prepare request
-        url = f"{self.BASE_URL}{endpoint}"
-        request_params = params or {}
+        # Shared with every other Polygon caller, in this process and others
+        await self.rate_limiter.acquire()
+
+        # Prepare request; pagination cursors arrive as absolute URLs
+        url = endpoint if endpoint.startswith("http") else f"{self.BASE_URL}{endpoint}"
+        request_params = dict(params or {})
         request_params["apiKey"] = self.api_key
         
         # Make request asynchronously using aiohttp
         logger.debug(f"Making async GET request to {url} with params {request_params}")
         session = await self.session
         async with session.get(url, params=request_params) as response:
-            self.last_request_time = time.time()
-            
             # Check for errors
             if response.status != 200:
                 error_text = await response.text()
@@ -90,65 +83,121 @@ class PolygonProvider():
             
             return data, 1
     
-    async def get_short_interest(self, ticker: str, limit: int = 10, sort: str = "settlement_date.desc") -> Tuple[List[dict], int]:
+    async def _paginate(self, endpoint: str, params: Dict, max_records: Optional[int] = None) -> AsyncIterator[Tuple[List[dict], int]]:
         """
-        Fetches short-interest data for a ticker from Polygon's short-interest endpoint.
+        Follows Polygon's `next_url` cursor from `endpoint`, yielding (records, request_count) one page at a time.
 
-        Returns a tuple of (list_of_records, request_count).
+        Every page goes through the shared rate limiter. Stops after `max_records` records, when
+        there is no next page, on a failed request, or when the caller stops iterating.
+        """
+        url = endpoint
+        remaining = max_records
+        while url and (remaining is None or remaining > 0):
+            data, count = await self._get_request(url, params)
+            if not data:
+                yield [], count
+                return
+            records = data.get("results") or [] if isinstance(data, dict) else data
+            if remaining is not None:
+                records = records[:remaining]
+                remaining -= len(records)
+            yield records, count
+            # The cursor URL already carries the query, so only the API key is added from here on
+            url = data.get("next_url") if isinstance(data, dict) and records else None
+            params = {}
+
+    @staticmethod
+    def _date_bounds(params: Dict, field: str, start: Optional[str], end: Optional[str]) -> Dict:
+        """Add Polygon's `<field>.gte` / `<field>.lte` filters for the given ISO dates."""
+        if start:
+            params[f"{field}.gte"] = str(start)
+        if end:
+            params[f"{field}.lte"] = str(end)
+        return params
+
+    @staticmethod
+    async def collect_pages(pages: AsyncIterator[Tuple[List[dict], int]]) -> Tuple[List[dict], int]:
+        """Gather every page of a paginated iterator into one list. Returns (records, request_count)."""
+        records, request_count = [], 0
+        async for page, count in pages:
+            records.extend(page)
+            request_count += count
+        return records, request_count
+
+    def iter_short_interest(
+        self,
+        ticker: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        sort: str = "settlement_date.desc",
+        page_size: int = 1000,
+        max_records: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[List[dict], int]]:
+        """
+        Pages through short-interest data for a ticker, optionally bounded by settlement date.
+
+        Yields (records, request_count) per page.
+        """
+        params = self._date_bounds({"ticker": ticker, "limit": page_size, "sort": sort}, "settlement_date", start, end)
+        logger.debug(f"Paging short interest for {ticker} with params {params}")
+        return self._paginate("/stocks/v1/short-interest", params, max_records)
+
+    def iter_short_volume(
+        self,
+        ticker: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        sort: str = "date.desc",
+        page_size: int = 1000,
+        max_records: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[List[dict], int]]:
+        """
+        Pages through short-volume data for a ticker, optionally bounded by trade date.
+
+        Yields (records, request_count) per page.
+        """
+        params = self._date_bounds({"ticker": ticker, "limit": page_size, "sort": sort}, "date", start, end)
+        logger.debug(f"Paging short volume for {ticker} with params {params}")
+        return self._paginate("/stocks/v1/short-volume", params, max_records)
+
+    def iter_financials(
+        self,
+        ticker: str,
+        timeframe: str = "quarterly",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        page_size: int = 100,
+        max_records: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[List[dict], int]]:
+        """
+        Pages through financial statements for a ticker, newest filing first, optionally bounded by filing date.
+
+        Yields (records, request_count) per page.
         """
-        endpoint = "/stocks/v1/short-interest"
-        params = {
+        params = self._date_bounds({
             "ticker": ticker,
-            "limit": limit,
-            "sort": sort,
-        }
-        logger.debug(f"Requesting short interest for {ticker} with params {params}")
-        result = await self._get_request(endpoint, params)
-        if not result:
-            return [], 0
-        data, count = result
-        if not data:
-            return [], count or 0
+            "timeframe": timeframe,
+            "limit": page_size,
+            "sort": "filing_date",
+            "order": "desc",
+        }, "filing_date", start, end)
+        return self._paginate("/vX/reference/financials", params, max_records)
 
-        # Polygon typically returns an object with a 'results' key
-        if isinstance(data, dict) and "results" in data:
-            records = data.get("results") or []
-        elif isinstance(data, list):
-            records = data
-        else:
-            records = []
+    async def get_short_interest(self, ticker: str, limit: int = 10, sort: str = "settlement_date.desc") -> Tuple[List[dict], int]:
+        """
+        Fetches the `limit` most recent short-interest records for a ticker.
 
-        return records, count
+        Returns a tuple of (list_of_records, request_count).
+        """
+        return await self.collect_pages(self.iter_short_interest(ticker, sort=sort, page_size=limit, max_records=limit))
     
     async def get_short_volume(self, ticker: str, limit: int = 10, sort: str = "date.desc") -> Tuple[List[dict], int]:
         """
-        Fetches short-volume data for a ticker from Polygon's short-volume endpoint.
+        Fetches the `limit` most recent short-volume records for a ticker.
 
         Returns a tuple of (list_of_records, request_count).
         """
-        endpoint = "/stocks/v1/short-volume"
-        params = {
-            "ticker": ticker,
-            "limit": limit,
-            "sort": sort,
-        }
-        logger.debug(f"Requesting short volume for {ticker} with params {params}")
-        result = await self._get_request(endpoint, params)
-        if not result:
-            return [], 0
-        data, count = result
-        if not data:
-            return [], count or 0
-
-        # Polygon typically returns an object with a 'results' key
-        if isinstance(data, dict) and "results" in data:
-            records = data.get("results") or []
-        elif isinstance(data, list):
-            records = data
-        else:
-            records = []
-
-        return records, count
+        return await self.collect_pages(self.iter_short_volume(ticker, sort=sort, page_size=limit, max_records=limit))
         
     def create_earning(self, result_item, previous_result_item=None):
         """
@@ -480,39 +529,16 @@ class PolygonProvider():
         except Exception as e:
             logger.warning(f"Failed to fetch current price for {symbol}: {e}")
         
-        # Fetch quarterly and annual financials in parallel
-        quarterly_task = self._get_request("/vX/reference/financials", {
-            "ticker": symbol,
-            "timeframe": "quarterly",
-            "limit": quarterly_limit,
-            "sort": "filing_date",
-            "order": "desc",
-        })
-        
-        annual_task = self._get_request("/vX/reference/financials", {
-            "ticker": symbol,
-            "timeframe": "annual",
-            "limit": annual_limit,
-            "sort": "filing_date",
-            "order": "desc",
-        })
-        
-        # Wait for both requests to complete concurrently
-        quarterly_result, annual_result = await asyncio.gather(
-            quarterly_task,
-            annual_task
+        # Fetch quarterly and annual financials in parallel, following the cursor if a page comes back short
+        (quarterly_results, q_count), (annual_results, a_count) = await asyncio.gather(
+            self.collect_pages(self.iter_financials(symbol, "quarterly", page_size=quarterly_limit, max_records=quarterly_limit)),
+            self.collect_pages(self.iter_financials(symbol, "annual", page_size=annual_limit, max_records=annual_limit)),
         )
-        
-        # Unpack results
-        quarterly_financials_data, q_count = quarterly_result
-        annual_financials_data, a_count = annual_result
         request_count += q_count + a_count
         
         # Process quarterly data
         quarterly_earnings = []
-        if quarterly_financials_data and "results" in quarterly_financials_data:
-            quarterly_results = quarterly_financials_data["results"]
-            
+        if quarterly_results:
             # Log the structure of the first result to help with debugging
             if quarterly_results and len(quarterly_results) > 0:
                 logger.debug(f"Polygon quarterly financial data structure sample: {json.dumps(quarterly_results[0], indent=2)[:1000]}...")
@@ -588,9 +614,7 @@ class PolygonProvider():
         
         # Process annual data
         annual_earnings = []
-        if annual_financials_data and "results" in annual_financials_data:
-            annual_results = annual_financials_data["results"]
-            
+        if annual_results:
             # Log the structure of the first result to help with debugging
             if annual_results and len(annual_results) > 0:
                 logger.debug(f"Polygon annual financial data structure sample: {json.dumps(annual_results[0], indent=2)[:1000]}...")
@@ -9,7 +9,7 @@ from typing import Dict, List, Optional, Tuple, Annotated
 from typing_extensions import TypedDict
 import json
 from utils.logging import setup_logger
-from utils.financial import calculate_rsi, calculate_macd, calculate_bollinger_bands, calculate_obv, calculate_atr
+from utils.financial import calculate_indicators, latest_indicator_values
 from base.market_data_provider import MarketDataProvider
 from models.marketdata import (
     TechnicalIndicators,
@@ -21,12 +21,16 @@ from models.marketdata import (
     NewsItem,
 )
 from utils.financial import market_open
+from services.bar_store import BarStore
+from utils.rate_limiter import RateLimiter, get_rate_limiter
 
 logger = setup_logger(__name__)
 
 class YFinanceProvider(MarketDataProvider):
-    def __init__(self):
-        pass
+    def __init__(self, bar_store: Optional[BarStore] = None, rate_limiter: Optional[RateLimiter] = None):
+        # Shared by the bulk bar downloads and the per-ticker info, earnings, dividend and news calls
+        self.rate_limiter = rate_limiter or get_rate_limiter("yfinance")
+        self.bar_store = bar_store or BarStore(fetch=self._download_bars)
 
     @staticmethod
     def _get_interval(period: str) -> str:
@@ -45,36 +49,35 @@ class YFinanceProvider(MarketDataProvider):
             return '1wk'
         return '1d'
 
+    def _download_bars(self, symbols: List[str], interval: str, start: Optional[datetime] = None, period: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """Download bars for many symbols in one yf.download call and split them per symbol."""
+        kwargs = {"start": start} if start is not None else {"period": period or "max"}
+        self.rate_limiter.acquire_sync()
+        hist = yf.download(symbols, interval=interval, auto_adjust=True, progress=False, multi_level_index=True, **kwargs)
+        logger.debug(f"yfinance multi-symbol hist: {hist.to_json(indent=2, date_format='iso')}")
+        if hist.empty:
+            return {}
+        return {symbol: hist.xs(symbol, axis=1, level=1).dropna(how="all") for symbol in hist.columns.get_level_values(1).unique()}
+
     def get_stock_history_by_symbols(self, symbols: List[str], period: str, interval: Optional[str] = None) -> pd.DataFrame:
-        """Fetch historical stock data for multiple symbols and period using yf.download. Allows specifying interval."""
+        """Historical stock data for multiple symbols from the local bar store, in the column layout of yf.download."""
         if interval is None:
             interval = self._get_interval(period)
         if market_open():
             logger.warning("***MARKET OPEN***: Data is from previous close.")
-        hist = yf.download(symbols, period=period, interval=interval)
-        logger.debug(f"yfinance multi-symbol hist: {hist.to_json(indent=2, date_format='iso')}")
-        return hist
+        return self.bar_store.get_history_many(symbols, period=period, interval=interval)
     
     async def get_stock_history_by_symbols_async(self, symbols: List[str], period: str, interval: Optional[str] = None) -> pd.DataFrame:
-        """Async version: Fetch historical stock data for multiple symbols and period using yf.download in a thread."""
-        if interval is None:
-            interval = self._get_interval(period)
-        if market_open():
-            logger.warning("***MARKET OPEN***: Data is from previous close.")
-        hist = await asyncio.to_thread(yf.download, symbols, period=period, interval=interval)
-        logger.debug(f"yfinance multi-symbol hist: {hist.to_json(indent=2, date_format='iso')}")
-        return hist
+        """Async version: serve historical stock data for multiple symbols from the bar store in a thread."""
+        return await asyncio.to_thread(self.get_stock_history_by_symbols, symbols, period, interval)
       
     def _get_stock_history(self, symbol: str, period: str, interval: Optional[str] = None) -> pd.DataFrame:
-        """Fetch historical stock data for the symbol and period. Allows specifying interval."""
+        """Historical stock data for the symbol and period from the local bar store. Allows specifying interval."""
         if interval is None:
             interval = self._get_interval(period)
         if market_open():
             logger.warning("***MARKET OPEN***: Data is from previous close.")
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period=period, interval=interval)
-        logger.debug(f"yfinance hist: {hist.to_json(indent=2, date_format='iso')}")
-        return hist
+        return self.bar_store.get_history(symbol, period=period, interval=interval)
 
     def get_technical_indicators(self, symbol: str, period: str) -> Optional[TechnicalIndicators]:
         hist = self._get_stock_history(symbol, period)
@@ -84,14 +87,7 @@ class YFinanceProvider(MarketDataProvider):
             return None
 
         # Calculate indicators
-        sma_20 = hist['Close'].rolling(window=20).mean()
-        sma_50 = hist['Close'].rolling(window=50).mean()
-        sma_200 = hist['Close'].rolling(window=200).mean()
-        rsi = calculate_rsi(hist['Close'])
-        macd_data = calculate_macd(hist['Close'])
-        bb_data = calculate_bollinger_bands(hist['Close'])
-        obv = calculate_obv(hist['Close'], hist['Volume'])
-        atr = calculate_atr(hist['High'], hist['Low'], hist['Close'])
+        latest = latest_indicator_values(calculate_indicators(hist, symbol)).loc[symbol]
 
         # Prepare OHLCV data in the desired format, similar to Alpha Vantage
         ohlcv_df = hist[['Open', 'High', 'Low', 'Close', 'Volume']].copy()
@@ -105,32 +101,22 @@ class YFinanceProvider(MarketDataProvider):
         ohlcv_df.index = ohlcv_df.index.strftime('%Y-%m-%d %H:%M:%S')
         ohlcv_data = ohlcv_df.to_dict(orient='index')
 
-        window = min(20, len(hist['Volume']))
-        # volume_trend compares the average volume of the last 5 periods to the average of the last 20 periods (or all available if less than 20)
-        volume_trend = float(hist['Volume'].iloc[-5:].mean() / hist['Volume'].iloc[-window:].mean()) if window > 0 and hist['Volume'].iloc[-window:].mean() != 0 else 0.0
-        data = {
-            'current_price': float(hist['Close'].iloc[-1]),
-            'current_volume': int(hist['Volume'].iloc[-1]),
-            'sma_20': float(sma_20.iloc[-1]),
-            'sma_50': float(sma_50.iloc[-1]),
-            'sma_200': float(sma_200.iloc[-1]),
-            'rsi': float(rsi.iloc[-1]),
-            'volume_trend': volume_trend,
-            'macd': macd_data['macd'],
-            'macd_signal': macd_data['macd_signal'],
-            'macd_hist': macd_data['macd_hist'],
-            'bb_upper': bb_data['bb_upper'],
-            'bb_middle': bb_data['bb_middle'],
-            'bb_lower': bb_data['bb_lower'],
-            'obv': obv,
-            'atr': atr,
-            'ohlcv': ohlcv_data
-        }
+        data = {name: float(value) for name, value in latest.items()}
+        data['current_volume'] = int(hist['Volume'].iloc[-1])
+        data['ohlcv'] = ohlcv_data
         logger.info("yfinance technical data:")
         logger.info(f"{json.dumps(data, indent=2)}")
         return TechnicalIndicators(**data)
 
+    def get_latest_indicators_by_symbols(self, symbols: List[str], period: str, interval: Optional[str] = None) -> pd.DataFrame:
+        """Screen many symbols at once: latest technical indicator values as a symbol x indicator frame."""
+        hist = self.get_stock_history_by_symbols(symbols, period=period, interval=interval)
+        if hist.empty:
+            return pd.DataFrame()
+        return latest_indicator_values(calculate_indicators(hist))
+
     def get_dividend_history(self, symbol: str) -> DividendHistory:
+        self.rate_limiter.acquire_sync()
         stock = yf.Ticker(symbol)
         div = stock.dividends
         logger.debug(f"yfinance dividends: {div.to_json(indent=2, date_format='iso')}")
@@ -139,6 +125,7 @@ class YFinanceProvider(MarketDataProvider):
         return DividendHistory(dividends=div.to_dict())
 
     def get_earnings_history(self, symbol: str) -> EarningsHistory:
+        self.rate_limiter.acquire_sync()
         stock = yf.Ticker(symbol)
         income = stock.income_stmt
         logger.debug(f"yfinance earnings: {income.to_json(indent=2, date_format='iso')}")
@@ -164,6 +151,7 @@ class YFinanceProvider(MarketDataProvider):
         return EarningsHistory(earnings=earnings_history)
 
     def get_market_data(self, symbol: str) -> MarketData:
+        self.rate_limiter.acquire_sync()
         stock = yf.Ticker(symbol)
         info = stock.info
 
@@ -201,6 +189,7 @@ class YFinanceProvider(MarketDataProvider):
         return MarketData(**data)
 
     def get_news(self, symbol: str) -> News:
+        self.rate_limiter.acquire_sync()
         stock = yf.Ticker(symbol)
         raw_news = stock.news
         logger.debug(f"yfinance news: {json.dumps(raw_news, indent=2)}")
@@ -4,6 +4,7 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.job import Job
 import asyncio
+import functools
 from utils.logging import setup_logger
 logger = setup_logger("scheduler")
 
@@ -20,6 +21,24 @@ class Scheduler:
         self.schedule_weekly_portfolio_analysis()
         self.schedule_daily_price_update()
         self.schedule_sync_stock_splits()
+        self.schedule_history_retention()
+
+    def _in_connection_scope(self, func):
+        """Wrap a job so each run checks out its own database connection and returns it when done."""
+        db_manager = getattr(self.app, "db_manager", None)
+        if db_manager is None:
+            return func
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def job(*args, **kwargs):
+                with db_manager.connection_scope():
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def job(*args, **kwargs):
+                with db_manager.connection_scope():
+                    return func(*args, **kwargs)
+        return job
 
     def add_job(self, func, trigger, job_id, args=None, replace_existing=True):
         """
@@ -27,7 +46,7 @@ class Scheduler:
         """
         try:
             job = self.scheduler.add_job(
-                func,
+                self._in_connection_scope(func),
                 trigger,
                 args=args,
                 id=job_id,
@@ -143,3 +162,15 @@ class Scheduler:
             replace_existing=True
         )
 
+    def schedule_history_retention(self, hour: int = 2, minute: int = 30):
+        """
+        Schedules maintain_history_tables to run daily at 2:30 AM (partition upkeep and retention).
+        """
+        logger.info(f"Scheduling history retention daily at {hour:02d}:{minute:02d}")
+        self.add_job(
+            func=self.app.maintain_history_tables,
+            trigger=CronTrigger(hour=hour, minute=minute),
+            job_id="history_retention",
+            args=None,
+            replace_existing=True
+        )
@@ -0,0 +1,53 @@
+import os
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+class AsyncDatabaseManager:
+    """Async facade that runs blocking peewee work on a dedicated, bounded thread pool.
+
+    `await adb.run(func, *args)` runs any synchronous callable (a DatabaseManager method or an
+    app method that builds a response from several queries) off the event loop, each call in
+    its own connection scope. DatabaseManager methods can also be awaited directly through
+    the facade: `await adb.get_portfolios()`.
+
+    Keep ORM work (including lazy foreign key access such as `entry.stock.symbol`) inside
+    the callable so no query runs on the event loop.
+    """
+
+    def __init__(self, db_manager, max_workers: Optional[int] = None):
+        self.db_manager = db_manager
+        # Sized to the connection pool so workers never queue on pool checkout
+        self.max_workers = max_workers or int(os.getenv("DB_EXECUTOR_WORKERS", os.getenv("POSTGRES_POOL_MAX_CONNECTIONS", 20)))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+
+    def _call(self, func: Callable[..., T], args, kwargs) -> T:
+        with self.db_manager.connection_scope():
+            return func(*args, **kwargs)
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking callable on the database thread pool and await its result."""
+        loop = asyncio.get_running_loop()
+        # Copy the caller's context so logging and other context variables carry over
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, functools.partial(context.run, self._call, func, args, kwargs))
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db_manager, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        return method
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import threading
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_BAR_DIR = "/config/bars"
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Bars re-fetched before the last stored bar so adjusted history can be detected
+OVERLAP_BARS = 3
+# Relative change in an already stored close that indicates a split/dividend re-adjustment
+ADJUSTMENT_TOLERANCE = 1e-4
+# How far back Yahoo serves intraday data for each interval (days)
+INTRADAY_MAX_DAYS = {"1m": 7, "2m": 59, "5m": 59, "15m": 59, "30m": 59, "90m": 59, "60m": 729, "1h": 729}
+INTERVAL_SECONDS = {"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "90m": 5400, "1h": 3600}
+# Daily and longer bars are refreshed at most this often
+DEFAULT_REFRESH_AFTER = 15 * 60
+
+# fetch(symbols, interval, start, period) -> {symbol: OHLCV frame}
+FetchBars = Callable[[List[str], str, Optional[datetime], Optional[str]], Dict[str, pd.DataFrame]]
+
+def period_start(period: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Earliest calendar date needed to cover a yfinance-style period ("5d", "3mo", "1y", "ytd", "max")."""
+    now = now or datetime.now()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return datetime(now.year, 1, 1)
+    count, unit = int(period.rstrip("dmoywk") or 1), period.lstrip("0123456789")
+    if unit == "d":
+        # Trading days: pad for weekends and holidays
+        return now - timedelta(days=count * 7 // 5 + 4)
+    if unit == "wk":
+        return now - timedelta(weeks=count)
+    if unit == "mo":
+        return now - pd.DateOffset(months=count)
+    if unit == "y":
+        return now - pd.DateOffset(years=count)
+    raise ValueError(f"Unsupported period: {period}")
+
+def slice_period(frame: pd.DataFrame, period: str, now: Optional[datetime] = None) -> pd.DataFrame:
+    """Return the bars of `frame` that fall within `period`, matching yfinance semantics."""
+    if frame.empty or period == "max":
+        return frame
+    if period.endswith("d") and not period.endswith("wk"):
+        # "Nd" means the last N trading sessions, not N calendar days
+        sessions = frame.index.normalize().unique()[-int(period[:-1]):]
+        return frame[frame.index.normalize() >= sessions[0]]
+    start = pd.Timestamp(period_start(period, now))
+    if frame.index.tz is not None:
+        start = start.tz_localize(frame.index.tz)
+    return frame[frame.index >= start]
+
+class BarStore:
+    """Persistent per-symbol, per-interval OHLCV store in Parquet files.
+
+    Each (symbol, interval) is a file under `{base_dir}/{interval}/{SYMBOL}.parquet` with a
+    small JSON sidecar recording when it was last fetched and how far back it covers.
+    Refreshes only download the tail since the last stored bar; if the re-fetched overlap
+    shows that stored prices changed (split/dividend adjustment), the symbol is re-downloaded.
+    """
+
+    def __init__(self, fetch: FetchBars, base_dir: Optional[str] = None, refresh_after: Optional[float] = None):
+        self.fetch = fetch
+        self.base_dir = base_dir or os.getenv("BAR_STORE_DIR", DEFAULT_BAR_DIR)
+        self.refresh_after = refresh_after
+        self._frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.fetch_count = 0
+
+    def _lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _path(self, symbol: str, interval: str, ext: str) -> str:
+        name = symbol.upper().replace("/", "_")
+        return os.path.join(self.base_dir, interval, f"{name}.{ext}")
+
+    def _refresh_after(self, interval: str) -> float:
+        if self.refresh_after is not None:
+            return self.refresh_after
+        return INTERVAL_SECONDS.get(interval, DEFAULT_REFRESH_AFTER)
+
+    def _read_meta(self, symbol: str, interval: str) -> dict:
+        path = self._path(symbol, interval, "json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def load(self, symbol: str, interval: str) -> pd.DataFrame:
+        """Return all stored bars for a symbol/interval (empty frame if none)."""
+        key = (symbol.upper(), interval)
+        if key not in self._frames:
+            path = self._path(symbol, interval, "parquet")
+            self._frames[key] = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame(columns=OHLCV_COLUMNS)
+        return self._frames[key]
+
+    def _save(self, symbol: str, interval: str, frame: pd.DataFrame, covered_from: Optional[datetime]) -> None:
+        path = self._path(symbol, interval, "parquet")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so readers never see a partially written file
+        frame.to_parquet(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        meta = {"fetched_at": time.time(), "covered_from": covered_from.isoformat() if covered_from else None}
+        with open(self._path(symbol, interval, "json"), "w") as f:
+            json.dump(meta, f)
+        self._frames[(symbol.upper(), interval)] = frame
+
+    @staticmethod
+    def _clean(frame: Optional[pd.DataFrame]) -> pd.DataFrame:
+        if frame is None or frame.empty:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        frame = frame[[c for c in OHLCV_COLUMNS if c in frame.columns]].dropna(how="all")
+        return frame[~frame.index.duplicated(keep="last")].sort_index()
+
+    @staticmethod
+    def _was_adjusted(stored: pd.DataFrame, tail: pd.DataFrame) -> bool:
+        """True if bars present in both frames (except the possibly partial last stored bar) changed."""
+        common = stored.index[:-1].intersection(tail.index)
+        if len(common) == 0:
+            return False
+        old = stored.loc[common, "Close"].to_numpy(dtype=float)
+        new = tail.loc[common, "Close"].to_numpy(dtype=float)
+        return not np.allclose(old, new, rtol=ADJUSTMENT_TOLERANCE, equal_nan=True)
+
+    def _clamp_start(self, interval: str, start: Optional[datetime]) -> Optional[datetime]:
+        if interval in INTRADAY_MAX_DAYS:
+            earliest = datetime.now() - timedelta(days=INTRADAY_MAX_DAYS[interval])
+            return earliest if start is None else max(pd.Timestamp(start).to_pydatetime(), earliest)
+        return start
+
+    def _fetch(self, symbols: List[str], interval: str, start: Optional[datetime], period: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        self.fetch_count += 1
+        start = self._clamp_start(interval, start)
+        logger.info(f"Fetching {interval} bars for {len(symbols)} symbols from {start or period}")
+        return {s.upper(): f for s, f in self.fetch(symbols, interval, start, period).items()}
+
+    def refresh(self, symbols: List[str], interval: str, period: str) -> None:
+        """Make sure the store holds `period` of bars for each symbol, fetching only what is missing."""
+        needed_from = period_start(period)
+        full, tails = [], {}
+        now = time.time()
+        for symbol in symbols:
+            meta = self._read_meta(symbol, interval)
+            stored = self.load(symbol, interval)
+            covered_from = datetime.fromisoformat(meta["covered_from"]) if meta.get("covered_from") else None
+            covers = bool(meta) and not stored.empty and (
+                covered_from is None or (needed_from is not None and covered_from <= needed_from)
+            )
+            if not covers:
+                full.append(symbol)
+            elif now - meta.get("fetched_at", 0) >= self._refresh_after(interval):
+                # Re-fetch a few bars before the last one to catch partial bars and re-adjustments
+                tails[symbol] = stored.index[max(0, len(stored) - OVERLAP_BARS)]
+
+        if tails:
+            start = min(tails.values())
+            fetched = self._fetch(list(tails), interval, start.tz_localize(None).to_pydatetime() if start.tzinfo else start.to_pydatetime())
+            for symbol in tails:
+                with self._lock((symbol.upper(), interval)):
+                    stored = self.load(symbol, interval)
+                    tail = self._clean(fetched.get(symbol.upper()))
+                    if self._was_adjusted(stored, tail):
+                        logger.info(f"Stored {interval} bars for {symbol} were re-adjusted upstream, re-downloading")
+                        full.append(symbol)
+                        continue
+                    merged = self._clean(pd.concat([stored[~stored.index.isin(tail.index)], tail]) if not tail.empty else stored)
+                    meta = self._read_meta(symbol, interval)
+                    covered_from = datetime.fromisoformat(meta["covered_from"]) if meta.get("covered_from") else None
+                    self._save(symbol, interval, merged, covered_from)
+
+        if full:
+            # Never shrink coverage that an earlier, longer request already paid for
+            starts = []
+            for symbol in full:
+                meta = self._read_meta(symbol, interval)
+                if meta.get("covered_from"):
+                    starts.append(datetime.fromisoformat(meta["covered_from"]))
+            start = min(starts + [needed_from]) if needed_from is not None else None
+            fetched = self._fetch(full, interval, start, "max" if start is None else None)
+            for symbol in full:
+                with self._lock((symbol.upper(), interval)):
+                    self._save(symbol, interval, self._clean(fetched.get(symbol.upper())), start)
+
+    def get_history(self, symbol: str, period: str, interval: str) -> pd.DataFrame:
+        """Range query for one symbol, refreshing the stored tail first if it is stale."""
+        self.refresh([symbol], interval, period)
+        return slice_period(self.load(symbol, interval), period)
+
+    def get_history_many(self, symbols: List[str], period: str, interval: str) -> pd.DataFrame:
+        """Range query for many symbols as a (price, ticker) frame in the layout of yf.download."""
+        self.refresh(symbols, interval, period)
+        frames = {symbol: slice_period(self.load(symbol, interval), period) for symbol in symbols}
+        frames = {symbol: frame for symbol, frame in frames.items() if not frame.empty}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
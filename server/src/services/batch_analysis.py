@@ -0,0 +1,106 @@
+import os
+import time
+import asyncio
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+from services.quota import DatabaseQuotaLedger, QuotaLedger, count_api_usage
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+# Alpha Vantage calls made by one uncached FundamentalGraph run: OVERVIEW + EARNINGS + INCOME_STATEMENT + BALANCE_SHEET
+CALLS_PER_ANALYSIS = 4
+# Number of symbols analyzed at once
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", 4))
+
+@dataclass
+class BatchResult:
+    symbol: str
+    status: str  # "ok", "error" or "skipped"
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    api_calls: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+class BatchAnalysisEngine:
+    """Runs an analysis coroutine over many symbols with a bounded worker pool.
+
+    Symbols are deduplicated, at most `max_concurrency` analyses run at once, and every
+    analysis reserves its API calls from an optional `QuotaLedger` before starting. Results
+    and failures are yielded per symbol as soon as each one finishes.
+
+    `runner` (e.g. AsyncDatabaseManager.run) runs the ledger calls off the event loop when
+    the ledger is database-backed; without it they run inline.
+    """
+
+    def __init__(
+        self,
+        analyze: Callable[[str], Awaitable[Dict[str, Any]]],
+        max_concurrency: Optional[int] = None,
+        quota: Optional[Union[QuotaLedger, DatabaseQuotaLedger]] = None,
+        calls_per_symbol: int = CALLS_PER_ANALYSIS,
+        runner: Optional[Callable[..., Awaitable[Any]]] = None,
+    ):
+        self.analyze = analyze
+        self.max_concurrency = max(1, max_concurrency or DEFAULT_MAX_CONCURRENCY)
+        self.quota = quota
+        self.calls_per_symbol = calls_per_symbol
+        self.runner = runner
+
+    async def _quota(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.runner is None:
+            return func(*args)
+        return await self.runner(func, *args)
+
+    @staticmethod
+    def dedupe(symbols: Iterable[str]) -> List[str]:
+        """Upper-case symbols and drop duplicates, keeping the first occurrence order."""
+        seen = {}
+        for symbol in symbols:
+            if symbol:
+                seen.setdefault(symbol.strip().upper(), None)
+        return list(seen)
+
+    async def _run_one(self, symbol: str, semaphore: asyncio.Semaphore) -> BatchResult:
+        async with semaphore:
+            reserved = 0
+            if self.quota is not None:
+                if not await self._quota(self.quota.reserve, self.calls_per_symbol):
+                    logger.warning(f"API quota for {self.quota.provider} exhausted, skipping {symbol}")
+                    return BatchResult(symbol=symbol, status="skipped", error=f"{self.quota.provider} API quota exhausted")
+                reserved = self.calls_per_symbol
+            start = time.perf_counter()
+            try:
+                result = await self.analyze(symbol)
+            except Exception as e:
+                logger.error(f"Batch analysis failed for {symbol}: {e}")
+                if self.quota is not None:
+                    # Calls the failed run actually made are not known here, so only release the reservation
+                    await self._quota(self.quota.refund, reserved)
+                return BatchResult(symbol=symbol, status="error", error=str(e), seconds=time.perf_counter() - start)
+            api_calls = 0
+            if self.quota is not None:
+                api_calls = count_api_usage((result or {}).get("usage"), self.quota.provider)
+                await self._quota(self.quota.settle, reserved, api_calls)
+            return BatchResult(symbol=symbol, status="ok", result=result, api_calls=api_calls, seconds=time.perf_counter() - start)
+
+    async def run(self, symbols: Iterable[str]) -> AsyncIterator[BatchResult]:
+        """Analyze all symbols concurrently, yielding each result as it completes."""
+        symbols = self.dedupe(symbols)
+        logger.info(f"Starting batch analysis of {len(symbols)} symbols with concurrency {self.max_concurrency}")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [asyncio.create_task(self._run_one(symbol, semaphore)) for symbol in symbols]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def run_all(self, symbols: Iterable[str]) -> List[BatchResult]:
+        """Analyze all symbols and return the results in completion order."""
+        return [result async for result in self.run(symbols)]
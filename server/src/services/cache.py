@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_CACHE_DIR = "/config/cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256MB per cache file
+
+class ResponseCache:
+    """Persistent, content-addressed response cache backed by a local SQLite file.
+
+    Entries are keyed by a SHA-256 hash of the request (see `make_key`), expire after a
+    per-entry TTL and are evicted least-recently-used first once the cache grows past
+    `max_bytes`. Hit/miss counters are kept per tag (e.g. the Alpha Vantage function name)
+    so callers can report how many upstream requests the cache saved.
+    """
+
+    def __init__(self, name: str, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.name = name
+        self.cache_dir = cache_dir or os.getenv("CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes or int(os.getenv("CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.path = os.path.join(self.cache_dir, f"{name}.sqlite")
+        self._lock = threading.Lock()
+        self._hits = Counter()
+        self._misses = Counter()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                tag TEXT,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed_at ON entries (accessed_at)")
+        logger.info(f"Response cache '{name}' using {self.path} (max {self.max_bytes} bytes)")
+
+    @staticmethod
+    def make_key(*parts: Any, **params: Any) -> str:
+        """Build a content address from the request parts and params (order-insensitive for params)."""
+        payload = json.dumps({"parts": parts, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, tag: Optional[str] = None) -> Optional[Any]:
+        """Return the cached value for `key`, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._misses[tag] += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._hits[tag] += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float, tag: Optional[str] = None) -> None:
+        """Store a JSON-serializable value for `ttl` seconds, then evict LRU entries over the size limit."""
+        if ttl <= 0:
+            return
+        data = json.dumps(value, default=str)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO entries (key, tag, value, size, created_at, expires_at, accessed_at, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, 0)""",
+                (key, tag, data, len(data), now, now + ttl, now),
+            )
+            self._evict(now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least-recently-used entries until under max_bytes. Caller holds the lock."""
+        self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.debug(f"Response cache '{self.name}' evicted {evicted} entries")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters (overall and per tag) plus current size of the cache."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            hits = sum(self._hits.values())
+            misses = sum(self._misses.values())
+            tags = sorted({t for t in list(self._hits) + list(self._misses) if t is not None})
+            return {
+                "name": self.name,
+                "entries": entries,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if (hits + misses) else 0.0,
+                "by_tag": {t: {"hits": self._hits[t], "misses": self._misses[t]} for t in tags},
+            }
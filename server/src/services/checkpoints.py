@@ -0,0 +1,237 @@
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from models.models import GraphCheckpoint, GraphCheckpointBlob, GraphCheckpointWrite
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+class DatabaseCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer that stores checkpoints in the application database.
+
+    Uses the peewee models bound to `database_proxy`, so checkpoints live in Postgres in
+    production and in whatever database the models are bound to in tests. Channel values
+    are stored once per version (GraphCheckpointBlob) rather than once per checkpoint.
+
+    `runner` (e.g. AsyncDatabaseManager.run) moves the queries of the async API off the
+    event loop; without it they run inline.
+    """
+
+    def __init__(self, *, serde=None, runner: Optional[Callable[..., Awaitable[Any]]] = None):
+        super().__init__(serde=serde)
+        self.runner = runner
+
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self.runner is None:
+            return func(*args, **kwargs)
+        return await self.runner(func, *args, **kwargs)
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        if not versions:
+            return {}
+        rows = GraphCheckpointBlob.select().where(
+            (GraphCheckpointBlob.thread_id == thread_id)
+            & (GraphCheckpointBlob.checkpoint_ns == checkpoint_ns)
+            & (GraphCheckpointBlob.channel.in_(list(versions)))
+        )
+        wanted = {(channel, str(version)) for channel, version in versions.items()}
+        return {
+            row.channel: self.serde.loads_typed((row.value_type, bytes(row.value)))
+            for row in rows
+            if (row.channel, row.version) in wanted and row.value_type != "empty"
+        }
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[Tuple[str, str, Any]]:
+        rows = list(GraphCheckpointWrite.select().where(
+            (GraphCheckpointWrite.thread_id == thread_id)
+            & (GraphCheckpointWrite.checkpoint_ns == checkpoint_ns)
+            & (GraphCheckpointWrite.checkpoint_id == checkpoint_id)
+        ))
+        rows.sort(key=lambda row: writes_sort_key(row.task_path, row.task_id, row.idx))
+        return [(row.task_id, row.channel, self.serde.loads_typed((row.value_type, bytes(row.value)))) for row in rows]
+
+    def _to_tuple(self, row: GraphCheckpoint) -> CheckpointTuple:
+        checkpoint = self.serde.loads_typed((row.checkpoint_type, bytes(row.checkpoint)))
+        configurable = {"thread_id": row.thread_id, "checkpoint_ns": row.checkpoint_ns}
+        return CheckpointTuple(
+            config={"configurable": {**configurable, "checkpoint_id": row.checkpoint_id}},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(row.thread_id, row.checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self.serde.loads_typed((row.metadata_type, bytes(row.metadata))),
+            parent_config=(
+                {"configurable": {**configurable, "checkpoint_id": row.parent_checkpoint_id}}
+                if row.parent_checkpoint_id else None
+            ),
+            pending_writes=self._load_writes(row.thread_id, row.checkpoint_ns, row.checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the requested checkpoint, or the latest one for the thread."""
+        configurable = config["configurable"]
+        query = GraphCheckpoint.select().where(
+            (GraphCheckpoint.thread_id == configurable["thread_id"])
+            & (GraphCheckpoint.checkpoint_ns == configurable.get("checkpoint_ns", ""))
+        )
+        if checkpoint_id := get_checkpoint_id(config):
+            query = query.where(GraphCheckpoint.checkpoint_id == checkpoint_id)
+        # Checkpoint ids are time-ordered (uuid6), so the greatest id is the latest checkpoint
+        row = query.order_by(GraphCheckpoint.checkpoint_id.desc()).first()
+        return self._to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints newest first, optionally filtered by thread, metadata and `before`."""
+        query = GraphCheckpoint.select()
+        if config:
+            query = query.where(GraphCheckpoint.thread_id == config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query = query.where(GraphCheckpoint.checkpoint_ns == checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query = query.where(GraphCheckpoint.checkpoint_id == checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query = query.where(GraphCheckpoint.checkpoint_id < before_id)
+        for row in query.order_by(GraphCheckpoint.checkpoint_id.desc()):
+            if limit is not None and limit <= 0:
+                break
+            item = self._to_tuple(row)
+            if filter and not all(item.metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Save a checkpoint and the channel values that changed since its parent."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint = checkpoint.copy()
+        values = checkpoint.pop("channel_values")
+        checkpoint_type, checkpoint_bytes = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_bytes = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        blobs = []
+        for channel, version in new_versions.items():
+            value_type, value = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", b"")
+            blobs.append({
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "channel": channel,
+                "version": str(version),
+                "value_type": value_type,
+                "value": value,
+            })
+        with GraphCheckpoint._meta.database.atomic():
+            if blobs:
+                GraphCheckpointBlob.insert_many(blobs).on_conflict_ignore().execute()
+            GraphCheckpoint.insert(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=checkpoint["id"],
+                parent_checkpoint_id=config["configurable"].get("checkpoint_id"),
+                checkpoint_type=checkpoint_type,
+                checkpoint=checkpoint_bytes,
+                metadata_type=metadata_type,
+                metadata=metadata_bytes,
+            ).on_conflict(
+                conflict_target=[GraphCheckpoint.thread_id, GraphCheckpoint.checkpoint_ns, GraphCheckpoint.checkpoint_id],
+                preserve=[GraphCheckpoint.checkpoint_type, GraphCheckpoint.checkpoint, GraphCheckpoint.metadata_type, GraphCheckpoint.metadata],
+            ).execute()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        """Save the writes of a finished node so a retry of the step does not re-run it."""
+        configurable = config["configurable"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_bytes = self.serde.dumps_typed(value)
+            rows.append({
+                "thread_id": configurable["thread_id"],
+                "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                "checkpoint_id": configurable["checkpoint_id"],
+                "task_id": task_id,
+                "task_path": task_path,
+                "idx": WRITES_IDX_MAP.get(channel, idx),
+                "channel": channel,
+                "value_type": value_type,
+                "value": value_bytes,
+            })
+        if not rows:
+            return
+        query = GraphCheckpointWrite.insert_many(rows)
+        if all(row["idx"] >= 0 for row in rows):
+            # Regular writes are idempotent; special writes (errors, interrupts) replace earlier ones
+            query = query.on_conflict_ignore()
+        else:
+            query = query.on_conflict(
+                conflict_target=[GraphCheckpointWrite.thread_id, GraphCheckpointWrite.checkpoint_ns, GraphCheckpointWrite.checkpoint_id, GraphCheckpointWrite.task_id, GraphCheckpointWrite.idx],
+                preserve=[GraphCheckpointWrite.channel, GraphCheckpointWrite.value_type, GraphCheckpointWrite.value],
+            )
+        query.execute()
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints, channel values and writes of a run."""
+        with GraphCheckpoint._meta.database.atomic():
+            for model in (GraphCheckpoint, GraphCheckpointBlob, GraphCheckpointWrite):
+                model.delete().where(model.thread_id == thread_id).execute()
+
+    # Peewee is synchronous; the async API runs the same queries through the runner
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._run(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await self._run(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return await self._run(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        await self._run(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._run(self.delete_thread, thread_id)
+
+def create_checkpointer(backend: Optional[str] = None, runner: Optional[Callable[..., Awaitable[Any]]] = None) -> BaseCheckpointSaver:
+    """Return the graph checkpointer selected by `backend` or the GRAPH_CHECKPOINTER env var ("database" or "memory").
+
+    `runner` is passed to the database checkpointer to run its async queries off the event loop.
+    """
+    backend = (backend or os.getenv("GRAPH_CHECKPOINTER", "database")).lower()
+    if backend == "memory":
+        return InMemorySaver()
+    if backend == "database":
+        return DatabaseCheckpointSaver(runner=runner)
+    raise ValueError(f"Unknown graph checkpointer: {backend}")
@@ -3,7 +3,7 @@ import json
 import time
 import random
 from contextlib import contextmanager
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from importlib import util
 from peewee import *
 from playhouse.postgres_ext import PostgresqlExtDatabase
@@ -12,16 +12,41 @@ from typing import Optional, List, Dict, Any, Union
 from pathlib import Path
 from services.migrations import get_migration_files
 from utils.logging import setup_logger
-from models.models import Stock, StockSplit, StockTransactionLog, TechnicalAnalysis, Research, HistoricalValues, TechnicalHistoricalValues, Portfolio, PortfolioResearch, CashBalance, SwingResearch, SwingTradePlanHistory, SwingStock, TokenUsage, ApiRequestUsage
+from utils.financial import summarize_holdings
+from utils.pagination import encode_cursor, decode_cursor
+from services.db_pool import MeteredPooledPostgresqlExtDatabase
+from services import partitions
+from services.stock_cache import StockIdentityMap
+from models.models import Stock, StockSplit, StockTransactionLog, TechnicalAnalysis, Research, HistoricalValues, TechnicalHistoricalValues, Portfolio, PortfolioResearch, CashBalance, SwingResearch, SwingTradePlanHistory, SwingStock, TokenUsage, ApiRequestUsage, GraphRun, GraphCheckpoint, GraphCheckpointBlob, GraphCheckpointWrite, PortfolioHolding, ApiQuota, TokenUsageDaily, ApiUsageDaily, EconomicAnalysis
 from models.models import database_proxy
 
 # Configure logging
 logger = setup_logger(__name__)
 
 MIGRATIONS_VERSION_TABLE = 'migrations_version'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Monthly partitions kept ahead of time, and how long raw rows are kept before rollup/compaction
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
+TOKEN_USAGE_RETENTION_MONTHS = int(os.getenv('TOKEN_USAGE_RETENTION_MONTHS', 3))
+SNAPSHOT_RETENTION_MONTHS = int(os.getenv('SNAPSHOT_RETENTION_MONTHS', 12))
+# How long a stored economic analysis is reused for the same FRED window
+ECONOMIC_ANALYSIS_TTL_HOURS = float(os.getenv('ECONOMIC_ANALYSIS_TTL_HOURS', 24))
+# Usage rollups can be aggregated per day, per step (source:node) or per source (e.g. stock:AAPL)
+USAGE_GROUPS = ("day", "step", "source")
+# Research.structured_output keys read in SQL, with the type they are cast to (None keeps text)
+RESEARCH_SUMMARY_KEYS = {
+    "final_recommendation": None,
+    "final_confidence_score": "float",
+    "high_price_target": "float",
+    "price_target_percent": "float",
+}
 
 class DatabaseManager:
-    _tables = [Stock, StockSplit, StockTransactionLog, TechnicalAnalysis, Research, HistoricalValues, TechnicalHistoricalValues, Portfolio, PortfolioResearch, CashBalance, SwingResearch, SwingTradePlanHistory, SwingStock, TokenUsage, ApiRequestUsage]
+    _tables = [Stock, StockSplit, StockTransactionLog, TechnicalAnalysis, Research, HistoricalValues, TechnicalHistoricalValues, Portfolio, PortfolioResearch, CashBalance, SwingResearch, SwingTradePlanHistory, SwingStock, TokenUsage, ApiRequestUsage, GraphRun, GraphCheckpoint, GraphCheckpointBlob, GraphCheckpointWrite, PortfolioHolding, ApiQuota, TokenUsageDaily, ApiUsageDaily, EconomicAnalysis]
+
+    # Shared by every DatabaseManager caller in this process
+    stock_cache = StockIdentityMap()
 
     def __init__(self):
         self._initialize()
@@ -36,23 +61,38 @@ class DatabaseManager:
         POSTGRES_HOST = os.getenv('POSTGRES_HOST', 'localhost')
         POSTGRES_PORT = os.getenv('POSTGRES_PORT', '5432')
 
-        self._db = PostgresqlExtDatabase(
-            POSTGRES_DB,
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD,
-            host=POSTGRES_HOST,
-            port=POSTGRES_PORT,
-            autorollback=True
-        )
+        # Pooled mode gives every API request and scheduled job its own connection
+        self.pooled = os.getenv('POSTGRES_POOL', 'true').lower() in ('1', 'true', 'yes')
+        if self.pooled:
+            self._db = MeteredPooledPostgresqlExtDatabase(
+                POSTGRES_DB,
+                user=POSTGRES_USER,
+                password=POSTGRES_PASSWORD,
+                host=POSTGRES_HOST,
+                port=POSTGRES_PORT,
+                max_connections=int(os.getenv('POSTGRES_POOL_MAX_CONNECTIONS', 20)),
+                stale_timeout=int(os.getenv('POSTGRES_POOL_STALE_TIMEOUT', 300)),
+                timeout=int(os.getenv('POSTGRES_POOL_TIMEOUT', 30))
+            )
+        else:
+            self._db = PostgresqlExtDatabase(
+                POSTGRES_DB,
+                user=POSTGRES_USER,
+                password=POSTGRES_PASSWORD,
+                host=POSTGRES_HOST,
+                port=POSTGRES_PORT,
+                autorollback=True
+            )
 
         # Bind the Peewee Proxy to the actual db instance
         database_proxy.initialize(self._db)
         self.db = database_proxy
 
-        self._db.connect()
-        self._db.create_tables(self._tables)
-        self._run_migrations()
-        #self._db.close()
+        with self.connection_scope():
+            self._db.connect(reuse_if_open=True)
+            self._db.create_tables(self._tables)
+            self._run_migrations()
+            self.ensure_partitions()
 
     def _run_migrations(self):
         """Run all pending database migrations"""
@@ -150,6 +190,32 @@ class DatabaseManager:
             # Keep connection open; do not close here.
             pass
 
+    @contextmanager
+    def connection_scope(self):
+        """Give the enclosed request or job its own pooled connection and return it to the pool afterwards.
+
+        The connection is checked out lazily on the first query. Without pooling this is a
+        no-op and everything keeps sharing the single connection.
+        """
+        if not self.pooled:
+            yield self._db
+            return
+        token = self._db._state.push()
+        try:
+            yield self._db
+        finally:
+            try:
+                if not self._db.is_closed():
+                    self._db.close()
+            finally:
+                self._db._state.pop(token)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Return connection pool utilization and wait-time metrics."""
+        if not self.pooled:
+            return {"pooled": False}
+        return {"pooled": True, **self._db.pool_stats()}
+
     def _get_current_version(self):
         """Get the current database migration version"""
         try:
@@ -171,21 +237,50 @@ class DatabaseManager:
     @staticmethod
     def get_stock_by_id(stock_id: int) -> Optional[Stock]:
         """Get a stock by its ID. Returns the Stock instance or None if not found."""
-        return Stock.get_or_none(Stock.id == stock_id)
+        stock = DatabaseManager.stock_cache.get_by_id(stock_id)
+        if stock is None:
+            stock = Stock.get_or_none(Stock.id == stock_id)
+            if stock is not None:
+                DatabaseManager.stock_cache.put(stock)
+        return stock
 
     @staticmethod
     def get_stock_by_symbol(symbol: str) -> Optional[Stock]:
         """Get a stock by its symbol. Returns the Stock instance or None if not found."""
-        return Stock.get_or_none(Stock.symbol == symbol.upper())
+        stock = DatabaseManager.stock_cache.get_by_symbol(symbol)
+        if stock is None:
+            stock = Stock.get_or_none(Stock.symbol == symbol.upper())
+            if stock is not None:
+                DatabaseManager.stock_cache.put(stock)
+        return stock
+
+    @staticmethod
+    def get_stocks_by_symbols(symbols: List[str]) -> Dict[str, Stock]:
+        """Get many stocks keyed by symbol; symbols not in the identity map are read in a single query"""
+        stocks = {}
+        missing = []
+        for symbol in {s.upper() for s in symbols}:
+            stock = DatabaseManager.stock_cache.get_by_symbol(symbol)
+            if stock is None:
+                missing.append(symbol)
+            else:
+                stocks[symbol] = stock
+        if missing:
+            for stock in Stock.select().where(Stock.symbol.in_(missing)):
+                stocks[stock.symbol] = DatabaseManager.stock_cache.put(stock)
+        return stocks
 
     @staticmethod
     def get_or_create_stock(symbol: str) -> tuple[Optional[Stock], bool]:
         """Get or create a stock entry, returns (stock, created) tuple. If creation fails, returns (None, False)"""
+        stock = DatabaseManager.stock_cache.get_by_symbol(symbol)
+        if stock is not None:
+            return stock, False
         try:
             stock, created = Stock.get_or_create(symbol=symbol.upper())
             if stock is not None:
                 logger.debug(f"Stock {symbol} {'created' if created else 'found'} in database.")
-                return stock, created
+                return DatabaseManager.stock_cache.put(stock), created
             else:
                 logger.error(f"Failed to get or create stock for symbol: {symbol}")
                 return None, False
@@ -199,8 +294,29 @@ class DatabaseManager:
         stock = Stock.get_or_none(Stock.id == stock_id)
         if stock:
             stock.delete_instance()
-            return True
-        return False
+        DatabaseManager.stock_cache.invalidate(stock_id=stock_id)
+        return stock is not None
+
+    @staticmethod
+    def update_stock_price(symbol: str, close: Optional[float], volume: Optional[int], data_updated_at: datetime) -> bool:
+        """Store a stock's latest close and volume; returns False if the stock does not exist"""
+        updated = (Stock
+                   .update(close=close, volume=volume, data_updated_at=data_updated_at, updated_at=datetime.now())
+                   .where(Stock.symbol == symbol.upper())
+                   .execute())
+        DatabaseManager.stock_cache.invalidate(symbol=symbol)
+        return updated == 1
+
+    @staticmethod
+    def mark_splits_updated(symbol: str, updated_at: Optional[datetime] = None) -> bool:
+        """Record when a stock's splits were last synced; returns False if the stock does not exist"""
+        now = datetime.now()
+        updated = (Stock
+                   .update(splits_updated_at=updated_at or now, updated_at=now)
+                   .where(Stock.symbol == symbol.upper())
+                   .execute())
+        DatabaseManager.stock_cache.invalidate(symbol=symbol)
+        return updated == 1
 
     @staticmethod
     def get_all_stocks() -> list[Stock]:
@@ -252,42 +368,85 @@ class DatabaseManager:
                    .limit(limit))
     
     @staticmethod
-    def get_all_research_history_list(stock: Stock, limit: int = 9) -> list:
-        """Get research history for a stock, selecting only id, symbol, created_at, and structured_output with parsed fields."""
+    def _keyset_page(query, model, limit: Optional[int] = None, cursor: Optional[str] = None):
+        """Return one newest-first page of `query` as dicts plus the cursor of the next page (None on the last page).
+
+        Seeks past (created_at, id) of the cursor instead of using OFFSET, so every page costs
+        the same however deep it is.
+        """
+        limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            query = query.where(
+                (model.created_at < created_at) | ((model.created_at == created_at) & (model.id < row_id))
+            )
+        rows = list(query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).dicts())
+        next_cursor = encode_cursor(rows[limit - 1]["created_at"], rows[limit - 1]["id"]) if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    @staticmethod
+    def _research_summary_column(key: str):
+        """structured_output->>key, cast to its RESEARCH_SUMMARY_KEYS type"""
+        column = Research.structured_output[key]
+        cast = RESEARCH_SUMMARY_KEYS[key]
+        return column.cast(cast) if cast else column
+
+    @staticmethod
+    def get_all_research_history_list(limit: int = 9, cursor: Optional[str] = None):
+        """Get a page of research history for all stocks with the structured_output summary fields, and the next cursor."""
         query = (Research
-                 .select(Research.id, Research.stock, Research.created_at, Research.structured_output)
-                 .order_by(Research.created_at.desc())
-                 .limit(limit))
-        results = []
-        for entry in query:
-            # Parse structured_output JSON and extract required fields
-            so = entry.structured_output
-            if isinstance(so, str):
-                try:
-                    so = json.loads(so)
-                except Exception:
-                    so = {}
-            results.append({
-                "id": entry.id,
-                "symbol": entry.stock.symbol,
-                "created_at": str(entry.created_at),
-                "final_recommendation": so.get("final_recommendation"),
-                "final_confidence_score": so.get("final_confidence_score"),
-                "high_price_target": so.get("high_price_target"),
-                "price_target_percent": so.get("price_target_percent")
-            })
-        return results
-
-    @staticmethod
-    def get_research_by_symbol(symbol: str) -> list:
-        """Get all research entries for a stock symbol"""
-        stock = Stock.get_or_none(Stock.symbol == symbol.upper())
-        if stock:
-            return list(Research
-                       .select()
-                       .where(Research.stock == stock)
-                       .order_by(Research.created_at.desc()))
-        return []
+                 .select(Research.id, Research.created_at, Stock.symbol,
+                         *[DatabaseManager._research_summary_column(key).alias(key) for key in RESEARCH_SUMMARY_KEYS])
+                 .join(Stock))
+        rows, next_cursor = DatabaseManager._keyset_page(query, Research, limit, cursor)
+        for row in rows:
+            row["created_at"] = str(row["created_at"])
+        return rows, next_cursor
+
+    @staticmethod
+    def screen_research(
+        recommendation: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        min_price_target_percent: Optional[float] = None,
+        order_by: str = "price_target_percent",
+        descending: bool = True,
+        limit: int = DEFAULT_PAGE_SIZE
+    ) -> List[Dict[str, Any]]:
+        """Filter and sort the latest research of every stock on its structured_output fields, in SQL"""
+        if order_by not in RESEARCH_SUMMARY_KEYS and order_by != "created_at":
+            raise ValueError(f"Cannot order by {order_by}")
+        # Latest research per stock, answered from the (stock, created_at) index
+        Latest = Research.alias()
+        latest = (Latest
+                  .select(Latest.stock, fn.MAX(Latest.created_at).alias("latest_at"))
+                  .group_by(Latest.stock)
+                  .alias("latest"))
+        columns = {key: DatabaseManager._research_summary_column(key) for key in RESEARCH_SUMMARY_KEYS}
+        query = (Research
+                 .select(Research.id, Research.created_at, Stock.symbol, *[column.alias(key) for key, column in columns.items()])
+                 .join(latest, on=((Research.stock == latest.c.stock_id) & (Research.created_at == latest.c.latest_at)))
+                 .switch(Research)
+                 .join(Stock))
+        if recommendation:
+            query = query.where(fn.UPPER(columns["final_recommendation"]) == recommendation.upper())
+        if min_confidence is not None:
+            query = query.where(columns["final_confidence_score"] >= min_confidence)
+        if min_price_target_percent is not None:
+            query = query.where(columns["price_target_percent"] >= min_price_target_percent)
+        sort = Research.created_at if order_by == "created_at" else columns[order_by]
+        sort = sort.desc(nulls="LAST") if descending else sort.asc(nulls="LAST")
+        rows = list(query.order_by(sort, Stock.symbol).limit(max(1, min(limit, MAX_PAGE_SIZE))).dicts())
+        for row in rows:
+            row["created_at"] = str(row["created_at"])
+        return rows
+
+    @staticmethod
+    def list_research(symbol: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+        """Page of research listings (id, symbol, created_at) newest first, without the report bodies"""
+        query = Research.select(Research.id, Research.created_at, Stock.symbol).join(Stock)
+        if symbol:
+            query = query.where(Stock.symbol == symbol.upper())
+        return DatabaseManager._keyset_page(query, Research, limit, cursor)
 
     @staticmethod
     def get_latest_research_by_symbol(symbol: str) -> Optional[Research]:
@@ -303,8 +462,8 @@ class DatabaseManager:
 
     @staticmethod
     def get_research_by_id(research_id: int) -> Optional[Research]:
-        """Get a research entry by its ID"""
-        return Research.get_or_none(Research.id == research_id)
+        """Get a research entry by its ID, with its stock loaded in the same query"""
+        return Research.select(Research, Stock).join(Stock).where(Research.id == research_id).first()
 
     @staticmethod
     def update_research(research: Research, **kwargs) -> Research:
@@ -381,6 +540,83 @@ class DatabaseManager:
 
         return list(query.order_by(HistoricalValues.created_at.desc()).limit(limit))
 
+    @staticmethod
+    def get_latest_historical_values_by_stock(stock_ids: List[int]) -> Dict[int, HistoricalValues]:
+        """Get the latest historical values for many stocks in a single query, keyed by stock id"""
+        if not stock_ids:
+            return {}
+        latest = DatabaseManager._latest_ids_per_stock(HistoricalValues, stock_ids)
+        query = HistoricalValues.select().where(HistoricalValues.id.in_(latest))
+        return {row.stock_id: row for row in query}
+
+    @staticmethod
+    def _latest_ids_per_stock(model, stock_ids: Optional[List[int]] = None):
+        """Subquery of the id of the newest `model` row per stock, read from the (stock, created_at) index.
+
+        Postgres answers it with DISTINCT ON (stock_id); other databases join a grouped MAX(created_at).
+        """
+        if isinstance(database_proxy.obj, PostgresqlDatabase):
+            query = (model
+                     .select(model.id)
+                     .distinct(model.stock)
+                     .order_by(model.stock, model.created_at.desc(), model.id.desc()))
+            if stock_ids is not None:
+                query = query.where(model.stock.in_(stock_ids))
+            return query
+        Latest = model.alias()
+        latest = Latest.select(Latest.stock, fn.MAX(Latest.created_at).alias("latest_at"))
+        if stock_ids is not None:
+            latest = latest.where(Latest.stock.in_(stock_ids))
+        latest = latest.group_by(Latest.stock).alias("latest")
+        return (model
+                .select(fn.MAX(model.id))
+                .join(latest, on=((model.stock == latest.c.stock_id) & (model.created_at == latest.c.latest_at)))
+                .group_by(model.stock)
+                .order_by())
+
+    @staticmethod
+    def get_latest_snapshots(symbols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Latest historical and technical values of every stock (or only `symbols`) in a single query"""
+        stock_ids = None
+        if symbols:
+            # Resolved through the identity map so the latest-row subqueries only scan these stocks' history
+            stock_ids = [stock.id for stock in DatabaseManager.get_stocks_by_symbols(symbols).values()]
+            if not stock_ids:
+                return []
+        Historical = HistoricalValues.alias()
+        Technical = TechnicalHistoricalValues.alias()
+        latest_historical = DatabaseManager._latest_ids_per_stock(HistoricalValues, stock_ids)
+        latest_technical = DatabaseManager._latest_ids_per_stock(TechnicalHistoricalValues, stock_ids)
+        query = (Stock
+                 .select(Stock.id, Stock.symbol, Historical, Technical)
+                 .join(Historical, JOIN.LEFT_OUTER, attr="historical",
+                       on=((Historical.stock == Stock.id) & Historical.id.in_(latest_historical)))
+                 .switch(Stock)
+                 .join(Technical, JOIN.LEFT_OUTER, attr="technical",
+                       on=((Technical.stock == Stock.id) & Technical.id.in_(latest_technical)))
+                 .where(Historical.id.is_null(False) | Technical.id.is_null(False))
+                 .order_by(Stock.symbol))
+        if stock_ids is not None:
+            query = query.where(Stock.id.in_(stock_ids))
+
+        def snapshot(row):
+            if row is None or row.id is None:
+                return None
+            data = {field.name: getattr(row, field.name) for field in row._meta.sorted_fields if field.name not in ("id", "stock")}
+            data["created_at"] = str(data["created_at"])
+            data["updated_at"] = str(data["updated_at"])
+            return data
+
+        return [
+            {
+                "stock_id": stock.id,
+                "symbol": stock.symbol,
+                "historical": snapshot(getattr(stock, "historical", None)),
+                "technical": snapshot(getattr(stock, "technical", None)),
+            }
+            for stock in query
+        ]
+
     @staticmethod
     def get_latest_historical_values(stock: Stock, before_date: Optional[datetime] = None) -> Optional[HistoricalValues]:
         """Get the latest historical values for a stock.
@@ -447,23 +683,17 @@ class DatabaseManager:
         )
 
     @staticmethod
-    def get_technical_by_symbol(symbol: str) -> list:
-        """Get all technical analysis entries for a stock symbol"""
-        stock = Stock.get_or_none(Stock.symbol == symbol.upper())
-        if stock:
-            return list(
-                TechnicalAnalysis
-                .select()
-                .where(TechnicalAnalysis.stock == stock)
-                .order_by(TechnicalAnalysis.created_at.desc())
-            )
-        return []
+    def list_technical(symbol: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+        """Page of technical analysis listings (id, symbol, created_at) newest first, without the analysis text"""
+        query = TechnicalAnalysis.select(TechnicalAnalysis.id, TechnicalAnalysis.created_at, Stock.symbol).join(Stock)
+        if symbol:
+            query = query.where(Stock.symbol == symbol.upper())
+        return DatabaseManager._keyset_page(query, TechnicalAnalysis, limit, cursor)
 
     @staticmethod
     def get_technical_by_id(technical_id: int):
         """Get a technical analysis entry by its ID"""
-        from models.models import TechnicalAnalysis
-        return TechnicalAnalysis.get_or_none(TechnicalAnalysis.id == technical_id)
+        return TechnicalAnalysis.select(TechnicalAnalysis, Stock).join(Stock).where(TechnicalAnalysis.id == technical_id).first()
 
     @staticmethod
     def create_technical_historical_values(
@@ -487,6 +717,31 @@ class DatabaseManager:
             rsi=rsi
         )
 
+    # --- EconomicAnalysis Methods ---
+    @staticmethod
+    def get_economic_analysis(window_start: date, window_end: date, now: Optional[datetime] = None) -> Optional[EconomicAnalysis]:
+        """Latest economic analysis of the window that has not expired yet, or None"""
+        return (EconomicAnalysis
+                .select()
+                .where(
+                    (EconomicAnalysis.window_start == window_start) &
+                    (EconomicAnalysis.window_end == window_end) &
+                    (EconomicAnalysis.expires_at > (now or datetime.now())))
+                .order_by(EconomicAnalysis.created_at.desc(), EconomicAnalysis.id.desc())
+                .first())
+
+    @staticmethod
+    def create_economic_analysis(window_start: date, window_end: date, analysis: str, trends: Optional[dict] = None, ttl_hours: Optional[float] = None) -> EconomicAnalysis:
+        """Store an economic analysis that stays valid for `ttl_hours` (ECONOMIC_ANALYSIS_TTL_HOURS by default)"""
+        ttl = ECONOMIC_ANALYSIS_TTL_HOURS if ttl_hours is None else ttl_hours
+        return EconomicAnalysis.create(
+            window_start=window_start,
+            window_end=window_end,
+            analysis=analysis,
+            trends=json.dumps(trends, default=str) if trends is not None else None,
+            expires_at=datetime.now() + timedelta(hours=ttl),
+        )
+
     # --- PortfolioResearch Methods ---
     @staticmethod
     def create_portfolio_research(
@@ -585,33 +840,236 @@ class DatabaseManager:
 
     # --- TokenUsage Methods ---
     @staticmethod
-    def save_token_usage(step: str, input_tokens: int, output_tokens: int, total_tokens: int) -> TokenUsage:
+    def save_token_usage(step: str, input_tokens: int, output_tokens: int, total_tokens: int, cache_hit: bool = False) -> TokenUsage:
         """Save token usage stats for a step"""
         return TokenUsage.create(
             step=step,
             input_tokens=input_tokens,
             output_tokens=output_tokens,
-            total_tokens=total_tokens
+            total_tokens=total_tokens,
+            cache_hit=cache_hit
         )
     
     @staticmethod
     def get_token_usage(start_date: Optional[str] = None, end_date: Optional[str] = None) -> list:
-        """Get token usage records for a date range (YYYY-MM-DD)"""
+        """Get token usage records for a date range (YYYY-MM-DD), followed by the daily totals of purged days"""
         query = TokenUsage.select()
+        daily = TokenUsageDaily.select()
         if start_date:
             query = query.where(TokenUsage.created_at >= start_date)
+            daily = daily.where(TokenUsageDaily.day >= start_date)
         if end_date:
             query = query.where(TokenUsage.created_at <= end_date)
-        return [
+            daily = daily.where(TokenUsageDaily.day <= end_date)
+        # Days whose raw rows were purged are served from the daily rollup
+        oldest = TokenUsage.select(fn.MIN(TokenUsage.created_at)).scalar()
+        if oldest is not None:
+            daily = daily.where(TokenUsageDaily.day < oldest.date())
+        rows = [
             {
                 "date": str(row.created_at.date()),
                 "step": row.step,
                 "input_tokens": row.input_tokens,
                 "output_tokens": row.output_tokens,
-                "total_tokens": row.total_tokens
+                "total_tokens": row.total_tokens,
+                "cache_hit": row.cache_hit
             }
             for row in query.order_by(TokenUsage.created_at.desc())
         ]
+        rows.extend(
+            {
+                "date": str(row.day),
+                "step": row.step,
+                "input_tokens": row.input_tokens,
+                "output_tokens": row.output_tokens,
+                "total_tokens": row.total_tokens,
+                "cache_hit": None,
+                "calls": row.calls,
+                "cache_hits": row.cache_hits,
+                "cached_total_tokens": row.cached_total_tokens
+            }
+            for row in daily.order_by(TokenUsageDaily.day.desc(), TokenUsageDaily.step)
+        )
+        return rows
+
+    # --- Partitioning and retention ---
+    @staticmethod
+    def ensure_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD) -> int:
+        """Create the upcoming monthly partitions of the history tables (no-op without Postgres partitioning)"""
+        db = database_proxy.obj
+        if not partitions.supports_partitions(db):
+            return 0
+        return partitions.ensure_partitions(db, months_ahead)
+
+    @staticmethod
+    def purge_token_usage(before: date) -> int:
+        """Remove TokenUsage rows created before `before`; their totals remain in TokenUsageDaily. Returns rows removed"""
+        db = database_proxy.obj
+        aged = TokenUsage.created_at < before
+        with db.atomic():
+            count = TokenUsage.select().where(aged).count()
+            if not count:
+                return 0
+            # Whole months go by dropping their partition; the DELETE only sees rows left elsewhere
+            if partitions.supports_partitions(db) and partitions.is_partitioned(db, TokenUsage):
+                for month in partitions.list_partitions(db, TokenUsage):
+                    if partitions.add_months(month, 1) <= before:
+                        partitions.drop_partition(db, TokenUsage, month)
+            TokenUsage.delete().where(aged).execute()
+        return count
+
+    @staticmethod
+    def _usage_summary(model, group_by: str, totals: List[Field], order_total: Field, start_date, end_date, limit, query=None) -> Dict[str, Any]:
+        """Aggregate a daily usage rollup table per day, step or source, with grand totals for the range"""
+        allowed = USAGE_GROUPS + (("provider",) if model is ApiUsageDaily else ())
+        if group_by not in allowed:
+            raise ValueError(f"Cannot group usage by {group_by}")
+        key = getattr(model, group_by)
+        sums = [fn.SUM(field).alias(field.name) for field in totals]
+        query = query if query is not None else model.select()
+        if start_date:
+            query = query.where(model.day >= start_date)
+        if end_date:
+            query = query.where(model.day <= end_date)
+        grand = query.select(*sums).dicts().get()
+        order = key.desc() if group_by == "day" else fn.SUM(order_total).desc()
+        rows = list(query
+                    .select(key.alias(group_by), *sums)
+                    .group_by(key)
+                    .order_by(order, key)
+                    .limit(max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)))
+                    .dicts())
+        for row in rows:
+            row[group_by] = str(row[group_by])
+        return {"group_by": group_by, "rows": rows, "totals": {name: value or 0 for name, value in grand.items()}}
+
+    @staticmethod
+    def get_token_usage_summary(group_by: str = "day", start_date: Optional[str] = None, end_date: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Billed token totals per day, step or source from TokenUsageDaily; tokens replayed from the LLM cache are reported as cached_*"""
+        totals = [TokenUsageDaily.calls, TokenUsageDaily.input_tokens, TokenUsageDaily.output_tokens, TokenUsageDaily.total_tokens, TokenUsageDaily.cache_hits,
+                  TokenUsageDaily.cached_input_tokens, TokenUsageDaily.cached_output_tokens, TokenUsageDaily.cached_total_tokens]
+        return DatabaseManager._usage_summary(TokenUsageDaily, group_by, totals, TokenUsageDaily.total_tokens, start_date, end_date, limit)
+
+    @staticmethod
+    def get_api_usage_summary(group_by: str = "day", provider: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """API call totals per day, step, source or provider from ApiUsageDaily"""
+        query = ApiUsageDaily.select()
+        if provider:
+            query = query.where(ApiUsageDaily.provider == provider)
+        totals = [ApiUsageDaily.calls, ApiUsageDaily.requests]
+        return DatabaseManager._usage_summary(ApiUsageDaily, group_by, totals, ApiUsageDaily.calls, start_date, end_date, limit, query=query)
+
+    @staticmethod
+    def compact_snapshots(model, before: date) -> int:
+        """Keep only the last row per stock per day of `model` rows created before `before`; returns rows deleted"""
+        Keep = model.alias()
+        keep = (Keep
+                .select(fn.MAX(Keep.id))
+                .where(Keep.created_at < before)
+                .group_by(Keep.stock, fn.DATE(Keep.created_at)))
+        return model.delete().where((model.created_at < before) & model.id.not_in(keep)).execute()
+
+    @staticmethod
+    def run_retention(
+        token_usage_months: int = TOKEN_USAGE_RETENTION_MONTHS,
+        snapshot_months: int = SNAPSHOT_RETENTION_MONTHS,
+        today: Optional[date] = None
+    ) -> Dict[str, int]:
+        """Purge token usage past its retention (its daily totals are kept) and compact old snapshots to one per stock per day.
+
+        Cutoffs fall on month boundaries so each run retires whole partitions.
+        """
+        current = partitions.month_start(today or date.today())
+        snapshot_cutoff = partitions.add_months(current, -snapshot_months)
+        result = {
+            "partitions_created": DatabaseManager.ensure_partitions(),
+            "token_usage_purged": DatabaseManager.purge_token_usage(partitions.add_months(current, -token_usage_months)),
+            "historical_values_compacted": DatabaseManager.compact_snapshots(HistoricalValues, snapshot_cutoff),
+            "technical_values_compacted": DatabaseManager.compact_snapshots(TechnicalHistoricalValues, snapshot_cutoff),
+        }
+        logger.info(f"History retention: {result}")
+        return result
+
+    # --- ApiQuota Methods ---
+    @staticmethod
+    def record_api_calls(provider: str, calls: int, requests: int = 1, day: Optional[date] = None) -> None:
+        """Add calls made to a provider to its daily counter (single upsert)"""
+        day = day or date.today()
+        ApiQuota.insert(provider=provider, day=day, used=calls, requests=requests).on_conflict(
+            conflict_target=[ApiQuota.provider, ApiQuota.day],
+            update={
+                ApiQuota.used: ApiQuota.used + EXCLUDED.used,
+                ApiQuota.requests: ApiQuota.requests + EXCLUDED.requests,
+                ApiQuota.updated_at: datetime.now(),
+            },
+        ).execute()
+
+    @staticmethod
+    def reserve_api_calls(provider: str, calls: int, limit: int, day: Optional[date] = None) -> bool:
+        """Reserve calls against a daily limit; False if used + reserved + calls would exceed it"""
+        day = day or date.today()
+        ApiQuota.insert(provider=provider, day=day).on_conflict_ignore().execute()
+        # The limit check and the increment are one statement, so concurrent reservations cannot overrun
+        updated = (ApiQuota
+                   .update(reserved=ApiQuota.reserved + calls, updated_at=datetime.now())
+                   .where((ApiQuota.provider == provider)
+                          & (ApiQuota.day == day)
+                          & (ApiQuota.used + ApiQuota.reserved + calls <= limit))
+                   .execute())
+        return updated == 1
+
+    @staticmethod
+    def release_api_calls(provider: str, calls: int, day: Optional[date] = None) -> None:
+        """Release calls reserved with reserve_api_calls"""
+        day = day or date.today()
+        (ApiQuota
+         .update(reserved=Case(None, [(ApiQuota.reserved >= calls, ApiQuota.reserved - calls)], 0), updated_at=datetime.now())
+         .where((ApiQuota.provider == provider) & (ApiQuota.day == day))
+         .execute())
+
+    @staticmethod
+    def get_api_quota(provider: str, day: Optional[date] = None) -> Dict[str, int]:
+        """Calls used, usage records and in-flight reservations for a provider on a day"""
+        row = ApiQuota.get_or_none((ApiQuota.provider == provider) & (ApiQuota.day == (day or date.today())))
+        if row is None:
+            return {"used": 0, "requests": 0, "reserved": 0}
+        return {"used": row.used, "requests": row.requests, "reserved": row.reserved}
+
+    # --- GraphRun Methods ---
+    @staticmethod
+    def start_graph_run(run_id: str, graph: str, symbol: Optional[str] = None) -> GraphRun:
+        """Create a run record, or mark an existing one as running again for a resume attempt"""
+        run = GraphRun.get_or_none(GraphRun.run_id == run_id)
+        if run is None:
+            return GraphRun.create(run_id=run_id, graph=graph, symbol=symbol)
+        run.status = "running"
+        run.error = None
+        run.attempts += 1
+        run.save()
+        return run
+
+    @staticmethod
+    def finish_graph_run(run_id: str, error: Optional[str] = None) -> Optional[GraphRun]:
+        """Mark a run as completed, or as failed with the error message"""
+        run = GraphRun.get_or_none(GraphRun.run_id == run_id)
+        if run is None:
+            return None
+        run.status = "failed" if error else "completed"
+        run.error = error
+        run.save()
+        return run
+
+    @staticmethod
+    def get_graph_run(run_id: str) -> Optional[GraphRun]:
+        return GraphRun.get_or_none(GraphRun.run_id == run_id)
+
+    @staticmethod
+    def get_incomplete_graph_runs(graph: Optional[str] = None) -> List[GraphRun]:
+        """Runs that failed or never finished (e.g. the process stopped mid-run), newest first"""
+        query = GraphRun.select().where(GraphRun.status != "completed")
+        if graph:
+            query = query.where(GraphRun.graph == graph)
+        return list(query.order_by(GraphRun.updated_at.desc()))
 
     # --- CashBalance Methods ---
     @staticmethod
@@ -664,14 +1122,163 @@ class DatabaseManager:
         portfolio_id: int = None
     ) -> StockTransactionLog:
         """Create a new stock transaction log entry, optionally for a portfolio"""
-        return StockTransactionLog.create(
-            stock=stock.id,
-            action=action,
-            shares=shares,
-            price=price,
-            purchase_date=purchase_date,
-            portfolio=portfolio_id
-        )
+        with database_proxy.atomic():
+            txn = StockTransactionLog.create(
+                stock=stock.id,
+                action=action,
+                shares=shares,
+                price=price,
+                purchase_date=purchase_date,
+                portfolio=portfolio_id
+            )
+            DatabaseManager.refresh_portfolio_holding(portfolio_id, stock.id)
+        return txn
+
+    # --- PortfolioHolding Methods ---
+    @staticmethod
+    def refresh_portfolio_holding(portfolio_id: int, stock_id: int) -> Optional[PortfolioHolding]:
+        """Recompute one materialized holding from the transactions of that stock in that portfolio"""
+        txns = list(StockTransactionLog
+                    .select(
+                        StockTransactionLog.stock.alias('stock_id'),
+                        Stock.symbol,
+                        StockTransactionLog.action,
+                        StockTransactionLog.shares,
+                        StockTransactionLog.price,
+                        StockTransactionLog.purchase_date)
+                    .join(Stock)
+                    .where((StockTransactionLog.portfolio == portfolio_id) & (StockTransactionLog.stock == stock_id))
+                    .order_by(StockTransactionLog.purchase_date.desc())
+                    .dicts())
+        if not txns:
+            PortfolioHolding.delete().where(
+                (PortfolioHolding.portfolio == portfolio_id) & (PortfolioHolding.stock == stock_id)
+            ).execute()
+            return None
+        row = summarize_holdings(txns, DatabaseManager.get_splits_by_stock([stock_id]))[0]
+        values = {key: row[key] for key in ('shares', 'avg_cost', 'total_cost', 'buys', 'sells', 'dividends')}
+        values['last_purchase_date'] = txns[0]['purchase_date']
+        values['updated_at'] = datetime.now()
+        PortfolioHolding.insert(portfolio=portfolio_id, stock=stock_id, **values).on_conflict(
+            conflict_target=[PortfolioHolding.portfolio, PortfolioHolding.stock],
+            update=values
+        ).execute()
+        return PortfolioHolding.get((PortfolioHolding.portfolio == portfolio_id) & (PortfolioHolding.stock == stock_id))
+
+    @staticmethod
+    def refresh_holdings_for_stock(stock_id: int) -> int:
+        """Recompute the holdings of a stock in every portfolio (after its splits changed)"""
+        portfolio_ids = [row[0] for row in StockTransactionLog
+                         .select(StockTransactionLog.portfolio)
+                         .where(StockTransactionLog.stock == stock_id)
+                         .distinct()
+                         .tuples()]
+        with database_proxy.atomic():
+            for portfolio_id in portfolio_ids:
+                DatabaseManager.refresh_portfolio_holding(portfolio_id, stock_id)
+        return len(portfolio_ids)
+
+    @staticmethod
+    def compute_holdings_by_portfolio(portfolio_id: int = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Compute holdings from the transaction log, keyed by portfolio id"""
+        query = (StockTransactionLog
+                 .select(
+                     StockTransactionLog.portfolio.alias('portfolio_id'),
+                     StockTransactionLog.stock.alias('stock_id'),
+                     Stock.symbol,
+                     StockTransactionLog.action,
+                     StockTransactionLog.shares,
+                     StockTransactionLog.price,
+                     StockTransactionLog.purchase_date)
+                 .join(Stock))
+        if portfolio_id is not None:
+            query = query.where(StockTransactionLog.portfolio == portfolio_id)
+        by_portfolio = {}
+        for txn in query.order_by(StockTransactionLog.purchase_date.desc()).dicts():
+            by_portfolio.setdefault(txn['portfolio_id'], []).append(txn)
+        splits = DatabaseManager.get_splits_by_stock([t['stock_id'] for txns in by_portfolio.values() for t in txns])
+        holdings = {}
+        for pid, txns in by_portfolio.items():
+            stock_ids = {t['symbol']: t['stock_id'] for t in txns}
+            last_dates = {}
+            for t in txns:
+                last_dates.setdefault(t['symbol'], t['purchase_date'])
+            holdings[pid] = [
+                {**row, 'stock_id': stock_ids[row['symbol']], 'last_purchase_date': last_dates[row['symbol']]}
+                for row in summarize_holdings(txns, splits)
+            ]
+        return holdings
+
+    @staticmethod
+    def rebuild_portfolio_holdings(portfolio_id: int = None) -> int:
+        """Rebuild the materialized holdings from the full transaction log. Returns the number of rows written"""
+        holdings = DatabaseManager.compute_holdings_by_portfolio(portfolio_id)
+        now = datetime.now()
+        rows = [
+            {
+                'portfolio': pid,
+                'stock': h['stock_id'],
+                'shares': h['shares'],
+                'avg_cost': h['avg_cost'],
+                'total_cost': h['total_cost'],
+                'buys': h['buys'],
+                'sells': h['sells'],
+                'dividends': h['dividends'],
+                'last_purchase_date': h['last_purchase_date'],
+                'created_at': now,
+                'updated_at': now
+            }
+            for pid, items in holdings.items() for h in items
+        ]
+        with database_proxy.atomic():
+            query = PortfolioHolding.delete()
+            if portfolio_id is not None:
+                query = query.where(PortfolioHolding.portfolio == portfolio_id)
+            query.execute()
+            for i in range(0, len(rows), 500):
+                PortfolioHolding.insert_many(rows[i:i + 500]).execute()
+        logger.info(f"Rebuilt {len(rows)} portfolio holdings")
+        return len(rows)
+
+    @staticmethod
+    def check_portfolio_holdings(portfolio_id: int = None, tolerance: float = 0.01) -> List[Dict[str, Any]]:
+        """Compare the materialized holdings with the transaction log and return the rows that differ"""
+        expected = {
+            (pid, h['stock_id']): h
+            for pid, items in DatabaseManager.compute_holdings_by_portfolio(portfolio_id).items() for h in items
+        }
+        query = PortfolioHolding.select(PortfolioHolding, Stock).join(Stock)
+        if portfolio_id is not None:
+            query = query.where(PortfolioHolding.portfolio == portfolio_id)
+        stored = {(row.portfolio_id, row.stock_id): row for row in query}
+        fields = ('shares', 'avg_cost', 'total_cost', 'buys', 'sells', 'dividends')
+        mismatches = []
+        for key in sorted(set(expected) | set(stored)):
+            exp, row = expected.get(key), stored.get(key)
+            diffs = {}
+            for field in fields:
+                exp_value = exp[field] if exp else None
+                row_value = getattr(row, field) if row else None
+                if exp_value is None or row_value is None or abs(exp_value - row_value) > tolerance:
+                    diffs[field] = {"expected": exp_value, "stored": row_value}
+            if diffs:
+                mismatches.append({
+                    "portfolio_id": key[0],
+                    "stock_id": key[1],
+                    "symbol": exp['symbol'] if exp else row.stock.symbol,
+                    "differences": diffs
+                })
+        return mismatches
+
+    @staticmethod
+    def get_portfolio_holding_rows(portfolio_id: int) -> List[Dict[str, Any]]:
+        """Read the materialized holdings of a portfolio with their stock's latest price data"""
+        query = (PortfolioHolding
+                 .select(PortfolioHolding, Stock)
+                 .join(Stock)
+                 .where(PortfolioHolding.portfolio == portfolio_id)
+                 .order_by(PortfolioHolding.last_purchase_date.desc(), PortfolioHolding.id))
+        return list(query)
 
     @staticmethod
     def get_transactions_by_symbol(symbol: str, portfolio_id: int = None) -> list:
@@ -698,18 +1305,53 @@ class DatabaseManager:
             query = query.where(StockTransactionLog.portfolio == portfolio_id)
         txn = query.first()
         if txn:
-            txn.delete_instance()
+            with database_proxy.atomic():
+                txn.delete_instance()
+                DatabaseManager.refresh_portfolio_holding(txn.portfolio_id, txn.stock_id)
             return True
         return False
     
     @staticmethod
     def get_all_transactions(portfolio_id: int = None) -> list:
         """Get all transactions in the database, optionally filtered by portfolio_id"""
-        query = StockTransactionLog.select()
+        # Join Stock so t.stock.symbol does not issue a query per transaction
+        query = StockTransactionLog.select(StockTransactionLog, Stock).join(Stock)
         if portfolio_id is not None:
             query = query.where(StockTransactionLog.portfolio == portfolio_id)
         return list(query.order_by(StockTransactionLog.purchase_date.desc()))
 
+    @staticmethod
+    def get_transaction_rows(portfolio_id: int = None) -> List[Dict[str, Any]]:
+        """Get transactions as plain dicts (with stock_id and symbol) in a single query"""
+        query = (StockTransactionLog
+                 .select(
+                     StockTransactionLog.id,
+                     StockTransactionLog.stock.alias('stock_id'),
+                     Stock.symbol,
+                     StockTransactionLog.action,
+                     StockTransactionLog.shares,
+                     StockTransactionLog.price,
+                     StockTransactionLog.purchase_date)
+                 .join(Stock))
+        if portfolio_id is not None:
+            query = query.where(StockTransactionLog.portfolio == portfolio_id)
+        return list(query.order_by(StockTransactionLog.purchase_date.desc()).dicts())
+
+    @staticmethod
+    def get_splits_by_stock(stock_ids: List[int]) -> Dict[int, List[tuple]]:
+        """Get (effective_date, split_factor) pairs for many stocks in a single query, keyed by stock id"""
+        splits = {}
+        if not stock_ids:
+            return splits
+        query = (StockSplit
+                 .select(StockSplit.stock, StockSplit.effective_date, StockSplit.split_factor)
+                 .where(StockSplit.stock.in_(list(set(stock_ids))))
+                 .order_by(StockSplit.stock, StockSplit.effective_date)
+                 .tuples())
+        for stock_id, effective_date, split_factor in query:
+            splits.setdefault(stock_id, []).append((effective_date, split_factor))
+        return splits
+
     #
     # Swing
     #
@@ -0,0 +1,141 @@
+import time
+import threading
+from contextvars import ContextVar, Token
+from typing import Any, Callable, ContextManager, Dict, Optional
+from peewee import _ConnectionState
+from playhouse.pool import MaxConnectionsExceeded
+from playhouse.postgres_ext import PooledPostgresqlExtDatabase
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+class ContextConnectionState(_ConnectionState):
+    """Peewee connection state kept in a ContextVar instead of a thread-local.
+
+    Under asyncio every request and job runs on the same thread, so the default
+    thread-local state would hand them all the same connection. With this state each
+    scope opened by `push()` (a request or scheduled job) gets its own connection.
+    """
+
+    def __init__(self, **kwargs):
+        object.__setattr__(self, "_var", ContextVar(f"peewee_connection_state_{id(self)}"))
+        super().__init__(**kwargs)
+
+    @staticmethod
+    def _empty() -> Dict[str, Any]:
+        return {"closed": True, "conn": None, "ctx": [], "transactions": [], "commit_callbacks": []}
+
+    def _current(self) -> Dict[str, Any]:
+        state = self._var.get(None)
+        if state is None:
+            state = self._empty()
+            self._var.set(state)
+        return state
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._current()[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self._current()[name] = value
+
+    def push(self) -> Token:
+        """Start a fresh connection scope in the current context."""
+        return self._var.set(self._empty())
+
+    def pop(self, token: Token) -> None:
+        """Restore the connection scope that was active before `push()`."""
+        self._var.reset(token)
+
+class PoolMetrics:
+    """Counters for connection checkouts: wait time, timeouts and peak utilization."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_in_use = 0
+
+    def record_checkout(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def record_in_use(self, in_use: int) -> None:
+        with self._lock:
+            self.peak_in_use = max(self.peak_in_use, in_use)
+
+class PoolMetricsMixin:
+    """Adds checkout metrics and context-local connection state to a peewee PooledDatabase."""
+
+    def __init__(self, *args, **kwargs):
+        self.pool_metrics = PoolMetrics()
+        super().__init__(*args, **kwargs)
+        self._state = ContextConnectionState()
+
+    def connect(self, reuse_if_open=False):
+        start = time.perf_counter()
+        try:
+            opened = super().connect(reuse_if_open)
+        except MaxConnectionsExceeded:
+            self.pool_metrics.record_timeout()
+            raise
+        if opened:
+            self.pool_metrics.record_checkout(time.perf_counter() - start)
+        return opened
+
+    def _connect(self):
+        conn = super()._connect()
+        self.pool_metrics.record_in_use(len(self._in_use))
+        return conn
+
+    @property
+    def in_use(self) -> int:
+        return len(self._in_use)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Snapshot of pool utilization and checkout wait times."""
+        metrics = self.pool_metrics
+        with metrics._lock:
+            checkouts = metrics.checkouts
+            return {
+                "max_connections": self._max_connections,
+                "in_use": len(self._in_use),
+                "idle": len(self._connections),
+                "utilization": round(len(self._in_use) / self._max_connections, 3) if self._max_connections else None,
+                "peak_in_use": metrics.peak_in_use,
+                "checkouts": checkouts,
+                "timeouts": metrics.timeouts,
+                "avg_wait_ms": round(metrics.wait_seconds / checkouts * 1000, 3) if checkouts else 0.0,
+                "max_wait_ms": round(metrics.max_wait_seconds * 1000, 3),
+            }
+
+class MeteredPooledPostgresqlExtDatabase(PoolMetricsMixin, PooledPostgresqlExtDatabase):
+    pass
+
+class DatabaseConnectionMiddleware:
+    """ASGI middleware that runs each HTTP request in its own database connection scope.
+
+    A plain ASGI middleware (rather than @app.middleware) so streaming responses keep
+    their connection until the last chunk has been sent.
+    """
+
+    def __init__(self, app, scope_factory: Callable[[], ContextManager]):
+        self.app = app
+        self.scope_factory = scope_factory
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with self.scope_factory():
+            await self.app(scope, receive, send)
@@ -0,0 +1,53 @@
+import os
+from typing import Any, Optional
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration
+from services.cache import ResponseCache
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_LLM_CACHE_TTL = 24 * 60 * 60
+
+class LLMResponseCache(BaseCache):
+    """LangChain cache backed by the persistent ResponseCache.
+
+    LangChain keys lookups on the rendered prompt plus an `llm_string` that already
+    contains the model name, temperature and any bound tools/structured-output schema,
+    so identical chain inputs map to the same entry. Cached messages are returned with
+    `response_metadata["cache_hit"] = True` so callers can record them separately.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None, ttl: Optional[float] = None):
+        self.cache = cache or ResponseCache("llm")
+        self.ttl = ttl if ttl is not None else float(os.getenv("LLM_CACHE_TTL", DEFAULT_LLM_CACHE_TTL))
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return ResponseCache.make_key("llm", prompt, llm_string)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        cached = self.cache.get(self._key(prompt, llm_string), tag="llm")
+        if cached is None:
+            return None
+        generations = []
+        for message in messages_from_dict(cached):
+            message.response_metadata = {**message.response_metadata, "cache_hit": True}
+            generations.append(ChatGeneration(message=message))
+        logger.debug("LLM cache hit")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        messages = [g.message for g in return_val if isinstance(g, ChatGeneration)]
+        if len(messages) != len(return_val):
+            # Plain text completions are not used by the graphs; skip rather than lose fidelity
+            return
+        self.cache.set(self._key(prompt, llm_string), [message_to_dict(m) for m in messages], ttl=self.ttl, tag="llm")
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear()
+
+def is_cache_hit(message: Any) -> bool:
+    """Return True if an LLM response was served from the LLM cache."""
+    return bool((getattr(message, "response_metadata", None) or {}).get("cache_hit", False))
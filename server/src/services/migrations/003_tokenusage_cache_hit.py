@@ -0,0 +1,15 @@
+import peewee as pw
+from playhouse.migrate import migrate as run_migrations, SchemaMigrator
+
+def upgrade(migrator: SchemaMigrator):
+    # create_tables runs first, so a fresh database already has the column
+    columns = [c.name for c in migrator.database.get_columns('tokenusage')]
+    if 'cache_hit' not in columns:
+        run_migrations(
+            migrator.add_column('tokenusage', 'cache_hit', pw.BooleanField(default=False)),
+        )
+
+def downgrade(migrator: SchemaMigrator):
+    run_migrations(
+        migrator.drop_column('tokenusage', 'cache_hit'),
+    )
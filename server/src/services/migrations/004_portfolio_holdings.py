@@ -0,0 +1,10 @@
+from playhouse.migrate import SchemaMigrator
+
+def upgrade(migrator: SchemaMigrator):
+    # The portfolioholding table is created by create_tables; populate it from the existing transaction log
+    from services.database import DatabaseManager
+    DatabaseManager.rebuild_portfolio_holdings()
+
+def downgrade(migrator: SchemaMigrator):
+    from models.models import PortfolioHolding
+    PortfolioHolding.delete().execute()
@@ -0,0 +1,17 @@
+from peewee import fn
+from playhouse.migrate import SchemaMigrator
+
+def upgrade(migrator: SchemaMigrator):
+    # The apiquota table is created by create_tables; seed the daily counters from the existing usage log
+    from models.models import ApiQuota, ApiRequestUsage
+    day = fn.DATE(ApiRequestUsage.created_at)
+    rows = (ApiRequestUsage
+            .select(ApiRequestUsage.provider, day.alias("day"), fn.SUM(ApiRequestUsage.count).alias("used"), fn.COUNT(ApiRequestUsage.id).alias("requests"))
+            .group_by(ApiRequestUsage.provider, day)
+            .dicts())
+    for row in rows:
+        ApiQuota.insert(provider=row["provider"], day=row["day"], used=row["used"] or 0, requests=row["requests"]).on_conflict_ignore().execute()
+
+def downgrade(migrator: SchemaMigrator):
+    from models.models import ApiQuota
+    ApiQuota.delete().execute()
@@ -0,0 +1,26 @@
+from playhouse.migrate import SchemaMigrator
+
+def upgrade(migrator: SchemaMigrator):
+    db = migrator.database
+    data_type = db.execute_sql(
+        "SELECT data_type FROM information_schema.columns WHERE table_name = 'research' AND column_name = 'structured_output'"
+    ).fetchone()
+    if data_type and data_type[0] == 'json':
+        db.execute_sql("ALTER TABLE research ALTER COLUMN structured_output TYPE jsonb USING structured_output::jsonb")
+    # Analyses used to store json.dumps(...) output, i.e. a JSON string holding the document; unwrap it
+    db.execute_sql(
+        "UPDATE research SET structured_output = (structured_output #>> '{}')::jsonb "
+        "WHERE jsonb_typeof(structured_output) = 'string'"
+    )
+    db.execute_sql(
+        "CREATE INDEX IF NOT EXISTS research_structured_output_gin ON research USING GIN (structured_output jsonb_path_ops)"
+    )
+    db.execute_sql(
+        "CREATE INDEX IF NOT EXISTS research_final_recommendation ON research (UPPER(structured_output->>'final_recommendation'))"
+    )
+
+def downgrade(migrator: SchemaMigrator):
+    db = migrator.database
+    db.execute_sql("DROP INDEX IF EXISTS research_final_recommendation")
+    db.execute_sql("DROP INDEX IF EXISTS research_structured_output_gin")
+    db.execute_sql("ALTER TABLE research ALTER COLUMN structured_output TYPE json USING structured_output::json")
@@ -0,0 +1,22 @@
+import os
+from playhouse.migrate import SchemaMigrator
+
+def upgrade(migrator: SchemaMigrator):
+    # Range-partition the append-only history tables by month so range scans and vacuum touch only recent partitions
+    from services.partitions import PARTITIONED_MODELS, supports_partitions, is_partitioned, partition_table
+    db = migrator.database
+    if not supports_partitions(db):
+        return
+    months_ahead = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
+    for model in PARTITIONED_MODELS:
+        if not is_partitioned(db, model):
+            partition_table(db, model, months_ahead)
+
+def downgrade(migrator: SchemaMigrator):
+    from services.partitions import PARTITIONED_MODELS, supports_partitions, is_partitioned, unpartition_table
+    db = migrator.database
+    if not supports_partitions(db):
+        return
+    for model in PARTITIONED_MODELS:
+        if is_partitioned(db, model):
+            unpartition_table(db, model)
@@ -0,0 +1,67 @@
+import peewee as pw
+from peewee import fn
+from playhouse.migrate import migrate as run_migrations, SchemaMigrator
+
+def upgrade(migrator: SchemaMigrator):
+    from models.models import TokenUsage, TokenUsageDaily, ApiRequestUsage, ApiUsageDaily
+    from services.telemetry import TOKEN_DAILY_TOTALS, usage_source, upsert_daily_totals
+    # create_tables runs first, so a fresh database already has the columns
+    columns = [c.name for c in migrator.database.get_columns('tokenusagedaily')]
+    if 'source' not in columns:
+        run_migrations(
+            migrator.add_column('tokenusagedaily', 'source', pw.CharField(default='')),
+        )
+    for name in ('cached_input_tokens', 'cached_output_tokens', 'cached_total_tokens'):
+        if name not in columns:
+            run_migrations(
+                migrator.add_column('tokenusagedaily', name, pw.BigIntegerField(default=0)),
+            )
+    steps = TokenUsageDaily.select(TokenUsageDaily.step).where(TokenUsageDaily.source == '').distinct()
+    for step in [row.step for row in steps]:
+        TokenUsageDaily.update(source=usage_source(step)).where(TokenUsageDaily.step == step).execute()
+
+    # Rows written before the rollups were maintained on flush; purged days are already in TokenUsageDaily.
+    # Cache hits are summed into the cached_* columns, exactly as daily_token_totals does on flush.
+    day = fn.DATE(TokenUsage.created_at)
+    hit = TokenUsage.cache_hit == True
+
+    def tokens(field, cached):
+        return fn.SUM(pw.Case(None, [(hit, field)], 0) if cached else pw.Case(None, [(hit, 0)], field))
+
+    token_rows = (TokenUsage
+                  .select(day.alias("day"), TokenUsage.step, fn.COUNT(TokenUsage.id).alias("calls"),
+                          tokens(TokenUsage.input_tokens, False).alias("input_tokens"),
+                          tokens(TokenUsage.output_tokens, False).alias("output_tokens"),
+                          tokens(TokenUsage.total_tokens, False).alias("total_tokens"),
+                          fn.SUM(pw.Case(None, [(hit, 1)], 0)).alias("cache_hits"),
+                          tokens(TokenUsage.input_tokens, True).alias("cached_input_tokens"),
+                          tokens(TokenUsage.output_tokens, True).alias("cached_output_tokens"),
+                          tokens(TokenUsage.total_tokens, True).alias("cached_total_tokens"))
+                  .group_by(day, TokenUsage.step)
+                  .dicts())
+    upsert_daily_totals(
+        TokenUsageDaily, [dict({k: v or 0 for k, v in row.items()}, day=row["day"], step=row["step"], source=usage_source(row["step"])) for row in token_rows],
+        keys=[TokenUsageDaily.day, TokenUsageDaily.step],
+        totals=TOKEN_DAILY_TOTALS,
+    )
+    day = fn.DATE(ApiRequestUsage.created_at)
+    api_rows = (ApiRequestUsage
+                .select(day.alias("day"), ApiRequestUsage.step, ApiRequestUsage.provider,
+                        fn.SUM(ApiRequestUsage.count).alias("calls"), fn.COUNT(ApiRequestUsage.id).alias("requests"))
+                .group_by(day, ApiRequestUsage.step, ApiRequestUsage.provider)
+                .dicts())
+    upsert_daily_totals(
+        ApiUsageDaily, [dict(row, source=usage_source(row["step"]), calls=row["calls"] or 0) for row in api_rows],
+        keys=[ApiUsageDaily.day, ApiUsageDaily.step, ApiUsageDaily.provider],
+        totals=[ApiUsageDaily.calls, ApiUsageDaily.requests],
+    )
+
+def downgrade(migrator: SchemaMigrator):
+    from models.models import ApiUsageDaily
+    ApiUsageDaily.delete().execute()
+    run_migrations(
+        migrator.drop_column('tokenusagedaily', 'source'),
+        migrator.drop_column('tokenusagedaily', 'cached_input_tokens'),
+        migrator.drop_column('tokenusagedaily', 'cached_output_tokens'),
+        migrator.drop_column('tokenusagedaily', 'cached_total_tokens'),
+    )
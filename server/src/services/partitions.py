@@ -0,0 +1,130 @@
+"""Monthly range partitions on created_at for the append-only history tables (Postgres only)"""
+from datetime import date, datetime
+from typing import List, Union
+from peewee import PostgresqlDatabase
+from models.models import HistoricalValues, TechnicalHistoricalValues, TokenUsage
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+PARTITIONED_MODELS = (HistoricalValues, TechnicalHistoricalValues, TokenUsage)
+
+def month_start(value: Union[date, datetime]) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(model, month: date) -> str:
+    return f"{model._meta.table_name}_p{month:%Y_%m}"
+
+def supports_partitions(db) -> bool:
+    return isinstance(db, PostgresqlDatabase)
+
+def is_partitioned(db, model) -> bool:
+    row = db.execute_sql(
+        "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relname = %s AND n.nspname = current_schema()",
+        (model._meta.table_name,)
+    ).fetchone()
+    return bool(row) and row[0] == 'p'
+
+def list_partitions(db, model) -> List[date]:
+    """Months that have their own partition, oldest first (the default partition is not listed)"""
+    prefix = f"{model._meta.table_name}_p"
+    rows = db.execute_sql(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = %s",
+        (model._meta.table_name,)
+    ).fetchall()
+    months = []
+    for (name,) in rows:
+        if name.startswith(prefix):
+            year, month = name[len(prefix):].split('_')
+            months.append(date(int(year), int(month), 1))
+    return sorted(months)
+
+def create_partition(db, model, month: date) -> None:
+    db.execute_sql(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(model, month)}" PARTITION OF "{model._meta.table_name}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+def drop_partition(db, model, month: date) -> None:
+    db.execute_sql(f'DROP TABLE IF EXISTS "{partition_name(model, month)}"')
+
+def ensure_partitions(db, months_ahead: int) -> int:
+    """Create the partitions for this month and the next `months_ahead` months; returns how many were missing"""
+    created = 0
+    current = month_start(datetime.now())
+    for model in PARTITIONED_MODELS:
+        if not is_partitioned(db, model):
+            continue
+        existing = set(list_partitions(db, model))
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month in existing:
+                continue
+            try:
+                with db.atomic():
+                    create_partition(db, model, month)
+                created += 1
+            except Exception as e:
+                # Fails if the default partition already holds rows for that month
+                logger.error(f"Could not create partition {partition_name(model, month)}: {e}")
+    return created
+
+def _add_constraints(db, model, primary_key: str) -> None:
+    table = model._meta.table_name
+    db.execute_sql(f'ALTER TABLE "{table}" ADD PRIMARY KEY ({primary_key})')
+    for field in model._meta.refs:
+        db.execute_sql(
+            f'ALTER TABLE "{table}" ADD FOREIGN KEY ("{field.column_name}") '
+            f'REFERENCES "{field.rel_model._meta.table_name}" ("{field.rel_field.column_name}")'
+        )
+    model._schema.create_indexes(safe=True)
+
+def _rebuild_table(db, model, partition_by: str = "") -> str:
+    """Recreate `model`'s table from a renamed copy, keeping its rows and id sequence; returns the copy's name"""
+    table = model._meta.table_name
+    legacy = f"{table}_legacy"
+    db.execute_sql(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+    db.execute_sql(f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) {partition_by}')
+    return legacy
+
+def _move_rows(db, model, legacy: str) -> None:
+    table = model._meta.table_name
+    db.execute_sql(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+    sequence = db.execute_sql("SELECT pg_get_serial_sequence(%s, 'id')", (legacy,)).fetchone()[0]
+    if sequence:
+        # Dropping the old table would otherwise drop the id sequence it owns
+        db.execute_sql(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id')
+    db.execute_sql(f'DROP TABLE "{legacy}"')
+
+def partition_table(db, model, months_ahead: int) -> None:
+    """Convert a plain table into one range-partitioned by month on created_at.
+
+    Partitions are created from the month of the oldest row up to `months_ahead` months from now,
+    plus a default partition so out-of-range rows are never rejected. Postgres requires the
+    partition key in the primary key, so it becomes (id, created_at).
+    """
+    table = model._meta.table_name
+    legacy = _rebuild_table(db, model, "PARTITION BY RANGE (created_at)")
+    oldest = db.execute_sql(f'SELECT MIN(created_at) FROM "{legacy}"').fetchone()[0]
+    month = month_start(oldest or datetime.now())
+    last = add_months(month_start(datetime.now()), months_ahead)
+    while month <= last:
+        create_partition(db, model, month)
+        month = add_months(month, 1)
+    db.execute_sql(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+    _move_rows(db, model, legacy)
+    _add_constraints(db, model, "id, created_at")
+    logger.info(f"Partitioned {table} by month on created_at")
+
+def unpartition_table(db, model) -> None:
+    """Convert a partitioned table back into a plain table"""
+    legacy = _rebuild_table(db, model)
+    _move_rows(db, model, legacy)
+    _add_constraints(db, model, "id")
@@ -0,0 +1,114 @@
+import threading
+from datetime import date
+from typing import Dict, Optional
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+class QuotaLedger:
+    """In-memory ledger of API calls against a provider's daily limit.
+
+    Work reserves its estimated calls up front and settles with the actual count when done,
+    so concurrent tasks can never collectively overrun the limit.
+    """
+
+    def __init__(self, provider: str, limit: int, used: int = 0):
+        self.provider = provider
+        self.limit = limit
+        self.used = used
+        self.reserved = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.used - self.reserved)
+
+    def reserve(self, calls: int) -> bool:
+        """Reserve `calls` against the limit. Returns False if that would exceed it."""
+        with self._lock:
+            if self.used + self.reserved + calls > self.limit:
+                return False
+            self.reserved += calls
+            return True
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """Release a reservation and record the calls actually made."""
+        with self._lock:
+            self.reserved = max(0, self.reserved - reserved)
+            self.used += actual
+
+    def refund(self, reserved: int) -> None:
+        """Release a reservation without recording any calls."""
+        self.settle(reserved, 0)
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "limit": self.limit,
+                "used": self.used,
+                "reserved": self.reserved,
+                "remaining": max(0, self.limit - self.used - self.reserved),
+            }
+
+class DatabaseQuotaLedger:
+    """Quota ledger backed by the ApiQuota table, safe across overlapping jobs and processes.
+
+    Has the same interface as QuotaLedger. Every check is a single-row statement: `reserve`
+    atomically adds to the day's reservations only if used + reserved stays within the limit.
+    Calls actually made are counted when the run's usage is saved (`record_api_calls`), so
+    `settle` only releases the reservation.
+    """
+
+    def __init__(self, db_manager, provider: str, limit: int, day: Optional[date] = None):
+        self.db_manager = db_manager
+        self.provider = provider
+        self.limit = limit
+        # Reservations are released against the day they were made on, even after midnight
+        self.day = day or date.today()
+
+    def _row(self) -> Dict[str, int]:
+        return self.db_manager.get_api_quota(self.provider, day=self.day)
+
+    @property
+    def used(self) -> int:
+        return self._row()["used"]
+
+    @property
+    def reserved(self) -> int:
+        return self._row()["reserved"]
+
+    @property
+    def remaining(self) -> int:
+        row = self._row()
+        return max(0, self.limit - row["used"] - row["reserved"])
+
+    def reserve(self, calls: int) -> bool:
+        """Reserve `calls` against the limit. Returns False if that would exceed it."""
+        return self.db_manager.reserve_api_calls(self.provider, calls, self.limit, day=self.day)
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """Release a reservation; the `actual` calls are recorded with the run's usage."""
+        self.db_manager.release_api_calls(self.provider, reserved, day=self.day)
+
+    def refund(self, reserved: int) -> None:
+        """Release a reservation without recording any calls."""
+        self.settle(reserved, 0)
+
+    def summary(self) -> Dict[str, int]:
+        row = self._row()
+        return {
+            "provider": self.provider,
+            "limit": self.limit,
+            "used": row["used"],
+            "reserved": row["reserved"],
+            "remaining": max(0, self.limit - row["used"] - row["reserved"]),
+        }
+
+def count_api_usage(usage: Optional[Dict[str, dict]], provider: str) -> int:
+    """Sum the requests made to `provider` across the per-node usage dict of a graph run."""
+    total = 0
+    for node_usage in (usage or {}).values():
+        api_usage = (node_usage or {}).get("api_usage") or {}
+        total += api_usage.get(provider, 0) or 0
+    return total
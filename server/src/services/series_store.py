@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import asyncio
+import numpy as np
+import pandas as pd
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from utils.financial import safe_float
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_SERIES_DIR = "/config/fred"
+# FRED publishes at most daily, so stored series are refreshed at most this often (seconds)
+DEFAULT_REFRESH_AFTER = 6 * 3600
+# Observations re-fetched before the last stored one so recent revisions are picked up
+OVERLAP_OBSERVATIONS = 3
+
+# fetch(series_id, observation_start) -> FRED observations, or None if the request failed
+FetchObservations = Callable[[str, Optional[str]], Awaitable[Optional[List[dict]]]]
+Series = Tuple[np.ndarray, np.ndarray]  # (datetime64[D] dates, float64 values)
+
+def parse_observations(observations: List[dict]) -> Series:
+    """Dates and values of the FRED observations that have a value ('.' marks a missing one)."""
+    pairs = [(obs.get("date"), safe_float(obs.get("value"))) for obs in observations if obs.get("value") not in (None, ".", "")]
+    pairs = [(d, v) for d, v in pairs if d and v is not None]
+    if not pairs:
+        return np.array([], dtype="datetime64[D]"), np.array([], dtype=float)
+    dates, values = zip(*pairs)
+    return np.array(dates, dtype="datetime64[D]"), np.array(values, dtype=float)
+
+def merge_series(stored: Series, fetched: Series) -> Series:
+    """Union of two series by date, keeping the fetched value where both have one."""
+    dates = np.concatenate([fetched[0], stored[0]])
+    values = np.concatenate([fetched[1], stored[1]])
+    # np.unique keeps the first occurrence, i.e. the fetched observation
+    dates, index = np.unique(dates, return_index=True)
+    return dates, values[index]
+
+class SeriesStore:
+    """Persistent per-series store of FRED observations in Parquet files.
+
+    Each series is a file under `{base_dir}/{SERIES_ID}.parquet` with a JSON sidecar recording
+    when it was last fetched and how far back it covers. Refreshes only request observations
+    from just before the last stored date, and every stale series is fetched concurrently.
+    Window queries slice the cached NumPy arrays without touching the network.
+    """
+
+    def __init__(self, fetch: FetchObservations, base_dir: Optional[str] = None, refresh_after: Optional[float] = None):
+        self.fetch = fetch
+        self.base_dir = base_dir or os.getenv("FRED_STORE_DIR", DEFAULT_SERIES_DIR)
+        self.refresh_after = refresh_after if refresh_after is not None else DEFAULT_REFRESH_AFTER
+        self._series: Dict[str, Series] = {}
+        self.fetch_count = 0
+
+    def _path(self, series_id: str, ext: str) -> str:
+        return os.path.join(self.base_dir, f"{series_id.upper()}.{ext}")
+
+    def _read_meta(self, series_id: str) -> dict:
+        path = self._path(series_id, "json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def load(self, series_id: str) -> Series:
+        """Return every stored observation of a series (empty arrays if none)."""
+        key = series_id.upper()
+        if key not in self._series:
+            path = self._path(series_id, "parquet")
+            if os.path.exists(path):
+                frame = pd.read_parquet(path)
+                self._series[key] = (frame["date"].to_numpy(dtype="datetime64[D]"), frame["value"].to_numpy(dtype=float))
+            else:
+                self._series[key] = parse_observations([])
+        return self._series[key]
+
+    def _save(self, series_id: str, series: Series, covered_from: Optional[str]) -> None:
+        os.makedirs(self.base_dir, exist_ok=True)
+        path = self._path(series_id, "parquet")
+        # Write-then-rename so readers never see a partially written file
+        pd.DataFrame({"date": series[0], "value": series[1]}).to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        with open(self._path(series_id, "json"), "w") as f:
+            json.dump({"fetched_at": time.time(), "covered_from": covered_from}, f)
+        self._series[series_id.upper()] = series
+
+    def _plan(self, series_id: str, start: Optional[str], now: float) -> Tuple[bool, Optional[str], Optional[str]]:
+        """Decide whether a series needs fetching. Returns (fetch, observation_start, covered_from after the fetch)."""
+        meta = self._read_meta(series_id)
+        dates, _ = self.load(series_id)
+        covered_from = meta.get("covered_from")
+        covers = bool(meta) and (covered_from is None or (start is not None and covered_from <= start))
+        if not covers:
+            # Only reached when `start` is earlier than what is stored, so coverage never shrinks
+            return True, start, start
+        if now - meta.get("fetched_at", 0) < self.refresh_after:
+            return False, None, covered_from
+        if len(dates) == 0:
+            return True, covered_from, covered_from
+        return True, str(dates[max(0, len(dates) - OVERLAP_OBSERVATIONS)]), covered_from
+
+    async def _refresh_one(self, series_id: str, observation_start: Optional[str], covered_from: Optional[str]) -> None:
+        self.fetch_count += 1
+        try:
+            observations = await self.fetch(series_id, observation_start)
+        except Exception as e:
+            logger.error(f"Failed to fetch FRED series {series_id}: {e}")
+            return
+        if observations is None:
+            logger.warning(f"No observations returned for FRED series {series_id}, keeping stored data")
+            return
+        # Parquet and JSON writes are blocking, so they stay off the event loop
+        await asyncio.to_thread(self._save, series_id, merge_series(self.load(series_id), parse_observations(observations)), covered_from)
+
+    async def refresh(self, series_ids: List[str], start: Optional[str] = None) -> None:
+        """Make sure each series is stored from `start` (all history if None), fetching what is missing concurrently."""
+        now = time.time()
+        # Planning reads the stored files, so it runs off the event loop as well
+        plans = await asyncio.to_thread(lambda: [(series_id, *self._plan(series_id, start, now)) for series_id in series_ids])
+        tasks = [
+            self._refresh_one(series_id, observation_start, covered_from)
+            for series_id, needs_fetch, observation_start, covered_from in plans
+            if needs_fetch
+        ]
+        if tasks:
+            logger.info(f"Refreshing {len(tasks)} of {len(series_ids)} FRED series")
+            await asyncio.gather(*tasks)
+
+    def window(self, series_id: str, start: Optional[str] = None, end: Optional[str] = None) -> Series:
+        """Stored observations with start <= date <= end, as views of the cached arrays."""
+        dates, values = self.load(series_id)
+        lo = np.searchsorted(dates, np.datetime64(start, "D"), side="left") if start else 0
+        hi = np.searchsorted(dates, np.datetime64(end, "D"), side="right") if end else len(dates)
+        return dates[lo:hi], values[lo:hi]
@@ -0,0 +1,81 @@
+import os
+import time
+import threading
+from typing import Dict, Optional, Tuple
+from models.models import Stock, database_proxy
+
+DEFAULT_STOCK_CACHE_TTL = 300.0
+
+class StockIdentityMap:
+    """In-process identity map of Stock rows, looked up by symbol or id.
+
+    The symbol -> row mapping almost never changes, so rows are served from memory until
+    they are invalidated (stock added, deleted or its price/split timestamps updated) or
+    `ttl` seconds pass, which bounds staleness from writes made by other processes.
+    Entries belong to the database they were read from and are dropped if it changes.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("STOCK_CACHE_TTL", DEFAULT_STOCK_CACHE_TTL))
+        self._lock = threading.Lock()
+        self._by_symbol: Dict[str, Tuple[Stock, float]] = {}
+        self._by_id: Dict[int, Tuple[Stock, float]] = {}
+        self._database = None
+        self.hits = 0
+        self.misses = 0
+
+    def _check_database(self) -> None:
+        """Drop every entry if the proxy now points at another database. Caller holds the lock."""
+        if database_proxy.obj is not self._database:
+            self._by_symbol.clear()
+            self._by_id.clear()
+            self._database = database_proxy.obj
+
+    def _lookup(self, entries: Dict, key) -> Optional[Stock]:
+        with self._lock:
+            self._check_database()
+            entry = entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def get_by_symbol(self, symbol: str) -> Optional[Stock]:
+        return self._lookup(self._by_symbol, symbol.upper())
+
+    def get_by_id(self, stock_id: int) -> Optional[Stock]:
+        return self._lookup(self._by_id, stock_id)
+
+    def put(self, stock: Stock) -> Stock:
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._check_database()
+            self._by_symbol[stock.symbol] = (stock, expires_at)
+            self._by_id[stock.id] = (stock, expires_at)
+        return stock
+
+    def invalidate(self, symbol: Optional[str] = None, stock_id: Optional[int] = None) -> None:
+        with self._lock:
+            for entries, key in ((self._by_symbol, symbol.upper() if symbol else None), (self._by_id, stock_id)):
+                entry = entries.pop(key, None) if key is not None else None
+                if entry is not None:
+                    # Drop the row under its other key as well
+                    self._by_symbol.pop(entry[0].symbol, None)
+                    self._by_id.pop(entry[0].id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_symbol.clear()
+            self._by_id.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._by_id),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,182 @@
+import os
+import atexit
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+from peewee import EXCLUDED, Field
+from models.models import ApiRequestUsage, ApiUsageDaily, TokenUsage, TokenUsageDaily, database_proxy
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_FLUSH_ROWS = 500
+DEFAULT_FLUSH_INTERVAL = 5.0
+# Rows per INSERT statement; keeps the bound parameter count well below driver limits
+INSERT_BATCH_SIZE = 200
+
+def usage_source(step: str) -> str:
+    """The source of a usage step, i.e. the step without its graph node ("stock:AAPL:market" -> "stock:AAPL")"""
+    return step.rsplit(":", 1)[0] if ":" in step else step
+
+# TokenUsageDaily columns that flushes add to
+TOKEN_DAILY_TOTALS = [
+    TokenUsageDaily.calls, TokenUsageDaily.input_tokens, TokenUsageDaily.output_tokens, TokenUsageDaily.total_tokens,
+    TokenUsageDaily.cache_hits, TokenUsageDaily.cached_input_tokens, TokenUsageDaily.cached_output_tokens, TokenUsageDaily.cached_total_tokens,
+]
+
+def daily_token_totals(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sum TokenUsage rows into TokenUsageDaily deltas, one per (day, step).
+
+    Cache hits carry the token counts of the original response, so they go to the cached_* columns, not the billed ones.
+    """
+    totals = {}
+    for row in rows:
+        key = (row["created_at"].date(), row["step"])
+        total = totals.setdefault(key, {
+            "day": key[0], "step": key[1], "source": usage_source(key[1]), "calls": 0,
+            "input_tokens": 0, "output_tokens": 0, "total_tokens": 0,
+            "cache_hits": 0, "cached_input_tokens": 0, "cached_output_tokens": 0, "cached_total_tokens": 0,
+        })
+        prefix = "cached_" if row["cache_hit"] else ""
+        total["calls"] += 1
+        total[f"{prefix}input_tokens"] += row["input_tokens"] or 0
+        total[f"{prefix}output_tokens"] += row["output_tokens"] or 0
+        total[f"{prefix}total_tokens"] += row["total_tokens"] or 0
+        total["cache_hits"] += 1 if row["cache_hit"] else 0
+    return list(totals.values())
+
+def daily_api_totals(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sum ApiRequestUsage rows into ApiUsageDaily deltas, one per (day, step, provider)"""
+    totals = {}
+    for row in rows:
+        key = (row["created_at"].date(), row["step"], row["provider"])
+        total = totals.setdefault(key, {
+            "day": key[0], "step": key[1], "source": usage_source(key[1]), "provider": key[2], "calls": 0, "requests": 0,
+        })
+        total["calls"] += row["count"] or 0
+        total["requests"] += 1
+    return list(totals.values())
+
+def upsert_daily_totals(model, rows: List[Dict[str, Any]], keys: List[Field], totals: List[Field]) -> None:
+    """Add per-day deltas to a rollup table, creating the day's row if it is not there yet"""
+    now = datetime.now()
+    update = {field: field + getattr(EXCLUDED, field.column_name) for field in totals}
+    update[model.updated_at] = now
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        batch = [dict(row, created_at=now, updated_at=now) for row in rows[i:i + INSERT_BATCH_SIZE]]
+        model.insert_many(batch).on_conflict(conflict_target=keys, update=update).execute()
+
+class UsageBuffer:
+    """Write-behind buffer for TokenUsage and ApiRequestUsage rows and their daily rollups.
+
+    Records are timestamped when they are added and written with multi-row `insert_many`
+    once `max_rows` are pending, every `flush_interval` seconds from a background thread,
+    and on `close()` (application shutdown, or interpreter exit as a fallback).
+    """
+
+    def __init__(
+        self,
+        max_rows: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        scope_factory: Optional[Callable[[], ContextManager]] = None,
+    ):
+        self.max_rows = max_rows or int(os.getenv("USAGE_FLUSH_ROWS", DEFAULT_FLUSH_ROWS))
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("USAGE_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL))
+        self.scope_factory = scope_factory or nullcontext
+        self._lock = threading.Lock()
+        # Serializes flushes so rows are written in the order they were added
+        self._flush_lock = threading.Lock()
+        self._token_rows: List[Dict[str, Any]] = []
+        self._api_rows: List[Dict[str, Any]] = []
+        self._closed = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.rows_written = 0
+        if self.flush_interval > 0:
+            self._thread = threading.Thread(target=self._run, name="usage-flush", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def add_token_usage(self, step: str, input_tokens: int, output_tokens: int, total_tokens: int, cache_hit: bool = False) -> None:
+        self._add(self._token_rows, {
+            "step": step,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": total_tokens,
+            "cache_hit": cache_hit,
+        })
+
+    def add_api_usage(self, step: str, provider: str, count: int) -> None:
+        self._add(self._api_rows, {"step": step, "provider": provider, "count": count})
+
+    def _add(self, rows: List[Dict[str, Any]], row: Dict[str, Any]) -> None:
+        now = datetime.now()
+        row.update(created_at=now, updated_at=now)
+        with self._lock:
+            rows.append(row)
+            full = len(self._token_rows) + len(self._api_rows) >= self.max_rows
+        if full:
+            self.flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._token_rows) + len(self._api_rows)
+
+    def flush(self) -> int:
+        """Write all pending rows; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                token_rows, self._token_rows = self._token_rows, []
+                api_rows, self._api_rows = self._api_rows, []
+            if not token_rows and not api_rows:
+                return 0
+            try:
+                with self.scope_factory(), database_proxy.atomic():
+                    for model, rows in ((TokenUsage, token_rows), (ApiRequestUsage, api_rows)):
+                        for i in range(0, len(rows), INSERT_BATCH_SIZE):
+                            model.insert_many(rows[i:i + INSERT_BATCH_SIZE]).execute()
+                    # The daily rollups move in the same transaction as the raw rows
+                    upsert_daily_totals(
+                        TokenUsageDaily, daily_token_totals(token_rows),
+                        keys=[TokenUsageDaily.day, TokenUsageDaily.step],
+                        totals=TOKEN_DAILY_TOTALS,
+                    )
+                    upsert_daily_totals(
+                        ApiUsageDaily, daily_api_totals(api_rows),
+                        keys=[ApiUsageDaily.day, ApiUsageDaily.step, ApiUsageDaily.provider],
+                        totals=[ApiUsageDaily.calls, ApiUsageDaily.requests],
+                    )
+            except Exception:
+                # Put the rows back in front of anything added meanwhile and retry on the next flush
+                with self._lock:
+                    self._token_rows[:0] = token_rows
+                    self._api_rows[:0] = api_rows
+                raise
+            written = len(token_rows) + len(api_rows)
+            self.flushes += 1
+            self.rows_written += written
+            logger.debug(f"Flushed {written} usage rows")
+            return written
+
+    def _run(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing usage rows: {e}")
+
+    def close(self) -> None:
+        """Stop the background flusher and write any remaining rows."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing usage rows at shutdown: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": self.pending(), "flushes": self.flushes, "rows_written": self.rows_written}
@@ -8,7 +8,7 @@ from providers.alphavantage import AlphaVantageProvider
 async def test_get_earnings_history_print():
 	provider = AlphaVantageProvider()
 	# Use a real symbol, e.g., NVDA
-	earnings_history, request_count = await provider.get_earnings_history('NVDA')
+	earnings_history, request_count = await provider.get_earnings_history_async('NVDA')
 	print("EarningsHistory:", json.dumps(earnings_history.model_dump(), indent=2))
 	print("Request count:", request_count)
 
@@ -4,7 +4,7 @@ dotenv.load_dotenv(dotenv_path='../../../.env', override=True)
 import os
 import pytest
 import asyncio
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import types
 from app import StockAnalysisApp
@@ -41,8 +41,8 @@ FAKE_TECHNICAL_DATA.model_dump.return_value = {
 }
 MOCK_YFINANCE.get_technical_indicators.return_value = FAKE_TECHNICAL_DATA
 MOCK_ALPHAVANTAGE = MagicMock()
-MOCK_ALPHAVANTAGE.get_market_data.return_value = (FAKE_MARKET_DATA, 1)
-MOCK_ALPHAVANTAGE.get_earnings_history.return_value = (FAKE_EARNINGS_HISTORY, 1)
+MOCK_ALPHAVANTAGE.get_market_data_async = AsyncMock(return_value=(FAKE_MARKET_DATA, 1))
+MOCK_ALPHAVANTAGE.get_earnings_history_async = AsyncMock(return_value=(FAKE_EARNINGS_HISTORY, 1))
 
 @pytest.mark.asyncio
 async def test_analyze_stock_integration(monkeypatch):
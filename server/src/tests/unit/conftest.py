@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from importlib import util
+from pathlib import Path
+import pytest
+from peewee import SqliteDatabase
+from models.models import database_proxy
+
+
+@pytest.fixture
+def db(request, tmp_path):
+    """SQLite database bound to the model proxy, with the test module's MODELS created.
+
+    Modules that use the database from several threads set THREADED_DB = True to get a
+    file-backed database instead of an in-memory one.
+    """
+    if getattr(request.module, "THREADED_DB", False):
+        database = SqliteDatabase(str(tmp_path / "test.db"), check_same_thread=False)
+    else:
+        database = SqliteDatabase(":memory:")
+    database_proxy.initialize(database)
+    database.create_tables(request.module.MODELS)
+    yield database
+    database.close()
+    database_proxy.initialize(None)
+
+class QueryLog(list):
+    """SQL statements run on the test database inside `record()` blocks."""
+
+    def __init__(self, database):
+        super().__init__()
+        self.recording = False
+        self._execute_sql = database.execute_sql
+
+    def execute_sql(self, sql, *args, **kwargs):
+        if self.recording:
+            self.append(sql)
+        return self._execute_sql(sql, *args, **kwargs)
+
+    @contextmanager
+    def record(self):
+        self.clear()
+        self.recording = True
+        try:
+            yield self
+        finally:
+            self.recording = False
+
+@pytest.fixture
+def query_log(db, monkeypatch):
+    """Log of the statements run on `db`; `execute_sql` is restored on teardown."""
+    log = QueryLog(db)
+    monkeypatch.setattr(db, "execute_sql", log.execute_sql)
+    return log
+
+@pytest.fixture
+def load_migration():
+    """Loader for a numbered migration module, e.g. load_migration("005_api_quota")."""
+    def load(name):
+        path = Path(__file__).parents[2] / "services" / "migrations" / f"{name}.py"
+        spec = util.spec_from_file_location(f"migration_{name}", path)
+        migration = util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        return migration
+    return load
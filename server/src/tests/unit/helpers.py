@@ -0,0 +1,6 @@
+from playhouse.pool import PooledSqliteDatabase
+from services.db_pool import PoolMetricsMixin
+
+
+class MeteredPooledSqliteDatabase(PoolMetricsMixin, PooledSqliteDatabase):
+    """SQLite stand-in for the production pool, with the same checkout metrics."""
@@ -1,68 +1,64 @@
-import unittest
-from unittest.mock import patch, MagicMock
+import asyncio
+import pytest
+from unittest.mock import patch
+from services.cache import ResponseCache
 from providers.alphavantage import AlphaVantageProvider
 from models.marketdata import EarningsHistory
 
-class TestAlphaVantageProvider(unittest.TestCase):
+QUARTERS = ["2024-12-31", "2024-09-30", "2024-06-30", "2024-03-31", "2023-12-31"]
+RESPONSES = {
+    "EARNINGS": {
+        "quarterlyEarnings": [
+            {"fiscalDateEnding": d, "reportedEPS": eps, "estimatedEPS": est}
+            for d, eps, est in zip(QUARTERS, ["2.5", "2.0", "1.8", "1.5", "1.2"], ["2.3", "1.9", "1.7", "1.4", "1.1"])
+        ],
+        "annualEarnings": [
+            {"fiscalDateEnding": "2024-12-31", "reportedEPS": "8.0", "estimatedEPS": "7.8"},
+            {"fiscalDateEnding": "2023-12-31", "reportedEPS": "6.0", "estimatedEPS": "5.9"},
+        ],
+    },
+    "INCOME_STATEMENT": {
+        "quarterlyReports": [
+            {"fiscalDateEnding": d, "totalRevenue": revenue}
+            for d, revenue in zip(QUARTERS, ["10000", "9500", "9000", "8500", "8000"])
+        ],
+        "annualReports": [
+            {"fiscalDateEnding": "2024-12-31", "totalRevenue": "40000"},
+            {"fiscalDateEnding": "2023-12-31", "totalRevenue": "35000"},
+        ],
+    },
+    "BALANCE_SHEET": {"quarterlyReports": [], "annualReports": []},
+}
 
-    @patch('providers.alphavantage.requests.get')
-    def test_get_earnings_history(self, mock_get):
-        # Mock responses for EARNINGS and INCOME_STATEMENT
-        mock_earnings_response = MagicMock()
-        mock_earnings_response.json.return_value = {
-            "quarterlyEarnings": [
-                {"fiscalDateEnding": "2024-12-31", "reportedEPS": "2.5", "estimatedEPS": "2.3"},
-                {"fiscalDateEnding": "2024-09-30", "reportedEPS": "2.0", "estimatedEPS": "1.9"},
-                {"fiscalDateEnding": "2024-06-30", "reportedEPS": "1.8", "estimatedEPS": "1.7"},
-                {"fiscalDateEnding": "2024-03-31", "reportedEPS": "1.5", "estimatedEPS": "1.4"},
-                {"fiscalDateEnding": "2023-12-31", "reportedEPS": "1.2", "estimatedEPS": "1.1"}
-            ],
-            "annualEarnings": [
-                {"fiscalDateEnding": "2024-12-31", "reportedEPS": "8.0", "estimatedEPS": "7.8"},
-                {"fiscalDateEnding": "2023-12-31", "reportedEPS": "6.0", "estimatedEPS": "5.9"}
-            ]
-        }
-        mock_income_response = MagicMock()
-        mock_income_response.json.return_value = {
-            "quarterlyReports": [
-                {"totalRevenue": "10000"},
-                {"totalRevenue": "9500"},
-                {"totalRevenue": "9000"},
-                {"totalRevenue": "8500"},
-                {"totalRevenue": "8000"}
-            ],
-            "annualReports": [
-                {"totalRevenue": "40000"},
-                {"totalRevenue": "35000"}
-            ]
-        }
-        # The method calls requests.get twice, so we need to return the right mock in order
-        mock_get.side_effect = [mock_earnings_response, mock_income_response]
 
-        provider = AlphaVantageProvider(symbol="AAPL")
-        provider.api_key = "test"  # Avoid env dependency
-        result = provider.get_earnings_history()
-        self.assertIsInstance(result, EarningsHistory)
-        self.assertEqual(len(result.quarterly_earnings), 4)
-        self.assertEqual(len(result.annual_earnings), 2)
-        self.assertEqual(result.quarterly_earnings[0].reported_eps, 2.5)
-        self.assertEqual(result.annual_earnings[0].reported_eps, 8.0)
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    monkeypatch.setenv("ALPHA_VANTAGE_API_KEY", "DUMMY")
+    provider = AlphaVantageProvider(cache=ResponseCache("alphavantage", cache_dir=str(tmp_path)))
+    yield provider
+    provider.http.close()
 
-        # Check revenue_growth_yoy and eps_growth_yoy for quarterly earnings
-        # For quarterly_earnings[0]: current = 2.5, previous = 1.2
-        # eps_growth_yoy = ((2.5 - 1.2) / 1.2) * 100 = 108.33
-        self.assertAlmostEqual(result.quarterly_earnings[0].eps_growth_yoy, 108.33, places=2)
-        # For quarterly_earnings[0]: current = 10000, previous = 8000
-        # revenue_growth_yoy = ((10000 - 8000) / 8000) * 100 = 25.0
-        self.assertAlmostEqual(result.quarterly_earnings[0].revenue_growth_yoy, 25.0, places=2)
+def test_get_earnings_history(provider):
+    functions = []
 
-        # Check revenue_growth_yoy and eps_growth_yoy for annual earnings
-        # For annual_earnings[0]: current = 8.0, previous = 6.0
-        # eps_growth_yoy = ((8.0 - 6.0) / 6.0) * 100 = 33.33
-        self.assertAlmostEqual(result.annual_earnings[0].eps_growth_yoy, 33.33, places=2)
-        # For annual_earnings[0]: current = 40000, previous = 35000
-        # revenue_growth_yoy = ((40000 - 35000) / 35000) * 100 = 14.29
-        self.assertAlmostEqual(result.annual_earnings[0].revenue_growth_yoy, 14.29, places=2)
+    async def fake_get_json(url, params=None):
+        functions.append(params["function"])
+        return RESPONSES[params["function"]]
 
-if __name__ == "__main__":
-    unittest.main()
+    with patch.object(provider.http, "get_json", side_effect=fake_get_json):
+        result, count = asyncio.run(provider.get_earnings_history_async("AAPL"))
+
+    assert sorted(functions) == ["BALANCE_SHEET", "EARNINGS", "INCOME_STATEMENT"]
+    assert count == 3
+    assert isinstance(result, EarningsHistory)
+    assert len(result.quarterly_earnings) == 4
+    assert len(result.annual_earnings) == 2
+    assert result.quarterly_earnings[0].reported_eps == 2.5
+    assert result.annual_earnings[0].reported_eps == 8.0
+
+    # Quarterly growth is against the same quarter a year earlier: EPS 2.5 vs 1.2, revenue 10000 vs 8000
+    assert result.quarterly_earnings[0].eps_growth == pytest.approx(108.33, abs=0.01)
+    assert result.quarterly_earnings[0].revenue_growth == pytest.approx(25.0, abs=0.01)
+    # Annual growth is against the previous year: EPS 8.0 vs 6.0, revenue 40000 vs 35000
+    assert result.annual_earnings[0].eps_growth == pytest.approx(33.33, abs=0.01)
+    assert result.annual_earnings[0].revenue_growth == pytest.approx(14.29, abs=0.01)
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from models.models import ApiQuota, ApiRequestUsage
+from services.database import DatabaseManager
+from services.batch_analysis import BatchAnalysisEngine
+from services.quota import DatabaseQuotaLedger
+from app import StockAnalysisApp
+from utils.logging import setup_logger
+
+MODELS = [ApiQuota, ApiRequestUsage]
+# The tests use the database from several threads
+THREADED_DB = True
+
+def test_reserve_is_atomic_across_threads(db):
+    results = []
+    barrier = threading.Barrier(20)
+
+    def reserve():
+        barrier.wait()
+        results.append(DatabaseManager.reserve_api_calls("alphavantage", 1, limit=10))
+        db.close()
+
+    threads = [threading.Thread(target=reserve) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results.count(True) == 10
+    assert DatabaseManager.get_api_quota("alphavantage") == {"used": 0, "requests": 0, "reserved": 10}
+
+def test_reservations_count_recorded_calls(db):
+    DatabaseManager.record_api_calls("alphavantage", 3, requests=2)
+    DatabaseManager.record_api_calls("alphavantage", 4)
+    DatabaseManager.record_api_calls("alphavantage", 9, day=date.today() - timedelta(days=1))
+    assert DatabaseManager.get_api_quota("alphavantage") == {"used": 7, "requests": 3, "reserved": 0}
+    assert DatabaseManager.reserve_api_calls("alphavantage", 3, limit=10)
+    assert not DatabaseManager.reserve_api_calls("alphavantage", 1, limit=10)
+    DatabaseManager.release_api_calls("alphavantage", 3)
+    # Releasing more than is reserved never goes negative
+    DatabaseManager.release_api_calls("alphavantage", 5)
+    assert DatabaseManager.get_api_quota("alphavantage")["reserved"] == 0
+
+def test_usage_summary_reads_the_daily_counter(db):
+    fake_app = SimpleNamespace(logger=setup_logger("test"), db_manager=DatabaseManager, usage_buffer=SimpleNamespace(add_api_usage=lambda **kwargs: None))
+    StockAnalysisApp.save_usage_metadata(fake_app, "stock:AAPL", {
+        "market": {"api_usage": {"alphavantage": 2, "fred": None}},
+        "news": {"api_usage": {"alphavantage": 4}},
+    })
+    assert StockAnalysisApp.get_provider_usage_summary(fake_app, "alphavantage") == {"total": 6, "average": 3.0}
+    assert StockAnalysisApp.get_provider_usage_summary(fake_app, "polygon") == {"total": 0, "average": 0}
+
+def test_overlapping_batches_share_the_daily_limit(db):
+    async def analyze(symbol):
+        await asyncio.sleep(0.01)
+        DatabaseManager.record_api_calls("alphavantage", 4)
+        return {"usage": {"market_analysis": {"api_usage": {"alphavantage": 4}}}}
+
+    async def main():
+        engines = [
+            BatchAnalysisEngine(analyze, max_concurrency=2, quota=DatabaseQuotaLedger(DatabaseManager, "alphavantage", limit=12))
+            for _ in range(2)
+        ]
+        return await asyncio.gather(*(engine.run_all(["A", "B", "C"]) for engine in engines))
+
+    results = [r for batch in asyncio.run(main()) for r in batch]
+    assert sum(r.status == "ok" for r in results) == 3
+    assert sum(r.status == "skipped" for r in results) == 3
+    ledger = DatabaseQuotaLedger(DatabaseManager, "alphavantage", limit=12)
+    assert ledger.summary() == {"provider": "alphavantage", "limit": 12, "used": 12, "reserved": 0, "remaining": 0}
+
+def test_migration_seeds_counters_from_usage_log(db, load_migration):
+    yesterday = datetime.now() - timedelta(days=1)
+    ApiRequestUsage.create(step="a", provider="alphavantage", count=2)
+    ApiRequestUsage.create(step="b", provider="alphavantage", count=3)
+    ApiRequestUsage.create(step="c", provider="alphavantage", count=5, created_at=yesterday)
+    migration = load_migration("005_api_quota")
+    migration.upgrade(None)
+    assert DatabaseManager.get_api_quota("alphavantage") == {"used": 5, "requests": 2, "reserved": 0}
+    assert DatabaseManager.get_api_quota("alphavantage", day=yesterday.date())["used"] == 5
+
+def test_failed_analysis_releases_its_reservation(db):
+    async def analyze(symbol):
+        if symbol == "BAD":
+            raise RuntimeError("Alpha Vantage returned an error")
+        DatabaseManager.record_api_calls("alphavantage", 4)
+        return {"usage": {"market_analysis": {"api_usage": {"alphavantage": 4}}}}
+
+    engine = BatchAnalysisEngine(analyze, quota=DatabaseQuotaLedger(DatabaseManager, "alphavantage", limit=20))
+    results = asyncio.run(engine.run_all(["AAPL", "BAD"]))
+    assert sorted(r.status for r in results) == ["error", "ok"]
+    # Only the successful run's recorded usage counts; the failed run is not charged its reservation
+    assert DatabaseManager.get_api_quota("alphavantage") == {"used": 4, "requests": 1, "reserved": 0}
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import pytest
+import functools
+from types import SimpleNamespace
+from datetime import date
+from models.models import Stock, StockSplit, Portfolio, StockTransactionLog, PortfolioHolding, database_proxy
+from services.database import DatabaseManager
+from services.async_database import AsyncDatabaseManager
+from services.stock_cache import StockIdentityMap
+from tests.unit.helpers import MeteredPooledSqliteDatabase
+from app import StockAnalysisApp
+from utils.logging import setup_logger
+
+
+@pytest.fixture
+def manager(tmp_path):
+    db = MeteredPooledSqliteDatabase(str(tmp_path / "async.db"), max_connections=4, timeout=2, check_same_thread=False)
+    manager = DatabaseManager.__new__(DatabaseManager)
+    manager._db = db
+    manager.pooled = True
+    yield manager
+    db.close_all()
+
+def test_runs_queries_on_db_threads_in_their_own_scope(manager):
+    adb = AsyncDatabaseManager(manager, max_workers=2)
+    db = manager._db
+
+    def query():
+        return threading.current_thread().name, db.execute_sql("select 1").fetchone()[0]
+
+    async def main():
+        results = await asyncio.gather(*(adb.run(query) for _ in range(4)))
+        stats = await adb.get_pool_stats()
+        return results, stats
+
+    results, stats = asyncio.run(main())
+    adb.shutdown()
+    assert all(name.startswith("db") and value == 1 for name, value in results)
+    # Every call returned its connection to the pool
+    assert stats["in_use"] == 0
+    assert stats["checkouts"] >= 1
+
+def test_cheap_requests_complete_while_slow_query_runs(manager):
+    """A slow query through the facade must not stall cheap requests on the loop."""
+    adb = AsyncDatabaseManager(manager, max_workers=2)
+    db = manager._db
+
+    def slow_query(release, timeout):
+        db.execute_sql("select 1")
+        # Only released by a request served on the loop, so this times out if the loop is blocked
+        return release.wait(timeout)
+
+    def cheap_query():
+        return db.execute_sql("select 1").fetchone()[0]
+
+    async def offloaded():
+        release = threading.Event()
+        slow = asyncio.create_task(adb.run(slow_query, release, 5))
+        await asyncio.sleep(0)
+        results = [await adb.run(cheap_query) for _ in range(10)]
+        slow_still_running = not slow.done()
+        release.set()
+        return results, slow_still_running, await slow
+
+    async def inline():
+        release = threading.Event()
+
+        async def blocking_analysis():
+            # What the handlers did before: a synchronous query straight on the event loop
+            with manager.connection_scope():
+                return slow_query(release, 0.2)
+
+        async def cheap_request():
+            release.set()
+
+        slow = asyncio.create_task(blocking_analysis())
+        asyncio.create_task(cheap_request())
+        return await slow
+
+    results, slow_still_running, released = asyncio.run(offloaded())
+    adb.shutdown()
+    assert results == [1] * 10
+    assert slow_still_running and released
+    # Inline, the cheap request only runs once the blocking query has given up
+    assert asyncio.run(inline()) is False
+
+def test_add_stock_fetches_splits_without_holding_a_connection(manager, monkeypatch):
+    db = manager._db
+    # Keep this database's stocks out of the shared identity map
+    monkeypatch.setattr(DatabaseManager, "stock_cache", StockIdentityMap())
+    database_proxy.initialize(db)
+    db.create_tables([Stock, StockSplit, Portfolio, StockTransactionLog, PortfolioHolding])
+    db.close()
+    adb = AsyncDatabaseManager(manager, max_workers=1)
+    in_use = []
+
+    class FakeAlphaVantage:
+        async def get_splits_async(self, symbol):
+            in_use.append(db.in_use)
+            return [{"effective_date": "2020-08-31", "split_factor": "4.0"}], 1
+
+    app = SimpleNamespace(db=adb, db_manager=manager, logger=setup_logger("test"), alphavantage_provider=FakeAlphaVantage())
+    app.update_stock_splits = functools.partial(StockAnalysisApp.update_stock_splits, app)
+    try:
+        result = asyncio.run(StockAnalysisApp.add_stock(app, "aapl"))
+        assert result["data"]["symbol"] == "AAPL"
+        # The split lookup ran between DB calls, not inside one
+        assert in_use == [0]
+        assert [(s.effective_date, s.split_factor) for s in StockSplit.select()] == [(date(2020, 8, 31), 4.0)]
+    finally:
+        adb.shutdown()
+        database_proxy.initialize(None)
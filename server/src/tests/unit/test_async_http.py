@@ -0,0 +1,59 @@
+import time
+import asyncio
+import pytest
+from unittest.mock import patch
+from services.cache import ResponseCache
+from providers.alphavantage import AlphaVantageProvider
+from utils.rate_limiter import RateLimiter, MemoryBucketBackend
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    monkeypatch.setenv("ALPHA_VANTAGE_API_KEY", "DUMMY")
+    provider = AlphaVantageProvider(cache=ResponseCache("alphavantage", cache_dir=str(tmp_path)))
+    yield provider
+    provider.http.close()
+
+def test_rate_limiter_limits_rate():
+    async def run():
+        bucket = RateLimiter("test", per_minute=600, burst=2, backend=MemoryBucketBackend())  # 10 tokens per second
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - start
+    # Two tokens are available immediately, the next two take ~0.1s each
+    assert asyncio.run(run()) == pytest.approx(0.2, abs=0.08)
+
+def test_statements_fetched_concurrently(provider):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_get_json(url, params=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return {"function": params["function"]}
+
+    with patch.object(provider.http, "get_json", side_effect=fake_get_json):
+        history, count = asyncio.run(provider.get_earnings_history_async("AAPL"))
+    assert count == 3
+    assert max_in_flight == 3
+    assert history.quarterly_earnings == []
+
+def test_sync_wrapper_from_running_loop(provider):
+    overview = {"Sector": "TECHNOLOGY", "Industry": "SOFTWARE", "MarketCapitalization": "100"}
+
+    async def fake_fetch_json(url, params=None):
+        assert asyncio.get_running_loop() is provider.http.loop
+        return overview
+
+    async def call_sync():
+        # Sync callers inside an event loop (e.g. FastAPI handlers) must not need the caller's loop
+        return provider.get_market_data("AAPL")
+
+    with patch.object(provider.http, "_fetch_json", side_effect=fake_fetch_json):
+        data, count = asyncio.run(call_sync())
+    assert data.sector == "TECHNOLOGY"
+    assert count == 1
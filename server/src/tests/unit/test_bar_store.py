@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from services.bar_store import BarStore, slice_period, period_start
+from providers.yfinance import YFinanceProvider
+from utils.rate_limiter import RateLimiter, MemoryBucketBackend
+
+
+class FakeYahoo:
+    """Serves bars from a fixed in-memory history and records each fetch."""
+
+    def __init__(self, days=400):
+        index = pd.date_range(end=pd.Timestamp.now().normalize(), periods=days, freq="B", tz="America/New_York")
+        close = 100 + np.arange(days, dtype=float)
+        self.history = pd.DataFrame({
+            "Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1000.0,
+        }, index=index)
+        self.calls = []
+
+    def fetch(self, symbols, interval, start, period):
+        self.calls.append({"symbols": list(symbols), "start": start, "period": period})
+        frame = self.history
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start).tz_localize(frame.index.tz)]
+        return {symbol: frame.copy() for symbol in symbols}
+
+@pytest.fixture
+def yahoo():
+    return FakeYahoo()
+
+def test_serves_ranges_locally_after_first_fetch(tmp_path, yahoo):
+    store = BarStore(yahoo.fetch, base_dir=str(tmp_path))
+    year = store.get_history("AAPL", period="1y", interval="1d")
+    assert len(yahoo.calls) == 1
+    assert year.index[0] >= pd.Timestamp(period_start("1y")).tz_localize("America/New_York")
+    # Shorter ranges inside the stored coverage never hit the network
+    month = store.get_history("AAPL", period="1mo", interval="1d")
+    five = store.get_history("AAPL", period="5d", interval="1d")
+    assert len(yahoo.calls) == 1
+    assert len(five) == 5
+    assert month.index[-1] == year.index[-1]
+    # A fresh instance reads the Parquet file instead of downloading
+    BarStore(yahoo.fetch, base_dir=str(tmp_path)).get_history("AAPL", period="6mo", interval="1d")
+    assert len(yahoo.calls) == 1
+
+def test_refresh_fetches_only_the_tail(tmp_path, yahoo):
+    store = BarStore(yahoo.fetch, base_dir=str(tmp_path), refresh_after=0)
+    store.get_history("AAPL", period="1y", interval="1d")
+    # A new bar arrives upstream
+    next_day = yahoo.history.index[-1] + pd.offsets.BDay()
+    yahoo.history.loc[next_day] = [500.0, 501.0, 499.0, 500.0, 1000.0]
+    bars = store.get_history("AAPL", period="1y", interval="1d")
+    tail_call = yahoo.calls[-1]
+    assert tail_call["start"] >= (yahoo.history.index[-5]).tz_localize(None).to_pydatetime()
+    assert bars.index[-1] == next_day
+    assert bars["Close"].iloc[-1] == 500.0
+    assert not bars.index.duplicated().any()
+
+def test_adjusted_history_triggers_full_refetch(tmp_path, yahoo):
+    store = BarStore(yahoo.fetch, base_dir=str(tmp_path), refresh_after=0)
+    store.get_history("AAPL", period="1y", interval="1d")
+    # 2:1 split: every historical price is re-adjusted upstream
+    yahoo.history[["Open", "High", "Low", "Close"]] /= 2
+    bars = store.get_history("AAPL", period="1y", interval="1d")
+    assert yahoo.calls[-1]["start"] == yahoo.calls[0]["start"]
+    pd.testing.assert_series_equal(bars["Close"], slice_period(yahoo.history, "1y")["Close"], check_freq=False)
+
+def test_longer_period_extends_coverage(tmp_path, yahoo):
+    store = BarStore(yahoo.fetch, base_dir=str(tmp_path))
+    store.get_history("AAPL", period="1mo", interval="1d")
+    store.get_history("AAPL", period="1y", interval="1d")
+    assert len(yahoo.calls) == 2
+    store.get_history("AAPL", period="3mo", interval="1d")
+    assert len(yahoo.calls) == 2
+
+def test_history_many_matches_download_layout(tmp_path, yahoo):
+    store = BarStore(yahoo.fetch, base_dir=str(tmp_path))
+    hist = store.get_history_many(["AAPL", "MSFT"], period="1mo", interval="1d")
+    assert len(yahoo.calls) == 1
+    assert yahoo.calls[0]["symbols"] == ["AAPL", "MSFT"]
+    assert list(hist["Close"].columns) == ["AAPL", "MSFT"]
+    assert hist["Close"]["MSFT"].iloc[-1] == yahoo.history["Close"].iloc[-1]
+
+def test_downloads_go_through_the_provider_limiter(tmp_path, yahoo):
+    limiter = RateLimiter("yfinance-test", per_minute=600, backend=MemoryBucketBackend())
+    provider = YFinanceProvider(bar_store=BarStore(fetch=yahoo.fetch, base_dir=str(tmp_path)), rate_limiter=limiter)
+    frame = pd.concat({"AAPL": yahoo.history}, axis=1).swaplevel(0, 1, axis=1)
+    with patch("providers.yfinance.yf.download", return_value=frame):
+        bars = provider._download_bars(["AAPL"], "1d", period="1y")
+    assert list(bars) == ["AAPL"]
+    assert limiter.stats()["wait_seconds"]["count"] == 1
@@ -0,0 +1,73 @@
+import time
+import asyncio
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from services.batch_analysis import BatchAnalysisEngine
+from services.quota import QuotaLedger, count_api_usage
+from utils.concurrency import LLMConcurrencyLimiter
+
+
+def make_analyze(delay=0.05, fail=(), api_calls=4):
+    state = {"in_flight": 0, "max_in_flight": 0, "calls": []}
+
+    async def analyze(symbol):
+        state["calls"].append(symbol)
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(delay)
+            if symbol in fail:
+                raise RuntimeError(f"boom {symbol}")
+            return {"usage": {"market_analysis": {"api_usage": {"alphavantage": api_calls}}}}
+        finally:
+            state["in_flight"] -= 1
+    return analyze, state
+
+def test_quota_ledger_reserve_settle():
+    ledger = QuotaLedger("alphavantage", limit=10, used=2)
+    assert ledger.reserve(4)
+    assert ledger.reserve(4)
+    assert not ledger.reserve(1)
+    ledger.settle(4, 0)  # fully cached run
+    assert ledger.remaining == 4
+    ledger.refund(4)
+    assert ledger.summary() == {"provider": "alphavantage", "limit": 10, "used": 2, "reserved": 0, "remaining": 8}
+
+def test_count_api_usage():
+    usage = {"a": {"api_usage": {"alphavantage": 1}}, "b": {"api_usage": None}, "c": {"api_usage": {"alphavantage": 3, "fred": 2}}}
+    assert count_api_usage(usage, "alphavantage") == 4
+    assert count_api_usage(None, "alphavantage") == 0
+
+def test_batch_runs_concurrently_and_streams_failures():
+    analyze, state = make_analyze(fail={"BAD"})
+    engine = BatchAnalysisEngine(analyze, max_concurrency=3)
+    results = asyncio.run(engine.run_all(["aapl", "MSFT", "AAPL", "BAD", "NVDA", "GOOG"]))
+    assert sorted(state["calls"]) == ["AAPL", "BAD", "GOOG", "MSFT", "NVDA"]
+    assert state["max_in_flight"] == 3
+    by_symbol = {r.symbol: r for r in results}
+    assert by_symbol["BAD"].status == "error"
+    assert "boom" in by_symbol["BAD"].error
+    assert all(r.status == "ok" for s, r in by_symbol.items() if s != "BAD")
+
+def test_batch_respects_quota():
+    analyze, state = make_analyze(api_calls=4)
+    quota = QuotaLedger("alphavantage", limit=10, used=0)
+    engine = BatchAnalysisEngine(analyze, max_concurrency=4, quota=quota)
+    results = asyncio.run(engine.run_all(["A", "B", "C", "D"]))
+    statuses = sorted(r.status for r in results)
+    assert statuses == ["ok", "ok", "skipped", "skipped"]
+    assert quota.used == 8
+    assert quota.reserved == 0
+
+def test_llm_concurrency_limiter():
+    limiter = LLMConcurrencyLimiter(limit=1)
+    llm = FakeListChatModel(responses=["ok"] * 6, sleep=0.05, callbacks=[limiter])
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*(llm.ainvoke("hi") for _ in range(6)))
+        return time.perf_counter() - start, limiter.limiter.get()._value
+    elapsed, available = asyncio.run(run())
+    # Six 50ms calls, one at a time
+    assert elapsed >= 0.3
+    assert available == 1
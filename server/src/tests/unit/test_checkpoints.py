@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from peewee import SqliteDatabase
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableLambda
+from graphs import fundamental, technical
+from models.models import GraphCheckpoint, GraphCheckpointBlob, GraphCheckpointWrite
+from services.checkpoints import DatabaseCheckpointSaver, create_checkpointer
+from tests.unit.test_fundamental_graph import FakeLLM, fake_data
+
+MODELS = [GraphCheckpoint, GraphCheckpointBlob, GraphCheckpointWrite]
+
+
+class FlakyExportLLM(FakeLLM):
+    """FakeLLM whose structured output (the export node) fails on the first call."""
+
+    def __init__(self):
+        super().__init__()
+        object.__setattr__(self, "export_calls", 0)
+
+    def with_structured_output(self, schema, include_raw=False):
+        chain = super().with_structured_output(schema, include_raw=include_raw)
+
+        async def respond(prompt):
+            object.__setattr__(self, "export_calls", self.export_calls + 1)
+            if self.export_calls == 1:
+                raise RuntimeError("export failed")
+            return await chain.ainvoke(prompt)
+        return RunnableLambda(respond)
+
+@pytest.fixture
+def saver():
+    db = SqliteDatabase(":memory:")
+    with db.bind_ctx(MODELS):
+        db.create_tables(MODELS)
+        yield DatabaseCheckpointSaver()
+    db.close()
+
+@pytest.fixture
+def providers(monkeypatch):
+    monkeypatch.setattr(fundamental, "VerboseFileCallbackHandler", lambda graph_name: BaseCallbackHandler())
+    monkeypatch.setattr(technical, "VerboseFileCallbackHandler", lambda graph_name: BaseCallbackHandler())
+    yfinance_provider = MagicMock()
+    yfinance_provider.get_technical_indicators.return_value = fake_data({"rsi": 55})
+    yfinance_provider.get_dividend_history.return_value = fake_data({"dividends": {}})
+    yfinance_provider.get_news.return_value = fake_data({"news": []})
+    alphavantage_provider = MagicMock()
+    alphavantage_provider.get_market_data_async = AsyncMock(return_value=(fake_data({"sector": "TECH"}), 1))
+    alphavantage_provider.get_earnings_history_async = AsyncMock(return_value=(fake_data({"quarterly_earnings": []}), 3))
+    return yfinance_provider, alphavantage_provider
+
+def test_failed_run_resumes_from_last_checkpoint(saver, providers):
+    yfinance_provider, alphavantage_provider = providers
+    graph = fundamental.FundamentalGraph(FlakyExportLLM(), yfinance_provider, alphavantage_provider, checkpointer=saver)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(graph.analyze_stock("AAPL", run_id="run-1"))
+    assert alphavantage_provider.get_market_data_async.await_count == 1
+    assert GraphCheckpoint.select().where(GraphCheckpoint.thread_id == "run-1").count() > 0
+
+    result = asyncio.run(graph.analyze_stock("AAPL", run_id="run-1"))
+    assert result["results"]["structured_data"] == {"recommendation": "HOLD"}
+    assert result["usage"]["market_analysis"]["api_usage"] == {"alphavantage": 4}
+    # Only the failed export node ran again; provider calls were not repeated
+    assert alphavantage_provider.get_market_data_async.await_count == 1
+    assert yfinance_provider.get_news.call_count == 1
+
+    saver.delete_thread("run-1")
+    assert saver.get_tuple({"configurable": {"thread_id": "run-1"}}) is None
+
+def test_list_returns_newest_first(saver, providers):
+    yfinance_provider, alphavantage_provider = providers
+    graph = fundamental.FundamentalGraph(FakeLLM(), yfinance_provider, alphavantage_provider, checkpointer=saver)
+    asyncio.run(graph.analyze_stock("MSFT", run_id="run-2"))
+
+    checkpoints = list(saver.list({"configurable": {"thread_id": "run-2"}}))
+    ids = [c.config["configurable"]["checkpoint_id"] for c in checkpoints]
+    assert ids == sorted(ids, reverse=True)
+    assert saver.get_tuple({"configurable": {"thread_id": "run-2"}}).config == checkpoints[0].config
+    assert len(list(saver.list({"configurable": {"thread_id": "run-2"}}, limit=2))) == 2
+
+def test_create_checkpointer_backends():
+    assert isinstance(create_checkpointer("database"), DatabaseCheckpointSaver)
+    assert not isinstance(create_checkpointer("memory"), DatabaseCheckpointSaver)
+    with pytest.raises(ValueError):
+        create_checkpointer("redis")
@@ -0,0 +1,100 @@
+import time
+import asyncio
+import threading
+import pytest
+from playhouse.pool import MaxConnectionsExceeded
+from services.database import DatabaseManager
+from services.db_pool import DatabaseConnectionMiddleware
+from scheduler import Scheduler
+from tests.unit.helpers import MeteredPooledSqliteDatabase
+
+
+@pytest.fixture
+def manager(tmp_path):
+    db = MeteredPooledSqliteDatabase(str(tmp_path / "pool.db"), max_connections=2, timeout=2, check_same_thread=False)
+    manager = DatabaseManager.__new__(DatabaseManager)
+    manager._db = db
+    manager.pooled = True
+    yield manager
+    db.close_all()
+
+def test_concurrent_scopes_get_their_own_connections(manager):
+    db = manager._db
+    seen = []
+
+    async def request():
+        with manager.connection_scope():
+            db.execute_sql("select 1")
+            conn = db.connection()
+            seen.append(conn)
+            await asyncio.sleep(0.05)
+            # Still the same connection after the other request ran on the loop
+            assert db.connection() is conn
+
+    async def main():
+        await asyncio.gather(request(), request())
+
+    asyncio.run(main())
+    assert len({id(conn) for conn in seen}) == 2
+    stats = manager.get_pool_stats()
+    assert stats["in_use"] == 0
+    assert stats["idle"] == 2
+    assert stats["peak_in_use"] == 2
+    assert stats["checkouts"] == 2
+
+def test_waits_for_a_free_connection_and_records_wait(manager):
+    db = manager._db
+    held = threading.Event()
+
+    def hold():
+        with manager.connection_scope():
+            db.connect()
+            held.set()
+            time.sleep(0.3)
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for t in threads:
+        t.start()
+    held.wait()
+    time.sleep(0.05)
+    with manager.connection_scope():
+        db.execute_sql("select 1")
+    for t in threads:
+        t.join()
+    stats = manager.get_pool_stats()
+    assert stats["max_wait_ms"] >= 100
+    assert stats["timeouts"] == 0
+
+def test_checkout_times_out_when_pool_is_exhausted(tmp_path):
+    db = MeteredPooledSqliteDatabase(str(tmp_path / "pool.db"), max_connections=1, timeout=0.2, check_same_thread=False)
+    holder = threading.Thread(target=lambda: (db.connect(), time.sleep(0.5), db.close()))
+    holder.start()
+    time.sleep(0.05)
+    with pytest.raises(MaxConnectionsExceeded):
+        db.connect()
+    holder.join()
+    assert db.pool_stats()["timeouts"] == 1
+
+def test_middleware_returns_connection_after_response(manager):
+    db = manager._db
+
+    async def endpoint(scope, receive, send):
+        db.execute_sql("select 1")
+        assert manager.get_pool_stats()["in_use"] == 1
+
+    middleware = DatabaseConnectionMiddleware(endpoint, scope_factory=manager.connection_scope)
+    asyncio.run(middleware({"type": "http"}, None, None))
+    assert manager.get_pool_stats()["in_use"] == 0
+
+def test_scheduled_jobs_run_in_a_connection_scope(manager):
+    class FakeApp:
+        db_manager = manager
+
+    async def job():
+        manager._db.execute_sql("select 1")
+        return manager.get_pool_stats()["in_use"]
+
+    wrapped = Scheduler(FakeApp())._in_connection_scope(job)
+    assert wrapped.__name__ == "job"
+    assert asyncio.run(wrapped()) == 1
+    assert manager.get_pool_stats()["in_use"] == 0
@@ -0,0 +1,88 @@
+import asyncio
+import functools
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from models.models import Portfolio, EconomicAnalysis
+from services.database import DatabaseManager
+from graphs.portfolio import economic_window
+from utils.concurrency import LoopSemaphore
+from utils.logging import setup_logger
+from app import StockAnalysisApp
+
+MODELS = [Portfolio, EconomicAnalysis]
+
+
+class InlineDb:
+    """Stands in for AsyncDatabaseManager, running DatabaseManager methods on the caller's thread."""
+
+    async def run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def __getattr__(self, name):
+        method = getattr(DatabaseManager, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+class FakePortfolioGraph:
+    def __init__(self):
+        self.economy_calls = 0
+
+    async def analyze_economy(self, window_start, window_end):
+        self.economy_calls += 1
+        await asyncio.sleep(0.02)
+        return {"analysis": f"macro #{self.economy_calls}", "trends": {"gdp": {"trend": 1.01}}, "usage": {"economic_analysis": {"api_usage": {"fred": 11}}}}
+
+def fake_app():
+    app = SimpleNamespace(db=InlineDb(), logger=setup_logger("test"), portfolio_graph=FakePortfolioGraph(), _economic_lock=LoopSemaphore(1), usage=[])
+    app.save_usage_metadata = lambda source, usage: app.usage.append(source)
+    app.get_economic_analysis = functools.partial(StockAnalysisApp.get_economic_analysis, app)
+    return app
+
+def test_economic_analysis_is_computed_once_per_window(db):
+    app = fake_app()
+
+    async def main():
+        return await asyncio.gather(*(app.get_economic_analysis() for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert app.portfolio_graph.economy_calls == 1
+    assert {r.analysis for r in results} == {"macro #1"}
+    assert app.usage == ["economic"]
+    stored = EconomicAnalysis.get()
+    assert (stored.window_start, stored.window_end) == economic_window()
+    assert stored.expires_at > datetime.now() + timedelta(hours=23)
+
+    # Expired analyses are recomputed, and force always recomputes
+    EconomicAnalysis.update(expires_at=datetime.now() - timedelta(seconds=1)).execute()
+    assert asyncio.run(app.get_economic_analysis()).analysis == "macro #2"
+    assert asyncio.run(app.get_economic_analysis(force=True)).analysis == "macro #3"
+    assert DatabaseManager.get_economic_analysis(*economic_window()).analysis == "macro #3"
+    assert DatabaseManager.get_economic_analysis(date(2020, 1, 1), date(2020, 6, 29)) is None
+
+def test_portfolios_share_the_analysis_and_run_concurrently(db, monkeypatch):
+    monkeypatch.setenv("PORTFOLIO_MAX_CONCURRENCY", "2")
+    monkeypatch.setattr("utils.concurrency._provider_limits", {})
+    for name in ("growth", "income", "index", "broken"):
+        Portfolio.create(name=name)
+    app = fake_app()
+    in_flight, seen = 0, {"max": 0, "economic": set()}
+
+    async def portfolio_analysis(portfolio_id, economic_analysis=None):
+        nonlocal in_flight
+        in_flight += 1
+        seen["max"] = max(seen["max"], in_flight)
+        seen["economic"].add(economic_analysis)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        if portfolio_id == 4:
+            raise RuntimeError("LLM quota exhausted")
+        return {"message": "ok"}
+    app.portfolio_analysis = portfolio_analysis
+
+    results = asyncio.run(StockAnalysisApp.portfolio_analysis_all(app))
+    assert app.portfolio_graph.economy_calls == 1
+    assert seen == {"max": 2, "economic": {"macro #1"}}
+    assert [r.get("error") for r in results] == [None, None, None, "LLM quota exhausted"]
+    assert [r["portfolio_id"] for r in results] == [1, 2, 3, 4]
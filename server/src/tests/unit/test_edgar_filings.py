@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from services.cache import ResponseCache
+from providers.edgar import EdgarProvider
+
+
+class FakeForm4:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.rows)
+
+class FakeFiling:
+    """Picklable stand-in for edgar.Filing; accession numbers ending in 'bad' fail to parse."""
+
+    def __init__(self, accession_no, insider, kind, value):
+        self.accession_no = accession_no
+        self.row = {"Date": "2025-05-02", "Insider": insider, "Position": "Director", "Transaction Type": kind,
+                    "Shares": 10, "Price": value / 10, "Value": value}
+
+    def obj(self):
+        if self.accession_no.endswith("bad"):
+            raise ValueError("malformed XML")
+        return FakeForm4([self.row])
+
+FILINGS = {
+    "AAPL": [FakeFiling("a1", "Cook", "Sale", 1000.0), FakeFiling("a2", "Cook", "Sale", 500.0), FakeFiling("a3bad", "Cook", "Sale", 1.0)],
+    "MSFT": [FakeFiling("m1", "Nadella", "Purchase", 300.0)],
+}
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    monkeypatch.setenv("EDGAR_IDENTITY", "test test@example.com")
+    provider = EdgarProvider(cache=ResponseCache("edgar", cache_dir=str(tmp_path)), max_workers=2)
+    filings = {symbol: list(symbol_filings) for symbol, symbol_filings in FILINGS.items()}
+    with patch.object(provider, "_get_filings", side_effect=lambda symbol, forms, days: filings.get(symbol, [])):
+        yield provider, filings
+    provider.close()
+
+def test_filings_are_parsed_once_in_the_pool(provider):
+    provider, filings = provider
+    summaries = provider.get_insider_trading_summaries(["AAPL", "MSFT", "TSLA"], days=90)
+    # Four uncached filings went to the process pool in one batch; the malformed one was skipped
+    assert provider._pool is not None
+    assert summaries["AAPL"]["sale_total"] == 1500.0
+    assert summaries["AAPL"]["top_sellers"] == [{"insider": "Cook", "position": "Director", "total_value": 1500.0}]
+    assert summaries["MSFT"]["buy_total"] == 300.0
+    assert summaries["TSLA"] == {"sale_total": 0.0, "buy_total": 0.0, "top_sellers": [], "top_buyers": []}
+    assert provider.cache.stats()["entries"] == 3
+
+    # A new filing arrives: only it (and the one that failed before) are parsed again
+    filings["AAPL"].append(FakeFiling("a4", "Williams", "Sale", 250.0))
+    before = provider.cache.stats()
+    summary = provider.get_insider_trading_summary("AAPL", days=90)
+    after = provider.cache.stats()
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (2, 2)
+    assert summary["sale_total"] == 1750.0
+    assert summary["monthly_trend"] == {"2025-05": {"sale_total": 1750.0, "buy_total": 0.0, "buy_vs_sell_ratio": 0.0}}
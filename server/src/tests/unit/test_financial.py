@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+import utils.financial as financial
+from utils.financial import (
+    calculate_indicators,
+    latest_indicator_values,
+    calculate_obv,
+    calculate_rsi,
+    calculate_macd,
+    calculate_bollinger_bands,
+    calculate_atr,
+    rolling_mean,
+    rolling_std,
+)
+from providers.yfinance import YFinanceProvider
+
+
+def make_history(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(rows).cumsum()
+    index = pd.date_range("2024-01-01", periods=rows, freq="B")
+    return pd.DataFrame({
+        "Open": close + rng.standard_normal(rows) * 0.1,
+        "High": close + 1,
+        "Low": close - 1,
+        "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, rows).astype(float),
+    }, index=index)
+
+def make_multi_history(symbols, rows=300):
+    frames = {symbol: make_history(rows, seed=i) for i, symbol in enumerate(symbols)}
+    # Same (price, ticker) column layout as yf.download
+    return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1), frames
+
+def reference_obv(close, volume):
+    obv = [0]
+    for i in range(1, len(close)):
+        if close.iloc[i] > close.iloc[i-1]:
+            obv.append(obv[-1] + volume.iloc[i])
+        elif close.iloc[i] < close.iloc[i-1]:
+            obv.append(obv[-1] - volume.iloc[i])
+        else:
+            obv.append(obv[-1])
+    return float(obv[-1])
+
+def test_obv_matches_loop():
+    hist = make_history()
+    hist.loc[hist.index[10], "Close"] = hist["Close"].iloc[9]  # unchanged close keeps OBV flat
+    assert calculate_obv(hist["Close"], hist["Volume"]) == reference_obv(hist["Close"], hist["Volume"])
+
+def test_rolling_matches_pandas_with_gaps():
+    frame = pd.DataFrame(np.random.default_rng(1).standard_normal((120, 3)) * 50 + 1000)
+    frame.iloc[30:33, 1] = np.nan
+    pd.testing.assert_frame_equal(rolling_mean(frame, 20), frame.rolling(20).mean(), rtol=1e-9)
+    pd.testing.assert_frame_equal(rolling_mean(frame, 5, min_periods=1), frame.rolling(5, min_periods=1).mean(), rtol=1e-9)
+    pd.testing.assert_frame_equal(rolling_std(frame, 20), frame.rolling(20).std(), rtol=1e-7)
+
+def test_indicators_match_single_symbol_functions():
+    symbols = ["AAA", "BBB", "CCC"]
+    hist, frames = make_multi_history(symbols)
+    indicators = calculate_indicators(hist)
+    latest = latest_indicator_values(indicators)
+    assert list(latest.index) == symbols
+    assert len(indicators["sma_20"]) == len(hist)
+    for symbol in symbols:
+        single = frames[symbol]
+        close = single["Close"]
+        row = latest.loc[symbol]
+        assert row["sma_200"] == pytest.approx(close.rolling(200).mean().iloc[-1])
+        assert row["rsi"] == pytest.approx(calculate_rsi(close).iloc[-1])
+        macd = calculate_macd(close)
+        assert row["macd"] == pytest.approx(macd["macd"])
+        assert row["macd_hist"] == pytest.approx(macd["macd_hist"])
+        bb = calculate_bollinger_bands(close)
+        assert row["bb_upper"] == pytest.approx(bb["bb_upper"])
+        assert row["bb_lower"] == pytest.approx(bb["bb_lower"])
+        assert row["atr"] == pytest.approx(calculate_atr(single["High"], single["Low"], close))
+        assert row["obv"] == reference_obv(close, single["Volume"])
+        assert row["volume_trend"] == pytest.approx(single["Volume"].iloc[-5:].mean() / single["Volume"].iloc[-20:].mean())
+
+def test_screen_500_symbols_is_vectorized():
+    # The indicator passes run once over the whole frame, however many symbols it holds
+    with patch.object(financial, "_rolling_moments", wraps=financial._rolling_moments) as moments:
+        calculate_indicators(make_multi_history(["AAA", "BBB"], rows=252)[0])
+        calls_for_two = moments.call_count
+        moments.reset_mock()
+        hist, _ = make_multi_history([f"S{i:03d}" for i in range(500)], rows=252)
+        latest = latest_indicator_values(calculate_indicators(hist))
+    assert moments.call_count == calls_for_two
+    assert latest.shape[0] == 500
+
+def test_yfinance_technical_indicators_uses_engine():
+    hist = make_history(rows=60)
+    hist.index = hist.index.tz_localize("America/New_York")
+    provider = YFinanceProvider()
+    with patch.object(provider, "_get_stock_history", return_value=hist):
+        data = provider.get_technical_indicators("AAPL", period="3mo")
+    assert data.current_price == pytest.approx(hist["Close"].iloc[-1])
+    assert data.current_volume == int(hist["Volume"].iloc[-1])
+    assert data.sma_50 == pytest.approx(hist["Close"].rolling(50).mean().iloc[-1])
+    assert np.isnan(data.sma_200)
+    assert len(data.ohlcv) == 60
@@ -4,9 +4,20 @@ from providers.fred import FredProvider
 
 
 @pytest.fixture
-def fred_provider():
+def fred_provider(tmp_path):
     provider = FredProvider(api_key="DUMMY")
-    return provider
+    provider.store.base_dir = str(tmp_path)
+    yield provider
+    provider.close()
+
+def serve(provider, series):
+    """Patch the FRED API to return `series` ({bundle key: observations}) for every request."""
+    ids = {series_id: key for key, series_id in provider.BULK_SERIES.items()}
+
+    async def fetch(series_id, start_date=None):
+        provider.request_count += 1
+        return series.get(ids[series_id], [])
+    return patch.object(provider.store, "fetch", side_effect=fetch)
 
 def make_obs(values, start_date="2024-01-01"):
     # Helper to create FRED-style observations
@@ -16,15 +27,15 @@ def make_obs(values, start_date="2024-01-01"):
 
 def test_get_series_trend_basic(fred_provider):
     # Patch get_bulk_economic_data to return controlled data
-    with patch.object(fred_provider, 'get_bulk_economic_data') as mock_bulk:
-        mock_bulk.return_value = {
-            'gdp': { 'observations': make_obs([1, 2, 3, 4, 5]) },
-            'cpi': { 'observations': make_obs([10, 10, 10, 10, 10]) },
-            'unemployment': { 'observations': make_obs([5, 4, 3, 2, 1]) },
-            'vix': { 'observations': make_obs(['.', None, '', 7, 8]) },
-            'empty': { 'observations': [] },
-        }
-        trends = fred_provider.get_series_trend("2024-01-01", "2024-01-05")
+    with serve(fred_provider, {
+            'gdp': make_obs([1, 2, 3, 4, 5]),
+            'cpi': make_obs([10, 10, 10, 10, 10]),
+            'unemployment': make_obs([5, 4, 3, 2, 1]),
+            'vix': make_obs(['.', None, '', 7, 8]),
+            'ppi': [],
+        }):
+        trends, count = fred_provider.get_series_trend("2024-01-01", "2024-01-05")
+        assert count == len(fred_provider.BULK_SERIES)
         # GDP: increasing
         assert trends['gdp']['series_start_value'] == 1
         assert trends['gdp']['series_end_value'] == 5
@@ -40,15 +51,14 @@ def test_get_series_trend_basic(fred_provider):
         assert trends['vix']['series_start_value'] == 7
         assert trends['vix']['series_end_value'] == 8
         # Empty: all None
-        assert trends['empty']['series_start_value'] is None
-        assert trends['empty']['trend'] is None
+        assert trends['ppi']['series_start_value'] is None
+        assert trends['ppi']['trend'] is None
 
 def test_get_series_trend_single_value(fred_provider):
-    with patch.object(fred_provider, 'get_bulk_economic_data') as mock_bulk:
-        mock_bulk.return_value = {
-            'gdp': { 'observations': make_obs([42]) },
-        }
-        trends = fred_provider.get_series_trend()
+    with serve(fred_provider, {
+            'gdp': make_obs([42]),
+        }):
+        trends, _ = fred_provider.get_series_trend()
         assert trends['gdp']['series_start_value'] == 42
         assert trends['gdp']['series_end_value'] == 42
         assert trends['gdp']['std_dev'] == 0.0
@@ -56,10 +66,9 @@ def test_get_series_trend_single_value(fred_provider):
         assert trends['gdp']['rate_of_change'] == 0.0
 
 def test_get_series_trend_all_missing(fred_provider):
-    with patch.object(fred_provider, 'get_bulk_economic_data') as mock_bulk:
-        mock_bulk.return_value = {
-            'gdp': { 'observations': make_obs(['.', None, '']) },
-        }
-        trends = fred_provider.get_series_trend()
+    with serve(fred_provider, {
+            'gdp': make_obs(['.', None, '']),
+        }):
+        trends, _ = fred_provider.get_series_trend()
         assert trends['gdp']['series_start_value'] is None
         assert trends['gdp']['trend'] is None
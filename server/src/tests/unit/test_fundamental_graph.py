@@ -0,0 +1,82 @@
+import time
+import asyncio
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from graphs import fundamental, technical
+from utils.common import merge_dict_results, timing_report
+
+LLM_DELAY = 0.2
+
+
+class FakeLLM(RunnableLambda):
+    """Runnable stand-in for the chat model that sleeps to simulate LLM latency."""
+
+    def __init__(self):
+        async def respond(prompt):
+            await asyncio.sleep(LLM_DELAY)
+            return AIMessage(content="ok")
+        super().__init__(respond)
+
+    def with_structured_output(self, schema, include_raw=False):
+        async def respond(prompt):
+            await asyncio.sleep(LLM_DELAY)
+            structured = MagicMock()
+            structured.model_dump.return_value = {"recommendation": "HOLD"}
+            if include_raw:
+                return {"raw": AIMessage(content=""), "parsed": structured, "parsing_error": None}
+            return structured
+        return RunnableLambda(respond)
+
+def fake_data(payload):
+    data = MagicMock()
+    data.model_dump.return_value = payload
+    return data
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setattr(fundamental, "VerboseFileCallbackHandler", lambda graph_name: BaseCallbackHandler())
+    monkeypatch.setattr(technical, "VerboseFileCallbackHandler", lambda graph_name: BaseCallbackHandler())
+    yfinance_provider = MagicMock()
+    yfinance_provider.get_technical_indicators.return_value = fake_data({"rsi": 55})
+    yfinance_provider.get_dividend_history.return_value = fake_data({"dividends": {}})
+    yfinance_provider.get_news.return_value = fake_data({"news": []})
+    alphavantage_provider = MagicMock()
+    alphavantage_provider.get_market_data_async = AsyncMock(return_value=(fake_data({"sector": "TECH"}), 1))
+    alphavantage_provider.get_earnings_history_async = AsyncMock(return_value=(fake_data({"quarterly_earnings": []}), 3))
+    return fundamental.FundamentalGraph(FakeLLM(), yfinance_provider, alphavantage_provider)
+
+def test_merge_dict_results_is_none_safe_and_recursive():
+    old = {"a": {"x": 1}, "b": 1}
+    new = {"a": {"y": 2}, "b": 2, "c": 3}
+    assert merge_dict_results(old, new) == {"a": {"x": 1, "y": 2}, "b": 1, "c": 3}
+    assert old == {"a": {"x": 1}, "b": 1}
+    assert merge_dict_results(None, {"a": 1}) == {"a": 1}
+    assert merge_dict_results({"a": 1}, None) == {"a": 1}
+
+def test_timing_report():
+    report = timing_report({"b": {"started_at": 2, "seconds": 1.0}, "a": {"started_at": 1, "seconds": 1.0}}, 1.0)
+    assert list(report["nodes"]) == ["a", "b"]
+    assert report["speedup"] == 2.0
+
+def test_data_nodes_run_in_parallel(graph):
+    start = time.perf_counter()
+    result = asyncio.run(graph.analyze_stock("AAPL"))
+    elapsed = time.perf_counter() - start
+
+    results = result["results"]
+    for section in fundamental.DATA_NODES:
+        assert section in results
+        assert f"validate_{section}" in results
+        assert f"revised_{section}" in results
+    assert results["structured_data"] == {"recommendation": "HOLD"}
+    assert result["usage"]["market_analysis"]["api_usage"] == {"alphavantage": 4}
+    assert "technical_analysis" in result["usage"]
+
+    # data, validate, revise, recommendation and export: 5 sequential LLM rounds instead of 11
+    assert elapsed < LLM_DELAY * 8
+    timings = result["timings"]
+    assert set(fundamental.DATA_NODES) <= set(timings["nodes"])
+    assert timings["speedup"] > 2
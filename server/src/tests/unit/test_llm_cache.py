@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from services.cache import ResponseCache
+from services.llm_cache import LLMResponseCache, is_cache_hit
+
+
+@pytest.fixture
+def llm_cache(tmp_path):
+    return LLMResponseCache(ResponseCache("llm", cache_dir=str(tmp_path)), ttl=60)
+
+def test_identical_prompt_is_served_from_cache(llm_cache):
+    llm = FakeListChatModel(responses=["first", "second"], cache=llm_cache)
+    first = llm.invoke("Analyze AAPL")
+    second = llm.invoke("Analyze AAPL")
+    assert first.content == second.content == "first"
+    assert not is_cache_hit(first)
+    assert is_cache_hit(second)
+    assert llm_cache.cache.stats()["hits"] == 1
+
+def test_different_prompt_or_model_settings_miss(llm_cache):
+    llm = FakeListChatModel(responses=["a", "b", "c"], cache=llm_cache)
+    llm.invoke("Analyze AAPL")
+    assert not is_cache_hit(llm.invoke("Analyze MSFT"))
+    other = FakeListChatModel(responses=["x"], cache=llm_cache)
+    assert other.invoke("Analyze AAPL").content == "x"
+
+def test_async_calls_use_cache_and_survive_restart(tmp_path):
+    cache = LLMResponseCache(ResponseCache("llm", cache_dir=str(tmp_path)), ttl=60)
+    llm = FakeListChatModel(responses=["cached"], cache=cache)
+    asyncio.run(llm.ainvoke("Summarize"))
+    # A new cache instance over the same directory sees the stored response
+    reopened = LLMResponseCache(ResponseCache("llm", cache_dir=str(tmp_path)), ttl=60)
+    message = asyncio.run(llm.model_copy(update={"cache": reopened}).ainvoke("Summarize"))
+    assert message.content == "cached"
+    assert is_cache_hit(message)
@@ -0,0 +1,68 @@
+import pytest
+from datetime import datetime, timedelta
+from models.models import Stock, Research, TechnicalAnalysis
+from services.database import DatabaseManager
+from utils.pagination import encode_cursor, decode_cursor
+
+MODELS = [Stock, Research, TechnicalAnalysis]
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 3, 1, 9, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_research_pages_cover_every_row_once(db, query_log):
+    aapl, msft = Stock.create(symbol="AAPL"), Stock.create(symbol="MSFT")
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i in range(230):
+        # Pairs of reports share a timestamp so the id tiebreak is exercised
+        created_at = start + timedelta(hours=i // 2)
+        rows.append({"stock": aapl.id, "market": "x" * 1000, "created_at": created_at, "updated_at": created_at})
+        rows.append({"stock": msft.id, "market": "y", "created_at": created_at, "updated_at": created_at})
+    Research.insert_many(rows).execute()
+    expected = [r.id for r in Research.select().where(Research.stock == aapl).order_by(Research.created_at.desc(), Research.id.desc())]
+
+    seen, cursor, pages = [], None, 0
+    with query_log.record() as queries:
+        while True:
+            page, cursor = DatabaseManager.list_research("aapl", limit=40, cursor=cursor)
+            pages += 1
+            assert all(set(row) == {"id", "created_at", "symbol"} and row["symbol"] == "AAPL" for row in page)
+            seen.extend(row["id"] for row in page)
+            if cursor is None:
+                break
+    assert seen == expected
+    assert pages == 6
+    # One query per page: no lazy stock lookups, no COUNT
+    assert len(queries) == pages
+    assert "market" not in queries[0]
+
+def test_technical_listing_and_detail(db, query_log):
+    aapl = Stock.create(symbol="AAPL")
+    for i in range(3):
+        TechnicalAnalysis.create(stock=aapl, technical=f"analysis {i}")
+    page, cursor = DatabaseManager.list_technical("AAPL", limit=2)
+    assert len(page) == 2 and cursor is not None
+    rest, cursor = DatabaseManager.list_technical("AAPL", limit=2, cursor=cursor)
+    assert len(rest) == 1 and cursor is None
+
+    with query_log.record() as queries:
+        technical = DatabaseManager.get_technical_by_id(page[0]["id"])
+        assert technical.stock.symbol == "AAPL"
+        assert technical.technical.startswith("analysis")
+    assert len(queries) == 1
+
+def test_research_history_uses_a_join(db, query_log):
+    aapl, msft = Stock.create(symbol="AAPL"), Stock.create(symbol="MSFT")
+    for stock in (aapl, msft, aapl):
+        Research.create(stock=stock, recommendation="buy")
+    with query_log.record() as queries:
+        history, cursor = DatabaseManager.get_all_research_history_list(2)
+    assert [row["symbol"] for row in history] == ["AAPL", "MSFT"]
+    assert cursor is not None
+    assert len(queries) == 1
+    history, cursor = DatabaseManager.get_all_research_history_list(2, cursor=cursor)
+    assert [row["symbol"] for row in history] == ["AAPL"] and cursor is None
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from providers.polygon import PolygonProvider
+from utils.rate_limiter import RateLimiter, MemoryBucketBackend
+
+NEXT = "https://api.polygon.io/stocks/v1/short-interest?cursor={}"
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setenv("POLYGON_API_KEY", "DUMMY")
+    provider = PolygonProvider()
+    provider.rate_limiter = RateLimiter("test", per_minute=6000, burst=10, backend=MemoryBucketBackend())
+    return provider
+
+def fake_pages(pages, calls):
+    async def get_request(endpoint, params=None):
+        calls.append((endpoint, dict(params or {})))
+        page = len(calls) - 1
+        data = {"status": "OK", "results": pages[page]}
+        if page + 1 < len(pages):
+            data["next_url"] = NEXT.format(page + 1)
+        return data, 1
+    return get_request
+
+def test_short_interest_follows_cursor_with_date_bounds(provider):
+    pages = [[{"settlement_date": f"2025-0{m}-15"} for m in (6, 5)], [{"settlement_date": "2025-04-15"}], [{"settlement_date": "2025-03-14"}]]
+    calls = []
+
+    async def run():
+        seen = []
+        async for records, count in provider.iter_short_interest("AAPL", start="2025-01-01", end="2025-06-30", page_size=2):
+            seen.append((len(records), count))
+        return seen
+
+    with patch.object(provider, "_get_request", side_effect=fake_pages(pages, calls)):
+        assert asyncio.run(run()) == [(2, 1), (1, 1), (1, 1)]
+    assert calls[0] == ("/stocks/v1/short-interest", {
+        "ticker": "AAPL", "limit": 2, "sort": "settlement_date.desc",
+        "settlement_date.gte": "2025-01-01", "settlement_date.lte": "2025-06-30",
+    })
+    # Later pages come from the cursor, which already encodes the query
+    assert calls[1:] == [(NEXT.format(1), {}), (NEXT.format(2), {})]
+
+def test_pagination_stops_early(provider):
+    pages = [[{"date": "2025-06-02"}, {"date": "2025-05-30"}]] * 5
+    calls = []
+    with patch.object(provider, "_get_request", side_effect=fake_pages(pages, calls)):
+        records, count = asyncio.run(provider.get_short_volume("AAPL", limit=3))
+        assert (len(records), count, len(calls)) == (3, 2, 2)
+
+        async def first_page():
+            async for records, _ in provider.iter_short_volume("AAPL"):
+                return records
+        calls.clear()
+        asyncio.run(first_page())
+        assert len(calls) == 1
+
+def test_failed_page_ends_iteration(provider):
+    async def get_request(endpoint, params=None):
+        return None, 1
+    with patch.object(provider, "_get_request", side_effect=get_request):
+        assert asyncio.run(provider.get_short_interest("AAPL")) == ([], 1)
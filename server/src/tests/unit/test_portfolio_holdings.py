@@ -0,0 +1,203 @@
+import random
+from datetime import date, datetime, timedelta
+from models.models import Stock, StockSplit, Portfolio, StockTransactionLog, PortfolioHolding, HistoricalValues, TechnicalHistoricalValues
+from services.database import DatabaseManager
+from utils.financial import summarize_holdings, split_factor_table, split_adjustment_factors
+
+MODELS = [Stock, StockSplit, Portfolio, StockTransactionLog, PortfolioHolding, HistoricalValues, TechnicalHistoricalValues]
+ACTIONS = ["BUY", "BUY", "BUY", "SELL", "DIVIDEND_REINVESTMENT"]
+
+
+def reference_holdings(txns, splits):
+    """Per-transaction loop equivalent to the original get_portfolio_holdings."""
+    portfolio = {}
+    for t in txns:
+        sym = t['symbol']
+        if sym not in portfolio:
+            portfolio[sym] = {'symbol': sym, 'shares': 0.0, 'avg_cost': 0.0, 'total_cost': 0.0, 'buys': 0.0, 'sells': 0.0, 'dividends': 0.0}
+        split_factor = 1.0
+        for effective_date, factor in sorted(splits.get(t['stock_id'], [])):
+            if effective_date > t['purchase_date']:
+                split_factor *= float(factor)
+        adj_shares = t['shares'] * split_factor
+        adj_price = t['price'] / split_factor if split_factor != 0 else t['price']
+        if t['action'] == 'BUY':
+            portfolio[sym]['shares'] += adj_shares
+            portfolio[sym]['total_cost'] += adj_shares * adj_price
+            portfolio[sym]['buys'] += adj_shares
+        elif t['action'] == 'SELL':
+            portfolio[sym]['shares'] -= adj_shares
+            portfolio[sym]['sells'] += adj_shares
+        elif t['action'] == 'DIVIDEND_REINVESTMENT':
+            portfolio[sym]['shares'] += adj_shares
+            portfolio[sym]['dividends'] += adj_shares * adj_price
+    for row in portfolio.values():
+        row['total_cost'] = round(row['total_cost'], 2)
+        row['shares'] = round(row['shares'], 2)
+        if row['shares'] > 0:
+            row['avg_cost'] = round(row['total_cost'] / (row['buys'] + row['dividends']/row['avg_cost'] if row['avg_cost'] else row['buys']), 2) if (row['buys'] + row['dividends']) else 0.0
+        else:
+            row['avg_cost'] = 0.0
+    return list(portfolio.values())
+
+def make_transactions(count, symbols=50, seed=1):
+    rng = random.Random(seed)
+    start = date(2010, 1, 1)
+    txns = [
+        {
+            "id": i,
+            "stock_id": (stock_id := rng.randrange(symbols) + 1),
+            "symbol": f"SYM{stock_id}",
+            "action": rng.choice(ACTIONS),
+            "shares": round(rng.uniform(0.1, 100), 4),
+            "price": round(rng.uniform(1, 500), 2),
+            "purchase_date": start + timedelta(days=rng.randrange(5000)),
+        }
+        for i in range(count)
+    ]
+    txns.sort(key=lambda t: t["purchase_date"], reverse=True)
+    splits = {
+        stock_id: [(start + timedelta(days=rng.randrange(5000)), rng.choice([2.0, 3.0, 1.5, 0.1, 4.0])) for _ in range(rng.randrange(4))]
+        for stock_id in range(1, symbols + 1)
+    }
+    return txns, splits
+
+def test_split_adjustment_factors_only_count_later_splits():
+    dates, factors = split_factor_table([(date(2020, 6, 1), 4.0), (date(2015, 1, 1), 2.0)])
+    adjusted = split_adjustment_factors([date(2014, 1, 1), date(2015, 1, 1), date(2018, 1, 1), date(2021, 1, 1)], dates, factors)
+    assert adjusted.tolist() == [8.0, 4.0, 4.0, 1.0]
+
+def test_summarize_holdings_matches_per_transaction_loop():
+    txns, splits = make_transactions(2000)
+    assert summarize_holdings(txns, splits) == reference_holdings(txns, splits)
+    assert summarize_holdings([], {}) == []
+
+
+def test_bulk_queries_return_rows_and_splits(db):
+    portfolio = Portfolio.create(name="Main")
+    aapl, msft = Stock.create(symbol="AAPL"), Stock.create(symbol="MSFT")
+    StockSplit.create(stock=aapl, effective_date=date(2020, 8, 31), split_factor=4.0)
+    StockTransactionLog.create(stock=aapl, portfolio=portfolio, action="BUY", shares=10, price=400, purchase_date=date(2020, 1, 2))
+    StockTransactionLog.create(stock=aapl, portfolio=portfolio, action="BUY", shares=5, price=120, purchase_date=date(2021, 1, 2))
+    StockTransactionLog.create(stock=msft, portfolio=portfolio, action="BUY", shares=2, price=200, purchase_date=date(2020, 5, 1))
+
+    rows = DatabaseManager.get_transaction_rows(portfolio_id=portfolio.id)
+    assert [r["symbol"] for r in rows] == ["AAPL", "MSFT", "AAPL"]
+    splits = DatabaseManager.get_splits_by_stock([r["stock_id"] for r in rows])
+    assert splits == {aapl.id: [(date(2020, 8, 31), 4.0)]}
+
+    holdings = {h["symbol"]: h for h in summarize_holdings(rows, splits)}
+    assert holdings["AAPL"]["shares"] == 45.0
+    assert holdings["AAPL"]["total_cost"] == 4600.0
+    assert holdings == {h["symbol"]: h for h in reference_holdings(rows, splits)}
+
+def test_holdings_for_10k_transactions_use_two_queries(db, query_log):
+    txns, splits = make_transactions(10000, symbols=100)
+    portfolio = Portfolio.create(name="Bench")
+    Stock.insert_many([{"id": i, "symbol": f"SYM{i}"} for i in range(1, 101)]).execute()
+    StockSplit.insert_many([
+        {"stock": stock_id, "effective_date": d, "split_factor": f}
+        for stock_id, pairs in splits.items() for d, f in dict(pairs).items()
+    ]).execute()
+    with db.atomic():
+        for i in range(0, len(txns), 500):
+            StockTransactionLog.insert_many([
+                {"stock": t["stock_id"], "portfolio": portfolio.id, "action": t["action"], "shares": t["shares"], "price": t["price"], "purchase_date": t["purchase_date"]}
+                for t in txns[i:i + 500]
+            ]).execute()
+
+    with query_log.record() as queries:
+        rows = DatabaseManager.get_transaction_rows(portfolio_id=portfolio.id)
+        holdings = summarize_holdings(rows, DatabaseManager.get_splits_by_stock([r["stock_id"] for r in rows]))
+
+    # Two queries in total; the per-transaction version issued two per transaction
+    assert len(queries) == 2
+    by_symbol = lambda items: sorted(items, key=lambda h: h["symbol"])
+    assert by_symbol(holdings) == by_symbol(reference_holdings(rows, DatabaseManager.get_splits_by_stock(list(splits))))
+
+def holding_values(portfolio_id):
+    return {h.stock.symbol: (h.shares, h.total_cost, h.avg_cost) for h in DatabaseManager.get_portfolio_holding_rows(portfolio_id)}
+
+def test_holdings_are_maintained_on_transaction_writes(db):
+    portfolio = Portfolio.create(name="Main")
+    aapl, msft = Stock.create(symbol="AAPL"), Stock.create(symbol="MSFT")
+    DatabaseManager.create_transaction(aapl, "BUY", 10, 400, date(2020, 1, 2), portfolio_id=portfolio.id)
+    DatabaseManager.create_transaction(msft, "BUY", 2, 200, date(2020, 5, 1), portfolio_id=portfolio.id)
+    sell = DatabaseManager.create_transaction(aapl, "SELL", 4, 450, date(2020, 6, 1), portfolio_id=portfolio.id)
+    assert holding_values(portfolio.id) == {"AAPL": (6.0, 4000.0, 400.0), "MSFT": (2.0, 400.0, 200.0)}
+    assert [h.stock.symbol for h in DatabaseManager.get_portfolio_holding_rows(portfolio.id)] == ["AAPL", "MSFT"]
+
+    # A split after the purchases adjusts the shares once the stock's holdings are refreshed
+    StockSplit.create(stock=aapl, effective_date=date(2020, 8, 31), split_factor=4.0)
+    assert DatabaseManager.refresh_holdings_for_stock(aapl.id) == 1
+    assert holding_values(portfolio.id)["AAPL"] == (24.0, 4000.0, 100.0)
+
+    assert DatabaseManager.delete_transaction(sell.id, portfolio.id)
+    assert holding_values(portfolio.id)["AAPL"] == (40.0, 4000.0, 100.0)
+    msft_txn = StockTransactionLog.get(StockTransactionLog.stock == msft)
+    DatabaseManager.delete_transaction(msft_txn.id, portfolio.id)
+    assert "MSFT" not in holding_values(portfolio.id)
+    assert DatabaseManager.check_portfolio_holdings() == []
+
+def test_rebuild_and_consistency_check(db):
+    txns, splits = make_transactions(1000, symbols=20)
+    portfolio = Portfolio.create(name="Main")
+    Stock.insert_many([{"id": i, "symbol": f"SYM{i}"} for i in range(1, 21)]).execute()
+    StockSplit.insert_many([
+        {"stock": stock_id, "effective_date": d, "split_factor": f}
+        for stock_id, pairs in splits.items() for d, f in dict(pairs).items()
+    ]).execute()
+    StockTransactionLog.insert_many([
+        {"stock": t["stock_id"], "portfolio": portfolio.id, "action": t["action"], "shares": t["shares"], "price": t["price"], "purchase_date": t["purchase_date"]}
+        for t in txns
+    ]).execute()
+
+    # Bulk inserts bypass the incremental path, so every holding is missing until a rebuild
+    assert len(DatabaseManager.check_portfolio_holdings()) == 20
+    assert DatabaseManager.rebuild_portfolio_holdings() == 20
+    assert DatabaseManager.check_portfolio_holdings() == []
+
+    rows = DatabaseManager.get_transaction_rows(portfolio_id=portfolio.id)
+    expected = summarize_holdings(rows, DatabaseManager.get_splits_by_stock([r["stock_id"] for r in rows]))
+    stored = {h.stock.symbol: h for h in DatabaseManager.get_portfolio_holding_rows(portfolio.id)}
+    for row in expected:
+        assert stored[row["symbol"]].shares == row["shares"]
+        assert stored[row["symbol"]].total_cost == row["total_cost"]
+
+    PortfolioHolding.update(shares=PortfolioHolding.shares + 1).where(PortfolioHolding.stock == 1).execute()
+    mismatches = DatabaseManager.check_portfolio_holdings(portfolio_id=portfolio.id)
+    assert [(m["symbol"], list(m["differences"])) for m in mismatches] == [("SYM1", ["shares"])]
+
+def test_latest_historical_values_by_stock(db):
+    aapl, msft = Stock.create(symbol="AAPL"), Stock.create(symbol="MSFT")
+    HistoricalValues.create(stock=aapl, final_recommendation="buy", created_at=datetime(2024, 1, 1))
+    HistoricalValues.create(stock=aapl, final_recommendation="sell", created_at=datetime(2024, 2, 1))
+    latest = DatabaseManager.get_latest_historical_values_by_stock([aapl.id, msft.id])
+    assert list(latest) == [aapl.id]
+    assert latest[aapl.id].final_recommendation == "sell"
+
+def test_latest_snapshots_in_one_query(db, query_log):
+    aapl, msft = Stock.create(symbol="AAPL"), Stock.create(symbol="MSFT")
+    Stock.create(symbol="NVDA")
+    # Inserted out of date order so the newest row is not the highest id
+    HistoricalValues.create(stock=aapl, final_recommendation="buy", created_at=datetime(2024, 2, 1))
+    HistoricalValues.create(stock=aapl, final_recommendation="sell", created_at=datetime(2024, 1, 1))
+    TechnicalHistoricalValues.create(stock=aapl, rsi=55.0, created_at=datetime(2024, 1, 15))
+    TechnicalHistoricalValues.create(stock=msft, rsi=40.0, created_at=datetime(2024, 1, 1))
+    TechnicalHistoricalValues.create(stock=msft, rsi=60.0, created_at=datetime(2024, 3, 1))
+
+    with query_log.record() as queries:
+        snapshots = DatabaseManager.get_latest_snapshots()
+    assert len(queries) == 1
+    # Stocks without any snapshot are left out
+    assert [s["symbol"] for s in snapshots] == ["AAPL", "MSFT"]
+    assert snapshots[0]["historical"]["final_recommendation"] == "buy"
+    assert snapshots[0]["technical"]["rsi"] == 55.0
+    assert snapshots[1]["historical"] is None
+    assert snapshots[1]["technical"]["rsi"] == 60.0
+    with query_log.record() as queries:
+        filtered = DatabaseManager.get_latest_snapshots(["msft"])
+    assert [s["symbol"] for s in filtered] == ["MSFT"]
+    # Both latest-row subqueries are restricted to the requested stocks, not just the outer rows
+    assert queries[-1].count('"stock_id" IN') == 2
+    assert DatabaseManager.get_latest_historical_values_by_stock([aapl.id])[aapl.id].final_recommendation == "buy"
@@ -0,0 +1,119 @@
+import time
+import asyncio
+import threading
+import pytest
+from utils.rate_limiter import RateLimiter, RateLimitExceeded, MemoryBucketBackend, SqliteBucketBackend, Bucket, take_tokens
+
+
+def test_concurrent_waiters_are_served_in_order():
+    limiter = RateLimiter("test", per_minute=1200, burst=1, backend=MemoryBucketBackend())  # one token every 50ms
+    order = []
+
+    async def request(i):
+        await limiter.acquire()
+        order.append((i, time.monotonic()))
+
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(*(request(i) for i in range(6)))
+        return start
+
+    start = asyncio.run(main())
+    assert [i for i, _ in order] == list(range(6))
+    # No two requests got through in the same 50ms window
+    times = [t - start for _, t in order]
+    assert all(b - a >= 0.04 for a, b in zip(times, times[1:]))
+    stats = limiter.stats()
+    assert stats["waiting"] == 0
+    assert stats["wait_seconds"]["count"] == 6
+    assert stats["wait_seconds"]["max_seconds"] == pytest.approx(0.25, abs=0.08)
+
+def test_sqlite_backend_shares_one_quota(tmp_path):
+    path = str(tmp_path / "rate_limits.sqlite")
+    # Separate backends on one file stand in for separate worker processes
+    limiters = [RateLimiter("polygon", per_minute=600, burst=2, backend=SqliteBucketBackend(path)) for _ in range(3)]
+    done = []
+
+    def worker(limiter):
+        for _ in range(4):
+            limiter.acquire_sync()
+            done.append(time.monotonic())
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(limiter,)) for limiter in limiters]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 12 requests at 10/s with a burst of 2 need about a second in total, not a third of it
+    assert len(done) == 12
+    assert time.monotonic() - start == pytest.approx(1.0, abs=0.25)
+
+def test_daily_limit_charges_all_buckets_or_none():
+    backend = MemoryBucketBackend()
+    limiter = RateLimiter("fred", per_minute=60, per_day=2, backend=backend, max_wait=1)
+    limiter.acquire_sync()
+    limiter.acquire_sync()
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire_sync()
+    assert limiter.stats()["waiting"] == 0
+    # The refused request did not take a per-minute token
+    minute_level = backend._levels["fred:minute"][0]
+    assert minute_level == pytest.approx(58, abs=0.1)
+
+def test_take_tokens_reports_the_longest_wait():
+    buckets = [Bucket("a:minute", 5, 1.0), Bucket("a:day", 10, 0.1)]
+    wait, levels = take_tokens({"a:minute": (0.5, 100.0), "a:day": (0.0, 100.0)}, buckets, 1, 100.0)
+    assert wait == pytest.approx(10.0)
+    assert levels is None
+    wait, levels = take_tokens({}, buckets, 1, 100.0)
+    assert wait == 0 and levels == {"a:minute": (4, 100.0), "a:day": (9, 100.0)}
+
+def test_async_acquire_keeps_backend_off_the_loop():
+    class SlowBackend(MemoryBucketBackend):
+        def take(self, buckets, tokens):
+            # Stands in for a SQLite write lock held by another worker
+            time.sleep(0.2)
+            return super().take(buckets, tokens)
+
+    limiter = RateLimiter("slow", per_minute=60, backend=SlowBackend())
+    ticks = []
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(limiter.acquire(), ticker())
+
+    asyncio.run(main())
+    # The loop kept running while the backend blocked
+    assert ticks[-1] - ticks[0] < 0.2
+
+def test_cancelled_head_does_not_strand_the_next_waiter():
+    entered, release = threading.Event(), threading.Event()
+
+    class GatedBackend(MemoryBucketBackend):
+        def take(self, buckets, tokens):
+            if not release.is_set():
+                entered.set()
+                release.wait(5)
+            return super().take(buckets, tokens)
+
+    limiter = RateLimiter("gated", per_minute=60, burst=2, backend=GatedBackend())
+
+    async def main():
+        first = asyncio.create_task(limiter.acquire())
+        await asyncio.to_thread(entered.wait, 5)
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # Cancelled while its take is still running on a worker thread
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        release.set()
+        await asyncio.wait_for(second, 2)
+
+    asyncio.run(main())
+    assert limiter.stats()["waiting"] == 0
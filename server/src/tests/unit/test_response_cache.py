@@ -0,0 +1,75 @@
+import time
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch, AsyncMock
+from services.cache import ResponseCache
+from providers.alphavantage import AlphaVantageProvider
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache("test", cache_dir=str(tmp_path))
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    monkeypatch.setenv("ALPHA_VANTAGE_API_KEY", "DUMMY")
+    return AlphaVantageProvider(cache=ResponseCache("alphavantage", cache_dir=str(tmp_path)))
+
+def test_make_key_ignores_param_order():
+    assert ResponseCache.make_key("OVERVIEW", "AAPL", a=1, b=2) == ResponseCache.make_key("OVERVIEW", "AAPL", b=2, a=1)
+    assert ResponseCache.make_key("OVERVIEW", "AAPL") != ResponseCache.make_key("OVERVIEW", "MSFT")
+
+def test_get_set_and_expiry(cache):
+    cache.set("k", {"value": 1}, ttl=60, tag="OVERVIEW")
+    assert cache.get("k", tag="OVERVIEW") == {"value": 1}
+    cache.set("short", {"value": 2}, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["by_tag"]["OVERVIEW"] == {"hits": 1, "misses": 0}
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache("lru", cache_dir=str(tmp_path), max_bytes=250)
+    payload = "x" * 100
+    cache.set("a", payload, ttl=60)
+    cache.set("b", payload, ttl=60)
+    # Touch "a" so "b" becomes the least recently used entry
+    assert cache.get("a") == payload
+    cache.set("c", payload, ttl=60)
+    assert cache.get("a") == payload
+    assert cache.get("b") is None
+    assert cache.get("c") == payload
+
+def test_cache_persists_across_instances(tmp_path):
+    ResponseCache("persist", cache_dir=str(tmp_path)).set("k", [1, 2, 3], ttl=60)
+    assert ResponseCache("persist", cache_dir=str(tmp_path)).get("k") == [1, 2, 3]
+
+def test_provider_cache_hit_does_not_count_request(provider):
+    overview = {"Sector": "TECHNOLOGY", "Industry": "SOFTWARE", "MarketCapitalization": "100"}
+    with patch.object(provider.http, "get_json", AsyncMock(return_value=overview)) as mock_get:
+        data, count = provider.get_market_data("AAPL")
+        assert count == 1
+        data, count = provider.get_market_data("aapl")
+        assert count == 0
+        assert data.sector == "TECHNOLOGY"
+        assert mock_get.call_count == 1
+    assert provider.cache.stats()["by_tag"]["OVERVIEW"] == {"hits": 1, "misses": 1}
+
+def test_provider_does_not_cache_rate_limit_response(provider):
+    note = {"Information": "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day."}
+    with patch.object(provider.http, "get_json", AsyncMock(return_value=note)) as mock_get:
+        provider.get_splits("AAPL")
+        _, count = provider.get_splits("AAPL")
+        assert count == 1
+        assert mock_get.call_count == 2
+
+def test_statement_ttl_until_next_earnings(provider):
+    reported = (datetime.now() - timedelta(days=10)).strftime("%Y-%m-%d")
+    ttl = provider._cache_ttl("EARNINGS", {"quarterlyEarnings": [{"fiscalDateEnding": "2025-06-30", "reportedDate": reported}]})
+    assert ttl == pytest.approx((provider.QUARTER_DAYS - 10) * 86400, rel=0.01)
+    # Overdue reports fall back to re-checking daily
+    ttl = provider._cache_ttl("INCOME_STATEMENT", {"quarterlyReports": [{"fiscalDateEnding": "2020-03-31"}]})
+    assert ttl == provider.DEFAULT_TTL
+    assert provider._cache_ttl("SPLITS", {"data": []}) == provider.CACHE_TTLS["SPLITS"]
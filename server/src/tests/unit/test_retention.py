@@ -0,0 +1,66 @@
+from datetime import date, datetime
+from models.models import Stock, HistoricalValues, TechnicalHistoricalValues, TokenUsage, TokenUsageDaily
+from services.database import DatabaseManager
+from services.partitions import add_months, month_start, partition_name
+from services.telemetry import TOKEN_DAILY_TOTALS, daily_token_totals, upsert_daily_totals
+
+MODELS = [Stock, HistoricalValues, TechnicalHistoricalValues, TokenUsage, TokenUsageDaily]
+
+
+def test_month_arithmetic():
+    assert month_start(datetime(2024, 12, 31, 23, 59)) == date(2024, 12, 1)
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert partition_name(TokenUsage, date(2025, 3, 1)) == "tokenusage_p2025_03"
+
+def test_purged_token_usage_is_served_from_daily_totals(db):
+    rows = [
+        {"step": step, "input_tokens": tokens, "output_tokens": 1, "total_tokens": tokens + 1, "cache_hit": hit, "created_at": created_at}
+        for step, tokens, hit, created_at in [
+            ("stock:AAPL:market", 100, False, datetime(2025, 1, 10, 9)),
+            ("stock:AAPL:market", 50, True, datetime(2025, 1, 10, 11)),
+            ("stock:MSFT:news", 10, False, datetime(2025, 1, 10, 12)),
+            ("stock:AAPL:market", 6, False, datetime(2025, 2, 3)),
+            ("stock:AAPL:market", 4, False, datetime(2025, 4, 20)),
+        ]
+    ]
+    TokenUsage.insert_many(rows).execute()
+    upsert_daily_totals(TokenUsageDaily, daily_token_totals(rows), keys=[TokenUsageDaily.day, TokenUsageDaily.step], totals=TOKEN_DAILY_TOTALS)
+
+    assert DatabaseManager.purge_token_usage(date(2025, 2, 1)) == 3
+    assert DatabaseManager.purge_token_usage(date(2025, 2, 1)) == 0
+    assert TokenUsage.select().count() == 2
+
+    aapl = TokenUsageDaily.get(step="stock:AAPL:market", day=date(2025, 1, 10))
+    # The cache hit's 51 tokens were not billed
+    assert (aapl.source, aapl.calls, aapl.input_tokens, aapl.total_tokens, aapl.cache_hits, aapl.cached_total_tokens) == ("stock:AAPL", 2, 100, 101, 1, 51)
+    rows = DatabaseManager.get_token_usage(start_date="2025-01-01", end_date="2025-03-01")
+    # Raw rows first, then the daily totals of days that no longer have raw rows
+    assert [(r["date"], r["step"], r["total_tokens"]) for r in rows] == [
+        ("2025-02-03", "stock:AAPL:market", 7),
+        ("2025-01-10", "stock:AAPL:market", 101),
+        ("2025-01-10", "stock:MSFT:news", 11),
+    ]
+    assert rows[1]["calls"] == 2
+
+def test_retention_compacts_old_snapshots_to_one_per_day(db):
+    aapl, msft = Stock.create(symbol="AAPL"), Stock.create(symbol="MSFT")
+    for stock in (aapl, msft):
+        for hour in (9, 12, 16):
+            HistoricalValues.create(stock=stock, current_price=hour, created_at=datetime(2024, 3, 4, hour))
+            TechnicalHistoricalValues.create(stock=stock, rsi=hour, created_at=datetime(2024, 3, 4, hour))
+        # Inside the retention window, so left alone
+        HistoricalValues.create(stock=stock, current_price=1, created_at=datetime(2025, 5, 1, 9))
+        HistoricalValues.create(stock=stock, current_price=2, created_at=datetime(2025, 5, 1, 10))
+
+    result = DatabaseManager.run_retention(token_usage_months=3, snapshot_months=12, today=date(2025, 6, 15))
+    assert result == {
+        "partitions_created": 0,
+        "token_usage_purged": 0,
+        "historical_values_compacted": 4,
+        "technical_values_compacted": 4,
+    }
+    kept = HistoricalValues.select().where(HistoricalValues.created_at < datetime(2025, 1, 1))
+    assert sorted((row.stock_id, row.current_price) for row in kept) == [(aapl.id, 16), (msft.id, 16)]
+    assert HistoricalValues.select().count() == 6
+    assert [row.rsi for row in TechnicalHistoricalValues.select().where(TechnicalHistoricalValues.stock == aapl)] == [16]
@@ -0,0 +1,44 @@
+import pytest
+from datetime import datetime, timedelta
+from models.models import Stock, Research
+from services.database import DatabaseManager
+
+MODELS = [Stock, Research]
+
+
+def add_research(symbol, days_ago, **structured):
+    stock, _ = Stock.get_or_create(symbol=symbol)
+    created_at = datetime(2025, 6, 1) - timedelta(days=days_ago)
+    return Research.create(stock=stock, structured_output=structured, created_at=created_at)
+
+@pytest.fixture
+def research(db):
+    # AAPL was a BUY but its latest report downgraded it
+    add_research("AAPL", 10, final_recommendation="Buy", final_confidence_score=9, price_target_percent=40.0)
+    add_research("AAPL", 1, final_recommendation="Hold", final_confidence_score=8, price_target_percent=5.0)
+    add_research("MSFT", 2, final_recommendation="BUY", final_confidence_score=7.5, price_target_percent=12.5, high_price_target=500.0)
+    add_research("NVDA", 3, final_recommendation="buy", final_confidence_score=8, price_target_percent=30.0)
+    add_research("AMD", 3, final_recommendation="Buy", final_confidence_score=6, price_target_percent=50.0)
+    add_research("TSLA", 4, final_recommendation="Buy", final_confidence_score=9)
+
+def test_screens_latest_research_per_stock(research):
+    rows = DatabaseManager.screen_research(recommendation="BUY", min_confidence=7)
+    assert [row["symbol"] for row in rows] == ["NVDA", "MSFT", "TSLA"]
+    assert rows[1]["final_confidence_score"] == 7.5
+    assert rows[1]["high_price_target"] == 500.0
+    assert rows[2]["price_target_percent"] is None
+
+def test_screener_ordering_and_thresholds(research):
+    rows = DatabaseManager.screen_research(order_by="final_confidence_score", descending=False, limit=2)
+    assert [row["symbol"] for row in rows] == ["AMD", "MSFT"]
+    rows = DatabaseManager.screen_research(min_price_target_percent=20)
+    assert [row["symbol"] for row in rows] == ["AMD", "NVDA"]
+    with pytest.raises(ValueError):
+        DatabaseManager.screen_research(order_by="recommendation; drop table research")
+
+def test_history_reads_summary_fields_in_sql(research):
+    rows, _ = DatabaseManager.get_all_research_history_list(2)
+    assert [(row["symbol"], row["final_recommendation"], row["final_confidence_score"]) for row in rows] == [
+        ("AAPL", "Hold", 8.0),
+        ("MSFT", "BUY", 7.5),
+    ]
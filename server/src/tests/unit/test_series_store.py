@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import numpy as np
+import pytest
+from services.series_store import SeriesStore, merge_series, parse_observations
+from utils.financial import series_trend
+
+
+class FakeFred:
+    """Serves observations from a fixed history and records each request."""
+
+    def __init__(self):
+        self.history = {"GDP": [{"date": f"2024-{m:02d}-01", "value": str(m)} for m in range(1, 13)]}
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def fetch(self, series_id, start):
+        self.calls.append((series_id, start))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [obs for obs in self.history.get(series_id, []) if start is None or obs["date"] >= start]
+
+@pytest.fixture
+def fred():
+    return FakeFred()
+
+def test_windows_are_served_locally_after_first_fetch(tmp_path, fred):
+    store = SeriesStore(fred.fetch, base_dir=str(tmp_path))
+    asyncio.run(store.refresh(["GDP", "CPIAUCSL", "UNRATE"], start="2024-01-01"))
+    assert fred.max_in_flight == 3
+    assert len(fred.calls) == 3
+    # Narrower windows inside the stored coverage never hit the network, even from a new instance
+    fresh = SeriesStore(fred.fetch, base_dir=str(tmp_path))
+    asyncio.run(fresh.refresh(["GDP"], start="2024-06-01"))
+    assert len(fred.calls) == 3
+    dates, values = fresh.window("GDP", "2024-03-01", "2024-05-31")
+    assert values.tolist() == [3.0, 4.0, 5.0]
+    assert str(dates[0]) == "2024-03-01"
+
+def test_refresh_requests_only_the_tail(tmp_path, fred):
+    store = SeriesStore(fred.fetch, base_dir=str(tmp_path), refresh_after=0)
+    asyncio.run(store.refresh(["GDP"], start="2024-01-01"))
+    # A new observation is published and the latest one is revised
+    fred.history["GDP"][-1]["value"] = "12.5"
+    fred.history["GDP"].append({"date": "2025-01-01", "value": "13"})
+    asyncio.run(store.refresh(["GDP"], start="2024-01-01"))
+    assert fred.calls[-1] == ("GDP", "2024-10-01")
+    dates, values = store.window("GDP")
+    assert values[-2:].tolist() == [12.5, 13.0]
+    assert len(dates) == 13 and (np.diff(dates).astype(int) > 0).all()
+
+def test_earlier_start_extends_coverage(tmp_path, fred):
+    store = SeriesStore(fred.fetch, base_dir=str(tmp_path))
+    asyncio.run(store.refresh(["GDP"], start="2024-06-01"))
+    asyncio.run(store.refresh(["GDP"], start="2024-02-01"))
+    assert fred.calls == [("GDP", "2024-06-01"), ("GDP", "2024-02-01")]
+    assert len(store.window("GDP")[0]) == 11
+
+def test_series_trend_and_merge():
+    dates, values = parse_observations([{"date": "2024-01-01", "value": "4"}, {"date": "2024-02-01", "value": "."},
+                                        {"date": "2024-03-01", "value": "2"}, {"date": "2024-04-01", "value": "2"}])
+    trend = series_trend(dates, values)
+    assert (trend["min_value"], trend["min_date"], trend["max_date"]) == (2.0, "2024-03-01", "2024-01-01")
+    assert trend["rate_of_change"] == -0.5
+    assert trend["std_dev"] == pytest.approx(np.std([4, 2, 2], ddof=1))
+    merged = merge_series((dates, values), (np.array(["2024-04-01"], dtype="datetime64[D]"), np.array([3.0])))
+    assert merged[1].tolist() == [4.0, 2.0, 3.0]
+
+def test_files_are_written_off_the_event_loop(tmp_path, fred):
+    store = SeriesStore(fred.fetch, base_dir=str(tmp_path))
+    save = store._save
+    threads = []
+
+    def recording_save(*args):
+        threads.append(threading.current_thread())
+        return save(*args)
+    store._save = recording_save
+    asyncio.run(store.refresh(["GDP", "UNRATE"]))
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
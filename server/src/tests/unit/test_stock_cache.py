@@ -0,0 +1,60 @@
+from datetime import datetime
+from unittest.mock import patch
+from peewee import SqliteDatabase
+from models.models import Stock, database_proxy
+from services.database import DatabaseManager
+from services.stock_cache import StockIdentityMap
+
+MODELS = [Stock]
+
+
+def test_lookups_hit_the_identity_map(db, query_log):
+    aapl, _ = DatabaseManager.get_or_create_stock("aapl")
+    Stock.create(symbol="MSFT")
+    Stock.create(symbol="NVDA")
+    with query_log.record() as queries:
+        for _ in range(10):
+            assert DatabaseManager.get_stock_by_symbol("AAPL") is aapl
+            assert DatabaseManager.get_stock_by_id(aapl.id) is aapl
+        assert queries == []
+
+        stocks = DatabaseManager.get_stocks_by_symbols(["aapl", "msft", "nvda", "TSLA"])
+        assert sorted(stocks) == ["AAPL", "MSFT", "NVDA"]
+        # AAPL came from memory, MSFT and NVDA from one IN query
+        assert len(queries) == 1
+        DatabaseManager.get_stocks_by_symbols(["MSFT", "NVDA"])
+        assert len(queries) == 1
+    stats = DatabaseManager.stock_cache.stats()
+    assert stats["entries"] == 3
+    assert stats["hit_rate"] > 0.8
+
+def test_writes_invalidate_the_entry(db):
+    aapl, _ = DatabaseManager.get_or_create_stock("AAPL")
+    synced = datetime(2025, 5, 1, 18)
+    assert DatabaseManager.update_stock_price("aapl", 190.5, 1000, synced)
+    assert DatabaseManager.mark_splits_updated("AAPL", synced)
+    fresh = DatabaseManager.get_stock_by_symbol("AAPL")
+    assert fresh is not aapl
+    assert (fresh.close, fresh.volume, fresh.data_updated_at, fresh.splits_updated_at) == (190.5, 1000, synced, synced)
+
+    delete_instance = Stock.delete_instance
+
+    def read_during_delete(self, *args, **kwargs):
+        # A concurrent reader caching the row just before it is deleted
+        assert DatabaseManager.get_stock_by_symbol("AAPL") is not None
+        return delete_instance(self, *args, **kwargs)
+    with patch.object(Stock, "delete_instance", read_during_delete):
+        assert DatabaseManager.delete_stock_by_id(fresh.id)
+    assert DatabaseManager.get_stock_by_symbol("AAPL") is None
+    assert DatabaseManager.get_stock_by_id(fresh.id) is None
+
+def test_entries_expire_and_follow_the_database(db):
+    cache = StockIdentityMap(ttl=0)
+    stock = cache.put(Stock.create(symbol="AAPL"))
+    assert cache.get_by_symbol("AAPL") is None
+    cache.ttl = 60
+    cache.put(stock)
+    assert cache.get_by_id(stock.id) is stock
+    database_proxy.initialize(SqliteDatabase(":memory:"))
+    assert cache.get_by_id(stock.id) is None
+    database_proxy.initialize(db)
@@ -0,0 +1,62 @@
+import time
+import pytest
+from datetime import date
+from models.models import TokenUsage, ApiRequestUsage, TokenUsageDaily, ApiUsageDaily
+from services.telemetry import UsageBuffer
+
+MODELS = [TokenUsage, ApiRequestUsage, TokenUsageDaily, ApiUsageDaily]
+# The tests use the database from several threads
+THREADED_DB = True
+
+def test_flushes_in_batches_when_full(db, query_log):
+    buffer = UsageBuffer(max_rows=10, flush_interval=0)
+    with query_log.record() as queries:
+        for i in range(9):
+            buffer.add_api_usage(step=f"stock:AAPL:node{i}", provider="alphavantage", count=1)
+        assert ApiRequestUsage.select().count() == 0
+        buffer.add_token_usage(step="stock:AAPL:export", input_tokens=10, output_tokens=5, total_tokens=15, cache_hit=True)
+    assert ApiRequestUsage.select().count() == 9
+    assert TokenUsage.get().cache_hit is True
+    # One multi-row INSERT per table (raw rows and daily rollups) instead of one per record
+    assert len([q for q in queries if q.startswith("INSERT")]) == 4
+    assert buffer.stats() == {"pending": 0, "flushes": 1, "rows_written": 10}
+    buffer.close()
+
+def test_flushes_on_interval_and_close(db):
+    buffer = UsageBuffer(max_rows=1000, flush_interval=0.05)
+    buffer.add_api_usage(step="s", provider="fred", count=2)
+    deadline = time.time() + 2
+    while ApiRequestUsage.select().count() == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert ApiRequestUsage.select().count() == 1
+
+    buffer.add_api_usage(step="s", provider="fred", count=3)
+    buffer.close()
+    assert [r.count for r in ApiRequestUsage.select().order_by(ApiRequestUsage.id)] == [2, 3]
+    # Closing twice is a no-op
+    buffer.close()
+
+def test_failed_flush_keeps_rows(db):
+    buffer = UsageBuffer(max_rows=1000, flush_interval=0)
+    buffer.add_api_usage(step="s", provider="fred", count=1)
+    db.drop_tables([ApiRequestUsage])
+    with pytest.raises(Exception):
+        buffer.flush()
+    assert buffer.pending() == 1
+    db.create_tables([ApiRequestUsage])
+    assert buffer.flush() == 1
+
+def test_flush_maintains_daily_rollups(db):
+    buffer = UsageBuffer(max_rows=1000, flush_interval=0)
+    for node, count in (("market", 2), ("news", 3), ("market", 1)):
+        buffer.add_api_usage(step=f"stock:AAPL:{node}", provider="alphavantage", count=count)
+    buffer.add_token_usage(step="stock:AAPL:market", input_tokens=10, output_tokens=5, total_tokens=15)
+    buffer.flush()
+    buffer.add_token_usage(step="stock:AAPL:market", input_tokens=1, output_tokens=1, total_tokens=2, cache_hit=True)
+    buffer.flush()
+    market = ApiUsageDaily.get(step="stock:AAPL:market")
+    assert (market.day, market.source, market.calls, market.requests) == (date.today(), "stock:AAPL", 3, 2)
+    assert ApiUsageDaily.select().count() == 2
+    tokens = TokenUsageDaily.get()
+    assert (tokens.calls, tokens.total_tokens, tokens.cache_hits, tokens.cached_total_tokens) == (2, 15, 1, 2)
+    buffer.close()
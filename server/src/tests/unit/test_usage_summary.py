@@ -0,0 +1,57 @@
+from datetime import date, datetime
+import pytest
+from playhouse.migrate import SqliteMigrator
+from models.models import TokenUsage, ApiRequestUsage, TokenUsageDaily, ApiUsageDaily
+from services.database import DatabaseManager
+
+MODELS = [TokenUsage, ApiRequestUsage, TokenUsageDaily, ApiUsageDaily]
+
+
+def add_calls(day, step, provider, calls, requests=1):
+    source = step.rsplit(":", 1)[0]
+    ApiUsageDaily.create(day=day, step=step, source=source, provider=provider, calls=calls, requests=requests)
+
+def test_api_usage_summary_groups(db):
+    add_calls(date(2025, 5, 1), "stock:AAPL:market", "alphavantage", 4, 2)
+    add_calls(date(2025, 5, 1), "stock:AAPL:news", "polygon", 1)
+    add_calls(date(2025, 5, 2), "stock:MSFT:market", "alphavantage", 10, 3)
+    add_calls(date(2025, 4, 30), "stock:MSFT:market", "alphavantage", 99)
+
+    summary = DatabaseManager.get_api_usage_summary(group_by="day", start_date="2025-05-01")
+    assert summary["rows"] == [
+        {"day": "2025-05-02", "calls": 10, "requests": 3},
+        {"day": "2025-05-01", "calls": 5, "requests": 3},
+    ]
+    assert summary["totals"] == {"calls": 15, "requests": 6}
+
+    by_source = DatabaseManager.get_api_usage_summary(group_by="source", start_date="2025-05-01", end_date="2025-05-01")
+    assert [(r["source"], r["calls"]) for r in by_source["rows"]] == [("stock:AAPL", 5)]
+    by_provider = DatabaseManager.get_api_usage_summary(group_by="provider", provider="alphavantage", limit=1)
+    assert by_provider["rows"] == [{"provider": "alphavantage", "calls": 113, "requests": 6}]
+    with pytest.raises(ValueError):
+        DatabaseManager.get_token_usage_summary(group_by="provider")
+
+def test_token_usage_summary_orders_steps_by_tokens(db):
+    for step, total in (("stock:AAPL:market", 50), ("stock:AAPL:news", 500), ("portfolio:Core:analysis", 200)):
+        TokenUsageDaily.create(day=date(2025, 5, 1), step=step, source=step.rsplit(":", 1)[0], calls=1, total_tokens=total)
+    summary = DatabaseManager.get_token_usage_summary(group_by="step", limit=2)
+    assert [r["step"] for r in summary["rows"]] == ["stock:AAPL:news", "portfolio:Core:analysis"]
+    assert summary["totals"]["total_tokens"] == 750
+    by_source = DatabaseManager.get_token_usage_summary(group_by="source")
+    assert [(r["source"], r["total_tokens"]) for r in by_source["rows"]] == [("stock:AAPL", 550), ("portfolio:Core", 200)]
+
+def test_migration_backfills_rollups_from_raw_rows(db, load_migration):
+    TokenUsage.create(step="stock:AAPL:market", input_tokens=3, total_tokens=5, cache_hit=True, created_at=datetime(2025, 5, 1, 9))
+    TokenUsage.create(step="stock:AAPL:market", input_tokens=2, total_tokens=4, created_at=datetime(2025, 5, 1, 10))
+    ApiRequestUsage.create(step="stock:AAPL:market", provider="alphavantage", count=2, created_at=datetime(2025, 5, 1, 9))
+    ApiRequestUsage.create(step="stock:AAPL:market", provider="alphavantage", count=3, created_at=datetime(2025, 5, 1, 10))
+    migration = load_migration("008_usage_daily_rollups")
+    migration.upgrade(SqliteMigrator(db))
+
+    tokens = TokenUsageDaily.get()
+    assert (tokens.day, tokens.source, tokens.calls, tokens.input_tokens, tokens.total_tokens, tokens.cache_hits) == (date(2025, 5, 1), "stock:AAPL", 2, 2, 4, 1)
+    assert (tokens.cached_input_tokens, tokens.cached_total_tokens) == (3, 5)
+    totals = DatabaseManager.get_token_usage_summary()["totals"]
+    assert (totals["total_tokens"], totals["cached_total_tokens"]) == (4, 5)
+    calls = ApiUsageDaily.get()
+    assert (calls.calls, calls.requests) == (5, 2)
@@ -1,14 +1,47 @@
-from typing import Dict, List, Optional, Tuple, Annotated
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple, Annotated
 # Custom merge function for concurrent dict updates that doesn't overwrite previous keys
-def merge_dict_results(old_dict: Dict, new_dict: Dict) -> Dict:
-    """Merges two dictionaries without overwriting existing keys."""
-    result = old_dict.copy()
-    for key, value in new_dict.items():
+def merge_dict_results(old_dict: Optional[Dict], new_dict: Optional[Dict]) -> Dict:
+    """Merges two dictionaries without overwriting existing keys.
+
+    Nested dicts present on both sides are merged recursively, so parallel branches can each
+    add their own sub-keys. Neither input is mutated.
+    """
+    result = dict(old_dict or {})
+    for key, value in (new_dict or {}).items():
         if key not in result:
             result[key] = value
+        elif isinstance(result[key], dict) and isinstance(value, dict):
+            result[key] = merge_dict_results(result[key], value)
     return result
 
 # Take latest value for scalar fields
 def take_latest_value(old_value, new_value):
     """Simply returns the new value, overwriting the old one."""
-    return new_value
\ No newline at end of file
+    return new_value
+
+def timed_node(name: str, node: Callable) -> Callable:
+    """Wrap an async graph node so its runtime is recorded under state["timings"][name]."""
+    @wraps(node)
+    async def wrapper(state):
+        started_at = time.time()
+        start = time.perf_counter()
+        update = await node(state)
+        elapsed = time.perf_counter() - start
+        update = dict(update or {})
+        update["timings"] = {name: {"started_at": started_at, "seconds": elapsed}}
+        return update
+    return wrapper
+
+def timing_report(timings: Dict[str, dict], wall_clock: float) -> Dict[str, Any]:
+    """Summarize per-node timings against the total wall-clock time of a graph run."""
+    nodes = {name: round(t["seconds"], 3) for name, t in sorted(timings.items(), key=lambda kv: kv[1]["started_at"])}
+    total = sum(t["seconds"] for t in timings.values())
+    return {
+        "nodes": nodes,
+        "sum_node_seconds": round(total, 3),
+        "wall_clock_seconds": round(wall_clock, 3),
+        # Serial runtime divided by actual runtime: >1 means nodes overlapped
+        "speedup": round(total / wall_clock, 2) if wall_clock else None,
+    }
@@ -0,0 +1,85 @@
+import os
+import asyncio
+import weakref
+from typing import Any, Dict, Optional
+from uuid import UUID
+from langchain_core.callbacks import AsyncCallbackHandler
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+# Default number of in-flight calls per provider; override with <NAME>_MAX_CONCURRENCY
+DEFAULT_LIMITS = {
+    "llm": 4,
+    "alphavantage": 4,
+    "yfinance": 4,
+    "portfolio": 2,
+}
+
+def get_limit(name: str) -> int:
+    """Return the configured concurrency limit for a provider."""
+    return int(os.environ.get(f"{name.upper()}_MAX_CONCURRENCY", DEFAULT_LIMITS.get(name, 4)))
+
+class LoopSemaphore:
+    """One asyncio.Semaphore per running event loop (asyncio primitives cannot be shared across loops)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def get(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        return self._semaphores[loop]
+
+    async def __aenter__(self):
+        await self.get().acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.get().release()
+
+_provider_limits: Dict[str, LoopSemaphore] = {}
+
+def provider_limit(name: str) -> LoopSemaphore:
+    """Return the shared limiter bounding concurrent calls to a provider."""
+    if name not in _provider_limits:
+        _provider_limits[name] = LoopSemaphore(get_limit(name))
+    return _provider_limits[name]
+
+class LLMConcurrencyLimiter(AsyncCallbackHandler):
+    """Callback handler that bounds the number of concurrent LLM calls.
+
+    Attach it to the chat model so every chain built on that model (including
+    `with_structured_output`) acquires a slot on start and releases it on end or error.
+    """
+
+    run_inline = True
+
+    def __init__(self, name: str = "llm", limit: Optional[int] = None):
+        self.name = name
+        self.limiter = LoopSemaphore(limit or get_limit(name))
+        self._active = {}
+
+    async def _acquire(self, run_id: UUID) -> None:
+        semaphore = self.limiter.get()
+        await semaphore.acquire()
+        self._active[run_id] = semaphore
+
+    def _release(self, run_id: UUID) -> None:
+        semaphore = self._active.pop(run_id, None)
+        if semaphore is not None:
+            semaphore.release()
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID, **kwargs: Any) -> None:
+        await self._acquire(run_id)
+
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        await self._acquire(run_id)
+
+    async def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        self._release(run_id)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._release(run_id)
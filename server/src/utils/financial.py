@@ -1,7 +1,8 @@
 import os
+import math
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from utils.logging import setup_logger
 from zoneinfo import ZoneInfo
@@ -58,15 +59,14 @@ def calculate_bollinger_bands(close: pd.Series, window: int = 20, num_std: float
 
 def calculate_obv(close: pd.Series, volume: pd.Series) -> float:
     """Calculate On-Balance Volume (OBV)."""
-    obv = [0]
-    for i in range(1, len(close)):
-        if close.iloc[i] > close.iloc[i-1]:
-            obv.append(obv[-1] + volume.iloc[i])
-        elif close.iloc[i] < close.iloc[i-1]:
-            obv.append(obv[-1] - volume.iloc[i])
-        else:
-            obv.append(obv[-1])
-    return float(obv[-1])
+    if len(close) == 0:
+        return 0.0
+    return float(obv_series(close, volume).iloc[-1])
+
+def obv_series(close, volume):
+    """Vectorized OBV: cumulative sum of volume signed by the direction of the close."""
+    direction = np.sign(close.diff()).fillna(0)
+    return (direction * volume).cumsum()
 
 def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, window: int = 14) -> float:
     """Calculate Average True Range (ATR)."""
@@ -78,6 +78,192 @@ def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, window: int
     atr = true_range.rolling(window=window).mean()
     return float(atr.iloc[-1])
 
+def split_ohlcv(hist: pd.DataFrame, symbol: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """Return {"Open": ..., "Close": ...} as date x symbol frames.
+
+    Accepts the (price, ticker) MultiIndex frame from `yf.download` or a single-symbol
+    history frame (plain OHLCV columns), which is labelled with `symbol`.
+    """
+    fields = ["Open", "High", "Low", "Close", "Volume"]
+    if isinstance(hist.columns, pd.MultiIndex):
+        frames = {f: hist[f] for f in fields if f in hist.columns.get_level_values(0)}
+    else:
+        frames = {f: hist[[f]].set_axis([symbol or "value"], axis=1) for f in fields if f in hist.columns}
+    # Rebuild each field as one contiguous float block so window ops run over a single 2D array
+    return {
+        f: pd.DataFrame(frame.to_numpy(dtype=float), index=frame.index, columns=frame.columns)
+        for f, frame in frames.items()
+    }
+
+def _rolling_moments(frame: pd.DataFrame, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Windowed count, mean and sum of squared deviations for every column using cumulative sums."""
+    values = frame.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    # Center each column first so the cumulative sums stay small and precise
+    filled = np.where(valid, values, 0.0)
+    offset = filled.sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    centered = np.where(valid, values - offset, 0.0)
+
+    def window_sum(a: np.ndarray) -> np.ndarray:
+        cumulative = np.cumsum(a, axis=0)
+        out = cumulative.copy()
+        out[window:] -= cumulative[:-window]
+        return out
+
+    count = window_sum(valid.astype(float))
+    total = window_sum(centered)
+    squares = window_sum(centered ** 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        sq_dev = np.maximum(squares - total * mean, 0.0)
+    return count, mean + offset, sq_dev
+
+def rolling_mean(frame: pd.DataFrame, window: int, min_periods: Optional[int] = None) -> pd.DataFrame:
+    """Vectorized equivalent of frame.rolling(window, min_periods).mean() across all columns."""
+    count, mean, _ = _rolling_moments(frame, window)
+    required = window if min_periods is None else min_periods
+    return pd.DataFrame(np.where(count >= required, mean, np.nan), index=frame.index, columns=frame.columns)
+
+def rolling_std(frame: pd.DataFrame, window: int) -> pd.DataFrame:
+    """Vectorized equivalent of frame.rolling(window).std() (sample standard deviation)."""
+    count, _, sq_dev = _rolling_moments(frame, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.sqrt(sq_dev / (count - 1))
+    return pd.DataFrame(np.where(count >= window, std, np.nan), index=frame.index, columns=frame.columns)
+
+def calculate_indicators(hist: pd.DataFrame, symbol: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """Compute every technical indicator for every symbol in one vectorized pass.
+
+    Returns a dict of full indicator series keyed by TechnicalIndicators field name, each a
+    date x symbol frame. Rolling/EWM windows run column-wise, so cost scales with the frame
+    size rather than the number of symbols.
+    """
+    ohlcv = split_ohlcv(hist, symbol)
+    close, volume = ohlcv["Close"], ohlcv["Volume"]
+    high, low = ohlcv["High"], ohlcv["Low"]
+
+    exp12 = close.ewm(span=12, adjust=False).mean()
+    exp26 = close.ewm(span=26, adjust=False).mean()
+    macd = exp12 - exp26
+    macd_signal = macd.ewm(span=9, adjust=False).mean()
+
+    # RSI from simple moving averages of gains and losses, as in calculate_rsi
+    delta = close.diff()
+    gain = rolling_mean(delta.where(delta > 0, 0), 14)
+    loss = rolling_mean(-delta.where(delta < 0, 0), 14)
+    rsi = 100 - (100 / (1 + gain / loss))
+
+    sma_20 = rolling_mean(close, 20)
+    std_20 = rolling_std(close, 20)
+
+    # True range is the largest of the three ranges; fmax skips the NaN from the first shift
+    prev_close = close.shift()
+    true_range = np.fmax(np.fmax(high - low, (high - prev_close).abs()), (low - prev_close).abs())
+
+    # Average volume of the last 5 periods vs. the last 20 (or all available if fewer)
+    volume_trend = rolling_mean(volume, 5, min_periods=1) / rolling_mean(volume, 20, min_periods=1)
+
+    return {
+        "current_price": close,
+        "current_volume": volume,
+        "sma_20": sma_20,
+        "sma_50": rolling_mean(close, 50),
+        "sma_200": rolling_mean(close, 200),
+        "rsi": rsi,
+        "volume_trend": volume_trend.replace([np.inf, -np.inf], np.nan).fillna(0.0),
+        "macd": macd,
+        "macd_signal": macd_signal,
+        "macd_hist": macd - macd_signal,
+        "bb_upper": sma_20 + 2.0 * std_20,
+        "bb_middle": sma_20,
+        "bb_lower": sma_20 - 2.0 * std_20,
+        "obv": obv_series(close, volume),
+        "atr": rolling_mean(true_range, 14),
+    }
+
+def latest_indicator_values(indicators: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Return the last value of each indicator as a symbol x indicator frame."""
+    return pd.DataFrame({name: series.iloc[-1] for name, series in indicators.items()})[list(indicators)]
+
+def split_factor_table(splits: List[Tuple[date, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Precompute cumulative split factors for one stock.
+
+    Returns the sorted split dates and `factors`, where factors[k] is the product of the
+    splits from index k onward: the adjustment for a transaction preceded by k splits.
+    """
+    splits = sorted(splits)
+    dates = np.array([d for d, _ in splits], dtype="datetime64[D]")
+    values = [float(f) for _, f in splits]
+    # Multiply in date order, as a per-transaction loop would, so results match exactly
+    factors = np.array([math.prod(values[k:]) for k in range(len(values) + 1)], dtype=float)
+    return dates, factors
+
+def split_adjustment_factors(purchase_dates, dates: np.ndarray, factors: np.ndarray) -> np.ndarray:
+    """Cumulative factor of the splits effective strictly after each purchase date."""
+    return factors[np.searchsorted(dates, np.asarray(purchase_dates, dtype="datetime64[D]"), side="right")]
+
+def summarize_holdings(transactions: List[dict], splits: Dict[int, List[Tuple[date, float]]]) -> List[dict]:
+    """Aggregate transactions into split-adjusted holdings per symbol.
+
+    `transactions` are dicts with stock_id, symbol, action, shares, price and purchase_date;
+    `splits` maps stock_id to its (effective_date, split_factor) pairs. Symbols keep the order
+    of their first transaction. Sums are accumulated in transaction order with np.add.at so the
+    totals are identical to adding the transactions up one by one.
+    """
+    if not transactions:
+        return []
+    def column(key: str, dtype=object) -> np.ndarray:
+        return np.array([t[key] for t in transactions], dtype=dtype)
+
+    stock_codes, stock_ids = pd.factorize(column("stock_id"))
+    factor = np.ones(len(transactions))
+    if any(splits.get(stock_id) for stock_id in stock_ids):
+        purchase_dates = pd.to_datetime(column("purchase_date")).values.astype("datetime64[D]")
+        for code, stock_id in enumerate(stock_ids):
+            if splits.get(stock_id):
+                idx = np.flatnonzero(stock_codes == code)
+                dates, factors = split_factor_table(splits[stock_id])
+                factor[idx] = split_adjustment_factors(purchase_dates[idx], dates, factors)
+
+    adj_shares = column("shares", float) * factor
+    price = column("price", float)
+    adj_price = np.where(factor != 0, price / np.where(factor != 0, factor, 1.0), price)
+    action = column("action")
+    buy, sell, dividend = action == "BUY", action == "SELL", action == "DIVIDEND_REINVESTMENT"
+    codes, symbols = pd.factorize(column("symbol"))
+
+    def accumulate(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        out = np.zeros(len(symbols))
+        np.add.at(out, codes[mask], values[mask])
+        return out
+
+    shares = accumulate(np.where(sell, -adj_shares, adj_shares), buy | sell | dividend)
+    total_cost = accumulate(adj_shares * adj_price, buy)
+    buys = accumulate(adj_shares, buy)
+    sells = accumulate(adj_shares, sell)
+    dividends = accumulate(adj_shares * adj_price, dividend)
+
+    holdings = []
+    for i, sym in enumerate(symbols):
+        row = {
+            'symbol': sym,
+            'shares': float(shares[i]),
+            'avg_cost': 0.0,
+            'total_cost': float(total_cost[i]),
+            'buys': float(buys[i]),
+            'sells': float(sells[i]),
+            'dividends': float(dividends[i])
+        }
+        # Round total_cost and shares to 2 decimal places
+        row['total_cost'] = round(row['total_cost'], 2)
+        row['shares'] = round(row['shares'], 2)
+        if row['shares'] > 0:
+            row['avg_cost'] = round(row['total_cost'] / (row['buys'] + row['dividends']/row['avg_cost'] if row['avg_cost'] else row['buys']), 2) if (row['buys'] + row['dividends']) else 0.0
+        else:
+            row['avg_cost'] = 0.0
+        holdings.append(row)
+    return holdings
+
 # Helper to match by fiscalDateEnding
 def find_by_date(reports, date_key):
     for r in reports:
@@ -92,4 +278,34 @@ def safe_float(value) -> Optional[float]:
     try:
         return float(value)
     except (ValueError, TypeError):
-        return None
\ No newline at end of file
+        return None
+
+
+def series_trend(dates: np.ndarray, values: np.ndarray) -> Dict[str, Optional[float]]:
+    """Start/end, change, min/max, mean and sample std dev of a dated series, computed on the arrays."""
+    if len(values) == 0:
+        return {
+            'series_start_value': None, 'series_start_date': None,
+            'series_end_value': None, 'series_end_date': None,
+            'trend': None, 'rate_of_change': None, 'absolute_change': None,
+            'min_value': None, 'min_date': None, 'max_value': None, 'max_date': None,
+            'mean_value': None, 'std_dev': None,
+        }
+    start_value, end_value = float(values[0]), float(values[-1])
+    # argmin/argmax return the first occurrence, like list.index
+    min_index, max_index = int(np.argmin(values)), int(np.argmax(values))
+    return {
+        'series_start_value': start_value,
+        'series_start_date': str(dates[0]),
+        'series_end_value': end_value,
+        'series_end_date': str(dates[-1]),
+        'trend': end_value / start_value if start_value != 0 else None,
+        'rate_of_change': (end_value - start_value) / start_value if start_value != 0 else None,
+        'absolute_change': end_value - start_value,
+        'min_value': float(values[min_index]),
+        'min_date': str(dates[min_index]),
+        'max_value': float(values[max_index]),
+        'max_date': str(dates[max_index]),
+        'mean_value': float(values.mean()),
+        'std_dev': float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+    }
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import aiohttp
+from typing import Any, Coroutine, Dict, Optional
+from utils.logging import setup_logger
+from utils.rate_limiter import RateLimiter
+
+logger = setup_logger(__name__)
+
+class AsyncHttpClient:
+    """Pooled aiohttp client that lives on its own event loop thread.
+
+    All requests share one `ClientSession` (and therefore one connection pool) and one
+    rate limiter regardless of which thread or event loop the caller runs on. Async callers
+    await `get_json`; sync callers use `run_sync` to block on a coroutine without touching
+    the caller's loop.
+    """
+
+    def __init__(self, name: str, rate_limiter: Optional[RateLimiter] = None, limit: int = 10, timeout: float = 30):
+        self.name = name
+        self.rate_limiter = rate_limiter
+        self.limit = limit
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Lazily start the background event loop thread."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=f"{self.name}-http", daemon=True)
+                self._thread.start()
+                logger.debug(f"Started HTTP event loop thread for {self.name}")
+        return self._loop
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Lazily initialize the shared session. Must run on the client loop."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def _fetch_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        session = await self._get_session()
+        async with session.get(url, params=params) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"Error making request to {url}: {response.status} {error_text}")
+                return {}
+            return await response.json(content_type=None)
+
+    async def run(self, coro: Coroutine) -> Any:
+        """Await a coroutine on the client loop from any event loop."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def run_sync(self, coro: Coroutine) -> Any:
+        """Block the calling thread until a coroutine finishes on the client loop."""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError(f"run_sync called from the {self.name} HTTP loop thread")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET `url` through the pooled session and rate limiter and return the decoded JSON."""
+        return await self.run(self._fetch_json(url, params))
+
+    def close(self) -> None:
+        """Close the session and stop the loop thread."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        if self._session is not None and not self._session.closed:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+        self._session = None
@@ -0,0 +1,292 @@
+import os
+import time
+import asyncio
+import sqlite3
+import itertools
+import threading
+from bisect import bisect_left
+from collections import deque, namedtuple
+from typing import Dict, List, Optional, Tuple
+from utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+# Requests per minute and per day for each provider (None = unlimited);
+# override with <NAME>_RATE_LIMIT_PER_MINUTE / <NAME>_RATE_LIMIT_PER_DAY
+DEFAULT_RATE_LIMITS = {
+    "alphavantage": (5, None),
+    "polygon": (5, None),
+    "fred": (120, None),
+    "yfinance": (60, None),
+}
+DEFAULT_MAX_WAIT = 300.0
+# How often callers queued behind another waiter check whether it is their turn
+POLL_INTERVAL = 0.05
+# Upper bounds (seconds) of the wait-time histogram buckets
+WAIT_BUCKETS = (0.001, 0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+Bucket = namedtuple("Bucket", ["key", "capacity", "rate"])  # rate in tokens per second
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would have to wait longer than the limiter's max_wait."""
+
+def take_tokens(levels: Dict[str, Tuple[float, float]], buckets: List[Bucket], tokens: float, now: float) -> Tuple[float, Optional[Dict[str, Tuple[float, float]]]]:
+    """Refill `buckets` from their stored (tokens, updated_at) levels and take `tokens` from all of them.
+
+    Returns (0, new levels) if every bucket had enough, otherwise (seconds until they will, None);
+    either all buckets are charged or none are.
+    """
+    wait = 0.0
+    refilled = {}
+    for bucket in buckets:
+        level, updated_at = levels.get(bucket.key, (bucket.capacity, now))
+        level = min(bucket.capacity, level + max(0.0, now - updated_at) * bucket.rate)
+        refilled[bucket.key] = level
+        if level < tokens:
+            wait = max(wait, (tokens - level) / bucket.rate)
+    if wait > 0:
+        return wait, None
+    return 0.0, {key: (level - tokens, now) for key, level in refilled.items()}
+
+class MemoryBucketBackend:
+    """Token bucket levels kept in this process only."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._levels: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, buckets: List[Bucket], tokens: float) -> float:
+        with self._lock:
+            wait, levels = take_tokens(self._levels, buckets, tokens, time.time())
+            if levels:
+                self._levels.update(levels)
+            return wait
+
+class SqliteBucketBackend:
+    """Token bucket levels in a local SQLite file, so every worker process on the host shares one quota.
+
+    Each take is a single `BEGIN IMMEDIATE` transaction, which serializes concurrent takers across processes.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+
+    def take(self, buckets: List[Bucket], tokens: float) -> float:
+        keys = [bucket.key for bucket in buckets]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT key, tokens, updated_at FROM buckets WHERE key IN ({', '.join('?' for _ in keys)})", keys
+                ).fetchall()
+                wait, levels = take_tokens({key: (level, updated_at) for key, level, updated_at in rows}, buckets, tokens, time.time())
+                if levels:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                        [(key, level, updated_at) for key, (level, updated_at) in levels.items()],
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+class WaitHistogram:
+    """Counts of how long callers waited for a token, in WAIT_BUCKETS."""
+
+    def __init__(self, bounds: Tuple[float, ...] = WAIT_BUCKETS):
+        self.bounds = bounds
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.bounds, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            labels = [f"le_{bound:g}" for bound in self.bounds] + ["le_inf"]
+            return {
+                "count": self.count,
+                "total_seconds": round(self.total, 3),
+                "mean_seconds": round(self.total / self.count, 3) if self.count else 0.0,
+                "max_seconds": round(self.max, 3),
+                "buckets": dict(zip(labels, self._counts)),
+            }
+
+class RateLimiter:
+    """Requests-per-minute and requests-per-day token buckets for one provider.
+
+    Bucket levels live in a backend that may be shared across processes. Callers in this
+    process queue first-come first-served: only the caller at the head of the queue takes
+    tokens, so a burst of coroutines or threads cannot race past each other. Works from
+    any event loop (`acquire`) or from plain threads (`acquire_sync`).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_minute: Optional[float] = None,
+        per_day: Optional[float] = None,
+        burst: Optional[float] = None,
+        backend=None,
+        max_wait: Optional[float] = None,
+    ):
+        self.name = name
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.buckets: List[Bucket] = []
+        if per_minute:
+            self.buckets.append(Bucket(f"{name}:minute", burst or max(1.0, float(per_minute)), per_minute / 60.0))
+        if per_day:
+            self.buckets.append(Bucket(f"{name}:day", float(per_day), per_day / 86400.0))
+        self._backend = backend
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("RATE_LIMIT_MAX_WAIT", DEFAULT_MAX_WAIT))
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._tickets = itertools.count()
+        self.histogram = WaitHistogram()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = default_backend()
+        return self._backend
+
+    def _enqueue(self) -> int:
+        with self._lock:
+            ticket = next(self._tickets)
+            self._queue.append(ticket)
+            return ticket
+
+    def _leave(self, ticket: int) -> None:
+        with self._lock:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+
+    def _is_head(self, ticket: int) -> bool:
+        with self._lock:
+            return bool(self._queue) and self._queue[0] == ticket
+
+    def _take(self, ticket: int, tokens: float, started: float) -> float:
+        """Take the tokens for the caller at the head of the queue; returns 0 once taken, else how long to sleep.
+
+        Only the head of the queue calls this, so the backend is never entered twice from this process.
+        """
+        wait = self.backend.take(self.buckets, tokens)
+        if wait == 0:
+            # By value: a cancelled caller may already have left while this ran on a worker thread
+            self._leave(ticket)
+            return 0.0
+        if time.monotonic() - started + wait > self.max_wait:
+            raise RateLimitExceeded(f"Rate limit for {self.name} needs a {wait:.0f}s wait (max {self.max_wait:.0f}s)")
+        logger.debug(f"Rate limiter '{self.name}': waiting {wait:.2f}s for a token")
+        return wait
+
+    def _poll(self, ticket: int, tokens: float, started: float) -> float:
+        """Take the tokens if `ticket` is first in line; returns 0 once taken, else how long to sleep."""
+        if not self._is_head(ticket):
+            return POLL_INTERVAL
+        return self._take(ticket, tokens, started)
+
+    def _done(self, started: float) -> float:
+        waited = time.monotonic() - started
+        self.histogram.observe(waited)
+        return waited
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait until `tokens` are available in every bucket and take them. Returns the time spent waiting."""
+        started = time.monotonic()
+        if not self.buckets:
+            return self._done(started)
+        ticket = self._enqueue()
+        try:
+            while True:
+                # The backend may block on a file lock shared with other workers, so it is never called on the loop
+                delay = await asyncio.to_thread(self._take, ticket, tokens, started) if self._is_head(ticket) else POLL_INTERVAL
+                if delay == 0:
+                    break
+                await asyncio.sleep(delay)
+        except BaseException:
+            self._leave(ticket)
+            raise
+        return self._done(started)
+
+    def acquire_sync(self, tokens: float = 1.0) -> float:
+        """Blocking version of `acquire` for synchronous provider clients."""
+        started = time.monotonic()
+        if not self.buckets:
+            return self._done(started)
+        ticket = self._enqueue()
+        try:
+            while (delay := self._poll(ticket, tokens, started)) > 0:
+                time.sleep(delay)
+        except BaseException:
+            self._leave(ticket)
+            raise
+        return self._done(started)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            waiting = len(self._queue)
+        return {
+            "per_minute": self.per_minute,
+            "per_day": self.per_day,
+            "waiting": waiting,
+            "wait_seconds": self.histogram.snapshot(),
+        }
+
+_backend = None
+_limiters: Dict[str, RateLimiter] = {}
+_registry_lock = threading.Lock()
+
+def default_backend():
+    """The process-wide bucket backend: a SQLite file shared by all workers unless RATE_LIMIT_BACKEND=memory."""
+    global _backend
+    with _registry_lock:
+        if _backend is None:
+            if os.getenv("RATE_LIMIT_BACKEND", "sqlite").lower() == "memory":
+                _backend = MemoryBucketBackend()
+            else:
+                cache_dir = os.getenv("CACHE_DIR", "/config/cache")
+                _backend = SqliteBucketBackend(os.getenv("RATE_LIMIT_DB", os.path.join(cache_dir, "rate_limits.sqlite")))
+        return _backend
+
+def _env_limit(name: str, period: str, default: Optional[float]) -> Optional[float]:
+    value = os.environ.get(f"{name.upper()}_RATE_LIMIT_PER_{period}")
+    return float(value) if value else default
+
+def get_rate_limiter(name: str, per_minute: Optional[float] = None, per_day: Optional[float] = None) -> RateLimiter:
+    """Return the shared limiter for a provider, creating it from the arguments, env or DEFAULT_RATE_LIMITS."""
+    with _registry_lock:
+        if name not in _limiters:
+            default_minute, default_day = DEFAULT_RATE_LIMITS.get(name, (None, None))
+            _limiters[name] = RateLimiter(
+                name,
+                per_minute=per_minute or _env_limit(name, "MINUTE", default_minute),
+                per_day=per_day or _env_limit(name, "DAY", default_day),
+            )
+        return _limiters[name]
+
+def rate_limit_stats() -> Dict[str, Dict[str, object]]:
+    """Limits, queue length and wait-time histogram of every provider limiter."""
+    with _registry_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in sorted(limiters.items())}